@@ -0,0 +1,95 @@
+import contextlib
+import io
+import os
+from harness import benchmark
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+try:
+    from PySide6.QtWidgets import QApplication
+except ImportError:  # the editor benchmarks need the GUI dependencies
+    QApplication = None
+
+NODES = 5000
+COLUMNS = 100
+
+_editor = None
+
+
+def build_editor(nodes: int = NODES):
+    """Build an editor with ``nodes`` nodes on a grid, each connected to its right and lower neighbour."""
+    from agent_handler.agent import Agent
+    from gui.node_editor import NodeEditor
+    from gui.state import StateWrapper
+
+    agents = {f"agent{index}": Agent(f"agent{index}", "Goal", "Backstory", False) for index in range(nodes)}
+    editor = NodeEditor(agents)
+    # addNode logs every node to stdout, which would end up in the results JSON
+    with contextlib.redirect_stdout(io.StringIO()):
+        items = [editor.addNode(agent, (index % COLUMNS) * 130, (index // COLUMNS) * 80)
+                 for index, agent in enumerate(agents.values())]
+    for index, item in enumerate(items):
+        if (index + 1) % COLUMNS:
+            editor.addConnection(item, items[index + 1], pass_context=True)
+        if index + COLUMNS < nodes:
+            editor.addConnection(item, items[index + COLUMNS])
+    editor.wrappers = [StateWrapper(item.state) for item in items]
+    return editor
+
+
+def large_editor():
+    global _editor
+    if _editor is None:
+        QApplication.instance() or QApplication([])
+        _editor = build_editor()
+        _editor.resize(1600, 1000)
+        _editor.show()
+        QApplication.processEvents()
+    return _editor
+
+
+def paint(zoomed_out: bool):
+    editor = large_editor()
+
+    def run():
+        editor.resetTransform()
+        if zoomed_out:
+            editor.fitInView(editor.scene.itemsBoundingRect())
+        else:
+            editor.centerOn(editor.scene.itemsBoundingRect().center())
+        editor.update_level_of_detail()
+        editor.grab()
+        return {"zoom": editor.get_zoom()}
+    return run
+
+
+if QApplication is not None:
+    @benchmark("editor.build_5000", group="editor", repeat=2, nodes=NODES, connections=2 * NODES - NODES // COLUMNS - COLUMNS)
+    def build():
+        QApplication.instance() or QApplication([])
+
+        def run():
+            editor = build_editor()
+            editor.clear_graph()
+        return run
+
+    @benchmark("editor.paint_zoomed_out", group="editor", nodes=NODES)
+    def paint_zoomed_out():
+        return paint(zoomed_out=True)
+
+    @benchmark("editor.paint_zoomed_in", group="editor", nodes=NODES)
+    def paint_zoomed_in():
+        return paint(zoomed_out=False)
+
+    @benchmark("editor.highlight_transitions", group="editor", nodes=NODES, transitions=1000)
+    def highlight_transitions():
+        editor = large_editor()
+
+        def run():
+            # What the editor sees while a run moves through 1000 states
+            for wrapper in editor.wrappers[:1000]:
+                editor.on_state_changed(wrapper)
+                QApplication.processEvents()
+                editor.on_state_finished(wrapper)
+            editor.clear_highlights()
+            QApplication.processEvents()
+        return run
@@ -0,0 +1,68 @@
+import math
+from typing import List, Tuple
+from harness import benchmark, use_mock_backend
+from agent_handler.agent import Agent
+from agent_handler.task import Task
+from state_machine.checkpoint import MemoryCheckpointStore
+from state_machine.engine import State, StateMachineEngine
+
+
+def make_state(name: str) -> State:
+    agent = Agent(name, f"Goal of {name}", f"Backstory of {name}", False)
+    agent.set_task(Task(f"Task for {name}", "A short answer"))
+    return State(agent)
+
+
+def build_layers(layer_sizes: List[int], fan_in: int, max_workers: int) -> Tuple[StateMachineEngine, List[int]]:
+    """Build a layered graph; every state is fed by up to ``fan_in`` states of the layer above."""
+    machine = StateMachineEngine(max_workers=max_workers, checkpoint_store=MemoryCheckpointStore())
+    previous = []
+    for depth, size in enumerate(layer_sizes):
+        layer = [make_state(f"s{depth}_{index}") for index in range(size)]
+        for index, state in enumerate(layer):
+            machine.add_state(state)
+            if previous:
+                for offset in range(min(fan_in, len(previous))):
+                    machine.add_transition(previous[(index + offset) % len(previous)], state, True)
+        previous = layer
+    return machine, layer_sizes
+
+
+def engine_benchmark(layer_sizes: List[int], latency: float, fan_in: int = 1, max_workers: int = 8):
+    use_mock_backend(latency=latency, completion_tokens=16)
+    machine, sizes = build_layers(layer_sizes, fan_in, max_workers)
+    # Best case: each layer takes one latency per wave of max_workers states
+    ideal = sum(math.ceil(size / max_workers) for size in sizes) * latency
+    states = sum(sizes)
+
+    def run():
+        machine.run()
+        wall = machine.get_metrics().wall_time
+        return {
+            "states": states,
+            "ideal_seconds": ideal,
+            "overhead_seconds": wall - ideal,
+            "overhead_per_state_ms": (wall - ideal) / states * 1000,
+        }
+    return run
+
+
+@benchmark("engine.chain", group="engine", states=20, latency=0.005)
+def chain():
+    return engine_benchmark([1] * 20, latency=0.005)
+
+
+@benchmark("engine.fan_out", group="engine", states=33, latency=0.005, max_workers=32)
+def fan_out():
+    return engine_benchmark([1, 32], latency=0.005, max_workers=32)
+
+
+@benchmark("engine.diamond", group="engine", states=18, latency=0.005, max_workers=16)
+def diamond():
+    return engine_benchmark([1, 16, 1], latency=0.005, fan_in=16, max_workers=16)
+
+
+@benchmark("engine.layered_1000", group="engine", repeat=3, states=1000, latency=0.0, fan_in=2)
+def layered_1000():
+    # No simulated latency, so the run time is scheduling, context passing and bookkeeping alone
+    return engine_benchmark([10] * 100, latency=0.0, fan_in=2)
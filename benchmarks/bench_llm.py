@@ -0,0 +1,167 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from harness import benchmark, use_mock_backend
+from llm_wrap_lib.shared_config import SharedConfig
+from agent_handler.agent import Agent
+from agent_handler.task import Task
+from llm_wrap_lib.llm_wrap import DynamicLLMWrapper
+from tool_handler.tool import Param, Tool
+from tool_handler.tool_bank import ToolBank
+
+LOOKUP_TOOL = "benchmark_lookup"
+
+
+def lookup(key: str) -> str:
+    return f"value of {key}"
+
+
+def make_agent(name: str = "bench") -> Agent:
+    agent = Agent(name, "Answer questions", "A benchmark agent", False)
+    agent.set_task(Task("Look something up", "The value"))
+    return agent
+
+
+def slow_lookup(key: str) -> str:
+    time.sleep(0.005)
+    return f"value of {key}"
+
+
+def tool_loop(rounds: int, calls_per_round: int, function=lookup, pure: bool = False):
+    latency = 0.002
+    tool = Tool(LOOKUP_TOOL, "Look up the value of a key", function, pure=pure)
+    tool.define_function_param([Param("key", "string", "Key to look up", True)])
+    ToolBank().add_tool(tool)
+    use_mock_backend(
+        latency=latency,
+        tool_calls=[{"name": LOOKUP_TOOL, "arguments": {"key": f"k{index}"}} for index in range(calls_per_round)],
+        tool_call_rate=1.0,
+        max_tool_rounds=rounds,
+    )
+    agent = make_agent()
+    agent.add_tool(tool)
+
+    def run():
+        agent.execute_task()
+        response = agent.get_last_response()
+        completions = response.get_iterations()
+        return {
+            "completions": completions,
+            "tool_calls": response.get_tool_call_count(),
+            "overhead_per_completion_ms": (response.get_wall_time() - completions * latency) / completions * 1000,
+        }
+    return run
+
+
+@benchmark("llm.tool_loop_1x1", group="llm", rounds=1, calls_per_round=1)
+def tool_loop_single():
+    return tool_loop(rounds=1, calls_per_round=1)
+
+
+@benchmark("llm.tool_loop_5x4", group="llm", rounds=5, calls_per_round=4)
+def tool_loop_parallel():
+    return tool_loop(rounds=5, calls_per_round=4)
+
+
+@benchmark("llm.tool_loop_5x4_slow_tool", group="llm", rounds=5, calls_per_round=4, tool_seconds=0.005)
+def tool_loop_slow_tool():
+    return tool_loop(rounds=5, calls_per_round=4, function=slow_lookup)
+
+
+# Every round asks for the same keys, so after the first round the pure tool's answers are cached
+@benchmark("llm.tool_loop_5x4_memoized", group="llm", rounds=5, calls_per_round=4, tool_seconds=0.005)
+def tool_loop_memoized():
+    return tool_loop(rounds=5, calls_per_round=4, function=slow_lookup, pure=True)
+
+
+@benchmark("llm.stream_1000_chunks", group="llm", completion_tokens=1000)
+def stream():
+    use_mock_backend(latency=0.0, completion_tokens=1000)
+    agent = make_agent()
+    deltas = []
+
+    def run():
+        deltas.clear()
+        agent.execute_task(on_delta=deltas.append)
+        return {"chunks": len(deltas)}
+    return run
+
+
+@benchmark("llm.retries", group="llm", calls=50, error_rate=0.3)
+def retries():
+    use_mock_backend(latency=0.0, error_rate=0.3, error_status_codes=[503])
+    wrapper = DynamicLLMWrapper()
+
+    def run():
+        wrapper.reset_costs()
+        failed = 0
+        for _ in range(50):
+            try:
+                wrapper.call_model("Hi")
+            except Exception:
+                failed += 1
+        return {"retries": wrapper.get_cost_summary()["reliability"]["retries"], "failed": failed}
+    return run
+
+
+@benchmark("llm.acall_model_concurrent", group="llm", calls=200, latency=0.01)
+def acall_concurrent():
+    use_mock_backend(latency=0.01)
+    wrapper = DynamicLLMWrapper()
+
+    async def call_all():
+        await asyncio.gather(*(wrapper.acall_model(f"Question {index}") for index in range(200)))
+
+    def run():
+        asyncio.run(call_all())
+    return run
+
+
+def concurrent_calls(batching: bool):
+    use_mock_backend(latency=0.01)
+    SharedConfig().data["batching"] = {"enabled": batching, "window_ms": 5, "max_batch_size": 16}
+    wrappers = [DynamicLLMWrapper() for _ in range(16)]
+    backend = wrappers[0].backend
+    for wrapper in wrappers:
+        wrapper.backend = backend
+    pool = ThreadPoolExecutor(max_workers=16)
+
+    def run():
+        backend.reset_stats()
+        batched = wrappers[0].get_batching_stats().get("batched_requests", 0)
+        list(pool.map(lambda index: wrappers[index % 16].call_model(f"Question {index}"), range(64)))
+        stats = backend.get_stats()
+        batched = wrappers[0].get_batching_stats().get("batched_requests", 0) - batched
+        # A batch is one round trip to the provider however many requests it carries
+        return {"round_trips_per_call": (stats["requests"] - batched + stats["batches"]) / 64}
+    return run
+
+
+@benchmark("llm.concurrent_calls", group="llm", calls=64, threads=16, latency=0.01)
+def concurrent_calls_unbatched():
+    return concurrent_calls(batching=False)
+
+
+@benchmark("llm.concurrent_calls_batched", group="llm", calls=64, threads=16, latency=0.01, window_ms=5)
+def concurrent_calls_batched():
+    return concurrent_calls(batching=True)
+
+
+@benchmark("llm.construct_wrappers", group="llm", wrappers=1000)
+def construct_wrappers():
+    use_mock_backend()
+
+    def run():
+        for _ in range(1000):
+            DynamicLLMWrapper()
+    return run
+
+
+@benchmark("llm.construct_agents", group="llm", agents=1000)
+def construct_agents():
+    use_mock_backend()
+
+    def run():
+        for index in range(1000):
+            make_agent(f"agent{index}")
+    return run
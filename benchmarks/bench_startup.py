@@ -0,0 +1,25 @@
+from harness import benchmark
+from profile_imports import profile_import
+
+# Creating the sample agents is part of opening the editor; it must not import litellm or discover models
+SAMPLE_AGENTS = (
+    "import sys; from main import create_sample_agents; create_sample_agents(); "
+    "assert 'litellm' not in sys.modules, 'litellm was imported at startup'"
+)
+
+
+def import_benchmark(statement: str):
+    def run():
+        profile = profile_import(statement)
+        return {"import_seconds": profile["total"], "modules": len(profile["modules"])}
+    return run
+
+
+@benchmark("startup.import_engine", group="startup", repeat=3)
+def import_engine():
+    return import_benchmark("import state_machine.engine")
+
+
+@benchmark("startup.sample_agents", group="startup", repeat=3)
+def sample_agents():
+    return import_benchmark(SAMPLE_AGENTS)
@@ -0,0 +1,36 @@
+import shutil
+import tempfile
+from harness import benchmark
+from transcript_handler.transcript import FileTranscriptSink, MemoryTranscriptSink
+
+RECORD = {
+    "timestamp": 0.0,
+    "run_id": "benchmark",
+    "state": "writer",
+    "agent": "writer",
+    "type": "response",
+    "response": "lorem ipsum " * 50,
+    "cost": "0.0001",
+}
+
+
+@benchmark("transcript.file_10k", group="transcript", records=10000)
+def file_sink():
+    directory = tempfile.mkdtemp(prefix="transcript-bench-")
+
+    def run():
+        sink = FileTranscriptSink(directory, "transcript.jsonl")
+        for _ in range(10000):
+            sink.write(RECORD)
+        sink.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    return run
+
+
+@benchmark("transcript.memory_10k", group="transcript", records=10000)
+def memory_sink():
+    def run():
+        sink = MemoryTranscriptSink()
+        for _ in range(10000):
+            sink.write(RECORD)
+    return run
@@ -0,0 +1,125 @@
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from llm_wrap_lib.shared_config import SharedConfig  # noqa: E402
+
+
+class Benchmark:
+    """One named benchmark.
+
+    ``setup`` is called once and returns the function to time; that function
+    may return a dict of extra figures (e.g. scheduling overhead), which are
+    averaged over the repeats and reported next to the timings.
+    """
+
+    def __init__(self, name: str, group: str, setup: Callable[[], Callable[[], Optional[Dict[str, float]]]],
+                 params: Dict[str, Any], repeat: Optional[int] = None):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.params = params
+        self.repeat = repeat
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, group: str, repeat: int = None, **params):
+    """Register a setup function as a benchmark; ``params`` are recorded in the results."""
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, group, setup, params, repeat))
+        return setup
+    return register
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def run_benchmark(bench: Benchmark, repeat: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    repeat = bench.repeat or repeat
+    function = bench.setup()
+    for _ in range(warmup):
+        function()
+
+    times = []
+    extras: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        # Collect between repeats so a collection inside one does not skew it
+        gc.collect()
+        started = time.perf_counter()
+        extra = function()
+        times.append(time.perf_counter() - started)
+        for key, value in (extra or {}).items():
+            extras.setdefault(key, []).append(value)
+
+    return {
+        "name": bench.name,
+        "group": bench.group,
+        "params": bench.params,
+        "repeat": repeat,
+        "seconds": {
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+            "p95": percentile(times, 95),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        },
+        "extra": {key: statistics.mean(values) for key, values in extras.items()},
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(SRC_DIR), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.time(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return a message for every benchmark whose median is more than max_regression slower than the baseline."""
+    previous = {result["name"]: result for result in baseline.get("benchmarks", [])}
+    regressions = []
+    for result in results:
+        if result["name"] not in previous:
+            continue
+        before = previous[result["name"]]["seconds"]["median"]
+        after = result["seconds"]["median"]
+        if before > 0 and after > before * (1 + max_regression):
+            regressions.append(f"{result['name']}: median {before * 1000:.2f}ms -> {after * 1000:.2f}ms "
+                               f"(+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def use_mock_backend(**options) -> Dict[str, Any]:
+    """Point every DynamicLLMWrapper created from now on at a MockBackend with these options.
+
+    The shared config is changed in memory only; it is never saved.
+    """
+    config = SharedConfig().data
+    config["mock_backend"] = {"models": ["mock-model"], "seed": 0, **options}
+    config["mocking"] = False
+    config["cache"] = {"enabled": False}
+    config["batching"] = {"enabled": False}
+    config["retry"] = {"max_attempts": 3, "base_delay": 0.0, "max_delay": 0.0, "jitter": 0.0}
+    config["fallbacks"] = {}
+    return config["mock_backend"]
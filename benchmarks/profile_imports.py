@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+DEFAULT_MODULES = ["main"]
+
+
+def profile_import(statement: str) -> Dict[str, Any]:
+    """Run ``statement`` in a fresh interpreter with -X importtime and return the parsed timings.
+
+    Each module's ``self`` and ``cumulative`` times are in seconds; ``total``
+    is the cumulative time of the top-level imports.
+    """
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, environment.get("PYTHONPATH")]))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=SRC_DIR,
+                               env=environment, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{completed.stderr.strip().splitlines()[-1]}")
+
+    modules: List[Dict[str, Any]] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+        })
+    return {
+        "statement": statement,
+        "total": sum(module["cumulative"] for module in modules if module["depth"] == 0),
+        "modules": modules,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the import time of the application's entry points.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES,
+                        help="Modules to import, relative to src/ (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to list")
+    parser.add_argument("--json", default=None, help="Also write the full profile to this JSON file")
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="Exit with an error if any module takes longer than this to import")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiles = []
+    for module in args.modules:
+        profile = profile_import(f"import {module}")
+        profiles.append(profile)
+        print(f"import {module}: {profile['total'] * 1000:.1f}ms")
+        for entry in sorted(profile["modules"], key=lambda entry: entry["cumulative"], reverse=True)[:args.top]:
+            print(f"  {entry['cumulative'] * 1000:9.1f}ms  {entry['self'] * 1000:8.1f}ms self  {entry['module']}")
+        print()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(profiles, file, indent=2)
+
+    slow = [profile for profile in profiles if args.max_seconds is not None and profile["total"] > args.max_seconds]
+    for profile in slow:
+        print(f"{profile['statement']} took {profile['total']:.3f}s, over the {args.max_seconds}s budget", file=sys.stderr)
+    return 1 if slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import argparse
+import json
+import logging
+import sys
+import harness
+import bench_editor  # noqa: F401
+import bench_engine  # noqa: F401
+import bench_llm  # noqa: F401
+import bench_startup  # noqa: F401
+import bench_transcript  # noqa: F401
+from state_machine.checkpoint import MemoryCheckpointStore, set_default_store
+from transcript_handler.transcript import NullTranscriptSink, set_default_sink
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite and write the results as JSON.")
+    parser.add_argument("--output", default="-", help="Where to write the results JSON (default: stdout)")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="Only run benchmarks whose name contains this text; may be repeated")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats per benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before the timed repeats")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare medians against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail if a median is this fraction slower than the baseline (default: 0.2)")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+    selected = [bench for bench in harness.BENCHMARKS
+                if not args.filter or any(text in bench.name for text in args.filter)]
+    if args.list:
+        for bench in selected:
+            print(f"{bench.name}\t{json.dumps(bench.params)}")
+        return 0
+
+    # Keep benchmark runs from writing transcripts and checkpoints to the working directory
+    set_default_sink(NullTranscriptSink())
+    set_default_store(MemoryCheckpointStore())
+
+    results = []
+    for bench in selected:
+        result = harness.run_benchmark(bench, repeat=args.repeat, warmup=args.warmup)
+        results.append(result)
+        print(f"{bench.name:<32} median {result['seconds']['median'] * 1000:9.2f}ms"
+              f"  p95 {result['seconds']['p95'] * 1000:9.2f}ms", file=sys.stderr)
+
+    output = {"environment": harness.environment(), "benchmarks": results}
+    text = json.dumps(output, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = harness.compare(results, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
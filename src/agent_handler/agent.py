@@ -1,28 +1,39 @@
-import os
+import time
 from textwrap import dedent
 from llm_wrap_lib.llm_wrap import DynamicLLMWrapper
 from agent_handler.task import Task
+from agent_handler.prompt_registry import PromptTemplateRegistry
 from tool_handler.tool import Tool
+from transcript_handler.transcript import TranscriptSink, get_default_sink
+from trace_handler.tracer import get_tracer
 import logging
 
 
 class Agent:
-    def __init__(self, name, goal, backstory, verbose, json_output=False):
+    def __init__(self, name, goal, backstory, verbose, json_output=False, prompt_template=None, temperature=None):
         self._name = name
         self._goal = goal
         self._backstory = backstory
         self._verbose = verbose
         self._json_output = json_output
+        self._prompt_template = prompt_template
+        self._temperature = temperature
         self._current_task = None
         self._llm_wrapper = DynamicLLMWrapper()  # Initialize once
+        self._llm_wrapper.cache_scope = name
         self.tools = []
         self.previous_agent_context = None  # Add this line
+        self._last_response = None
+        self._transcript_sink = None
+        self._run_id = None
+        self._state_name = None
 
     def get_name(self):
         return self._name
 
     def set_name(self, new_name):
         self._name = new_name
+        self._llm_wrapper.cache_scope = new_name
 
     def add_tool(self, tool: Tool):
         self.tools.append(tool)
@@ -57,70 +68,157 @@ class Agent:
     def set_json_output(self, json_output):
         self._json_output = json_output
 
+    def get_temperature(self):
+        """Return the sampling temperature for this agent's calls.
+
+        Without one set on the agent, the wrapper's default is used: 0 while a
+        response cache only keeps deterministic calls, so that repeated runs hit it.
+        """
+        if self._temperature is not None:
+            return self._temperature
+        return self._llm_wrapper.default_temperature()
+
+    def set_temperature(self, temperature):
+        self._temperature = temperature
+
+    def get_transcript_sink(self) -> TranscriptSink:
+        return self._transcript_sink if self._transcript_sink is not None else get_default_sink()
+
+    def set_transcript_sink(self, sink: TranscriptSink):
+        self._transcript_sink = sink
+
+    def set_transcript_context(self, run_id, state_name):
+        """Tag subsequent transcript records with the run and state they belong to."""
+        self._run_id = run_id
+        self._state_name = state_name
+
+    def get_cost_summary(self):
+        return self._llm_wrapper.get_cost_summary()
+
+    def get_llm_wrapper(self):
+        return self._llm_wrapper
+
+    def get_last_response(self):
+        """Return the full Response (tokens, timings, model) of the last executed task."""
+        return self._last_response
+
+    def get_prompt_template(self):
+        """Return the name of the prompt template used for the current task.
+
+        A template named on the task wins over the agent's own, which wins over
+        the registry default (prompt.txt).
+        """
+        if self._current_task is not None and self._current_task.get_prompt_template():
+            return self._current_task.get_prompt_template()
+        return self._prompt_template or PromptTemplateRegistry.DEFAULT_TEMPLATE
+
+    def set_prompt_template(self, template_name):
+        self._prompt_template = template_name
+
+    def describe_inputs(self):
+        """Return everything that determines this agent's response, for fingerprinting a state."""
+        task = self._current_task
+        return {
+            "name": self._name,
+            "goal": self._goal,
+            "backstory": self._backstory,
+            "json_output": self._json_output,
+            "task": None if task is None else {
+                "description": task.get_description(),
+                "expected_output": task.get_expected_output(),
+                "output_json": task.is_output_json(),
+            },
+            "prompt_template": PromptTemplateRegistry().get(self.get_prompt_template()).source,
+            "model": self._llm_wrapper.default_model,
+            "temperature": self.get_temperature(),
+            "mocking": self._llm_wrapper.is_mocking(),
+            "tools": [tool.export() for tool in self.tools],
+        }
+
     def set_previous_agent_context(self, context):
         logging.debug(f"Setting previous agent context for {self.get_name()}: {context[:100]}...")  # Log first 100 chars
         self.previous_agent_context = context
-        self.write_context_to_file(context)
+        self.write_context_to_transcript(context)
 
     def read_prompt_from_file(self, file_path):
         with open(file_path, 'r') as file:
             return file.read().strip()
         
 
-    def write_response_to_file(self, description, expected_output, response):
-            response_content = (
-f"""
-<user>
-    Agent: {self.get_name()}
-    description of task: {description}
-    Expected Output: {expected_output}
-</user>
-<ai_response>
-    Response: {response.get_response_content()}
-    Cost for response: {response.get_cost()}
-</ai_response>
-""")
-            with open('response.txt', 'a', encoding='utf-8') as file:
-                file.write(response_content)
-    def write_context_to_file(self, context):
-        with open('context.txt', 'a', encoding='utf-8') as file:
-            file.write(f"Context for {self.get_name()}:\n{context}\n\n")
-        logging.debug(f"Wrote context to file for {self.get_name()}")
-
-    def execute_task(self):
-        if self._current_task is None:
-            raise ValueError("No task is set for the agent")
-        
-        logging.debug(f"Executing task for {self.get_name()}")
-        
-        tools = [tool.export() for tool in self.tools]
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        prompt_file = os.path.join(script_dir, "prompt.txt")
-
-        prompt_template = self.read_prompt_from_file(prompt_file)
-
-        
-        description = self._current_task.get_description()
-        expected_output = self._current_task.get_expected_output()
-
-        formatted_prompt = prompt_template.format(
+    def _write_transcript_record(self, record_type, **fields):
+        self.get_transcript_sink().write({
+            "timestamp": time.time(),
+            "run_id": self._run_id,
+            "state": self._state_name,
+            "agent": self.get_name(),
+            "type": record_type,
+            **fields
+        })
+
+    def write_response_to_transcript(self, description, expected_output, response):
+        self._write_transcript_record(
+            "response",
             description=description,
             expected_output=expected_output,
-            agent_name=self.get_name(),
-            agent_goal=self.get_goal(),
-            agent_backstory=self.get_backstory(),
-            previous_agent_context=self.previous_agent_context
+            response=response.get_response_content(),
+            cost=response.get_cost()
         )
-        logging.debug(f"Formatted prompt for {self.get_name()}: {formatted_prompt[:100]}...")  # Log first 100 chars
-
-        self.write_context_to_file(formatted_prompt) 
-
-        if self._json_output:
-            formatted_prompt += "\nPlease provide your response in JSON format."
-        
-        response = self._llm_wrapper.call_model(formatted_prompt, tools=tools)
-        logging.debug(f"Response received for {self.get_name()}: {response.get_response_content()[:100]}...")  # Log first 100 chars
-
-        self.write_response_to_file(description, expected_output, response)
 
-        return response.get_response_content()
+    def write_context_to_transcript(self, context):
+        self._write_transcript_record("context", context=context)
+        logging.debug(f"Wrote context to transcript for {self.get_name()}")
+
+    def write_prompt_to_transcript(self, prompt):
+        self._write_transcript_record("prompt", prompt=prompt)
+
+    def execute_task(self, on_delta=None, context=None):
+        """Run the current task and return the response content.
+
+        If on_delta is given the model is streamed and on_delta is called with
+        each text chunk as it arrives. A context string is shown to the model
+        as the previous agents' context for this call only.
+        """
+        with get_tracer().span("agent.execute_task", agent=self.get_name(), streamed=on_delta is not None):
+            if self._current_task is None:
+                raise ValueError("No task is set for the agent")
+
+            logging.debug(f"Executing task for {self.get_name()}")
+
+            tools = [tool.export() for tool in self.tools]
+
+            description = self._current_task.get_description()
+            expected_output = self._current_task.get_expected_output()
+            if context is not None:
+                self.write_context_to_transcript(context)
+
+            formatted_prompt = PromptTemplateRegistry().render(
+                self.get_prompt_template(),
+                description=description,
+                expected_output=expected_output,
+                agent_name=self.get_name(),
+                agent_goal=self.get_goal(),
+                agent_backstory=self.get_backstory(),
+                previous_agent_context=self.previous_agent_context if context is None else context
+            )
+            logging.debug(f"Formatted prompt for {self.get_name()}: {formatted_prompt[:100]}...")  # Log first 100 chars
+
+            self.write_prompt_to_transcript(formatted_prompt)
+
+            if self._json_output:
+                formatted_prompt += "\nPlease provide your response in JSON format."
+
+            temperature = self.get_temperature()
+            sampling = {} if temperature is None else {"temperature": temperature}
+            if on_delta is None:
+                response = self._llm_wrapper.call_model(formatted_prompt, tools=tools, **sampling)
+            else:
+                stream = self._llm_wrapper.stream_model(formatted_prompt, tools=tools, **sampling)
+                for delta in stream:
+                    on_delta(delta)
+                response = stream.get_response()
+            logging.debug(f"Response received for {self.get_name()}: {response.get_response_content()[:100]}...")  # Log first 100 chars
+
+            self._last_response = response
+            self.write_response_to_transcript(description, expected_output, response)
+
+            return response.get_response_content()
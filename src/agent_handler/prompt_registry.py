@@ -0,0 +1,104 @@
+import os
+import string
+import threading
+import time
+from typing import Dict, Optional
+
+
+class PromptTemplate:
+    """A prompt template parsed once into literal text and replacement fields."""
+
+    def __init__(self, name: str, source: str, path: Optional[str] = None, mtime: Optional[float] = None):
+        self.name = name
+        self.source = source
+        self.path = path
+        self.mtime = mtime
+        self._segments = list(string.Formatter().parse(source))
+        self.fields = {field for _, field, _, _ in self._segments if field}
+        # Plain "{name}" fields can be rendered by a join; anything fancier uses str.format
+        self._simple = all(
+            field is None or (field.isidentifier() and not spec and not conversion)
+            for _, field, spec, conversion in self._segments
+        )
+
+    def render(self, **values) -> str:
+        if not self._simple:
+            return self.source.format(**values)
+        parts = []
+        for literal, field, _, _ in self._segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+
+class PromptTemplateRegistry:
+    """Process-wide registry of named prompt templates.
+
+    File-backed templates are read once and re-read only when the file's
+    modification time changes. The mtime is checked at most once every
+    ``check_interval`` seconds (never, if it is None), so rendering in a tight
+    loop does no file I/O.
+    """
+    _instance = None
+    DEFAULT_TEMPLATE = "default"
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(PromptTemplateRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, check_interval: Optional[float] = 1.0):
+        if not hasattr(self, '_templates'):
+            self._templates: Dict[str, PromptTemplate] = {}
+            self._last_checked: Dict[str, float] = {}
+            self._lock = threading.Lock()
+            self.check_interval = check_interval
+            default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt.txt")
+            self.register(self.DEFAULT_TEMPLATE, default_path)
+
+    @staticmethod
+    def _load(name: str, path: str) -> PromptTemplate:
+        mtime = os.path.getmtime(path)
+        with open(path, 'r') as file:
+            return PromptTemplate(name, file.read().strip(), path=path, mtime=mtime)
+
+    def register(self, name: str, path: str) -> PromptTemplate:
+        """Register (or replace) a template backed by a file."""
+        template = self._load(name, path)
+        with self._lock:
+            self._templates[name] = template
+            self._last_checked[name] = time.monotonic()
+        return template
+
+    def register_source(self, name: str, source: str) -> PromptTemplate:
+        """Register (or replace) a template from a string."""
+        template = PromptTemplate(name, source)
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def has_template(self, name: str) -> bool:
+        return name in self._templates
+
+    def get(self, name: str = None) -> PromptTemplate:
+        name = name or self.DEFAULT_TEMPLATE
+        with self._lock:
+            template = self._templates.get(name)
+            if template is None:
+                raise KeyError(f"Prompt template {name} is not registered")
+            if template.path is None or self.check_interval is None:
+                return template
+            now = time.monotonic()
+            if now - self._last_checked.get(name, 0.0) < self.check_interval:
+                return template
+            self._last_checked[name] = now
+
+        if os.path.getmtime(template.path) != template.mtime:
+            template = self._load(name, template.path)
+            with self._lock:
+                self._templates[name] = template
+        return template
+
+    def render(self, name: str = None, **values) -> str:
+        return self.get(name).render(**values)
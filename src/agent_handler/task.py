@@ -1,8 +1,9 @@
 class Task:
-    def __init__(self, description: str, expected_output: str, output_json: bool = False) -> None:
+    def __init__(self, description: str, expected_output: str, output_json: bool = False, prompt_template: str = None) -> None:
         self._description = description
         self._expected_output = expected_output
         self._output_json = output_json
+        self._prompt_template = prompt_template
 
     def get_description(self) -> str:
         return self._description
@@ -20,4 +21,10 @@ class Task:
         return self._output_json
 
     def set_output_json(self, new_output_json: bool) -> None:
-        self._output_json = new_output_json
\ No newline at end of file
+        self._output_json = new_output_json
+
+    def get_prompt_template(self) -> str:
+        return self._prompt_template
+
+    def set_prompt_template(self, prompt_template: str) -> None:
+        self._prompt_template = prompt_template
\ No newline at end of file
@@ -0,0 +1,68 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, List
+
+
+class BackgroundBatchWriter:
+    """Hands queued items to ``handle`` in batches from a daemon thread.
+
+    put() only enqueues, so callers never wait on the destination. The thread
+    drains the queue in batches of up to ``batch_size`` items, or whatever has
+    arrived within ``flush_interval`` seconds of the first. An exception from
+    ``handle`` is logged and the batch dropped; the thread keeps running, so
+    flush() and close() always return.
+    """
+    _SENTINEL = object()
+
+    def __init__(self, handle: Callable[[List[Any]], None], name: str, batch_size: int = 100,
+                 flush_interval: float = 0.5):
+        self._handle = handle
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any) -> None:
+        self._queue.put(item)
+
+    def flush(self) -> None:
+        """Block until every item put so far has been handled."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Handle what is still queued and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._SENTINEL)
+        self._thread.join()
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size and batch[-1] is not self._SENTINEL:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            items = [item for item in batch if item is not self._SENTINEL]
+            running = len(items) == len(batch)
+            try:
+                if items:
+                    self._handle(items)
+            except Exception as e:
+                logging.error(f"{self._thread.name} dropped {len(items)} items: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
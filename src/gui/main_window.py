@@ -3,29 +3,17 @@ from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog, 
     QComboBox, QSplitter, QLabel, QListWidget, QListWidgetItem, QMessageBox
 )
-from PySide6.QtCore import Qt, QThread, Slot, Signal, QObject
-from gui.node_editor import NodeEditor, Connection
+from PySide6.QtCore import Qt, QTimer, Slot
+from gui.node_editor import NodeEditor
 from gui.sidebar import Sidebar
 from gui.agent_widget import DraggableAgentWidget
 from gui.state import StateMachine
-from gui.agent_widget import DraggableAgentWidget
+from gui.run_manager import RunManager
+from state_machine.checkpoint import RUN_FAILED
 import json
 
-class StateMachineWorker(QObject):
-    finished = Signal()
-    error = Signal(str)
-
-    def __init__(self, state_machine):
-        super().__init__()
-        self.state_machine = state_machine
-
-    @Slot()
-    def run(self):
-        try:
-            self.state_machine.run()
-            self.finished.emit()
-        except Exception as e:
-            self.error.emit(str(e))
+# How long closing the window waits for cancelled runs to record their status
+CLOSE_TIMEOUT_SECONDS = 1.0
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -66,9 +54,30 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(load_button)
 
         run_button = QPushButton("Run State Machine")
-        run_button.clicked.connect(self.run_state_machine)
+        run_button.clicked.connect(lambda: self.run_state_machine())
         button_layout.addWidget(run_button)
 
+        # Runs every state again, e.g. to re-sample agents whose temperature is above 0
+        force_run_button = QPushButton("Run (Force)")
+        force_run_button.clicked.connect(lambda: self.run_state_machine(force=True))
+        button_layout.addWidget(force_run_button)
+
+        resume_button = QPushButton("Resume Last Run")
+        resume_button.clicked.connect(self.resume_state_machine)
+        button_layout.addWidget(resume_button)
+
+        pause_button = QPushButton("Pause")
+        pause_button.clicked.connect(self.pause_run)
+        button_layout.addWidget(pause_button)
+
+        continue_button = QPushButton("Continue")
+        continue_button.clicked.connect(self.continue_run)
+        button_layout.addWidget(continue_button)
+
+        cancel_button = QPushButton("Cancel Run")
+        cancel_button.clicked.connect(self.cancel_run)
+        button_layout.addWidget(cancel_button)
+
         self.agents_list = QListWidget()
         self.agents_list.setFlow(QListWidget.LeftToRight)
         self.agents_list.setWrapping(False)
@@ -78,6 +87,12 @@ class MainWindow(QMainWindow):
         content_layout.addWidget(QLabel("Draggable Agents:"))
         content_layout.addWidget(self.agents_list)
 
+        # One line per run started in this session, showing its status and progress
+        self.runs_list = QListWidget()
+        self.runs_list.setMaximumHeight(80)
+        content_layout.addWidget(QLabel("Runs:"))
+        content_layout.addWidget(self.runs_list)
+
         self.node_editor = NodeEditor(self.agents)
         content_layout.addWidget(self.node_editor)
 
@@ -90,9 +105,17 @@ class MainWindow(QMainWindow):
 
         self.node_editor.node_clicked.connect(self.update_sidebar_on_click)
         self.node_editor.node_properties_updated.connect(self.update_sidebar_with_context_and_response)
-
-        self.worker = None
-        self.thread = None
+        self.node_editor.node_response_chunk.connect(self.update_sidebar_with_response_chunk)
+        self.sidebar_state = None
+
+        self.run_manager = RunManager(self)
+        self.run_manager.run_updated.connect(self.update_run_item)
+        self.run_manager.run_finished.connect(self.on_run_finished)
+        self.run_items = {}
+        # Keeps the elapsed time of active runs current between state transitions
+        self.run_timer = QTimer(self)
+        self.run_timer.timeout.connect(self.update_run_items)
+        self.run_timer.start(1000)
 
     def toggle_sidebar(self, show):
         if show:
@@ -130,15 +153,8 @@ class MainWindow(QMainWindow):
     def save_state_machine(self):
         file_name, _ = QFileDialog.getSaveFileName(self, "Save State Machine", "", "JSON Files (*.json)")
         if file_name:
+            # Connections and their "Pass Context" toggles are kept in the state machine's transitions
             data = self.node_editor.state_machine.to_dict()
-            for state in data['states']:
-                state['connections'] = []
-                for connection in self.node_editor.scene.items():
-                    if isinstance(connection, Connection) and connection.start_item.state.get_name() == state['name']:
-                        state['connections'].append({
-                            'to': connection.end_item.state.get_name(),
-                            'pass_context': connection.pass_context
-                        })
             with open(file_name, 'w') as f:
                 json.dump(data, f)
 
@@ -147,24 +163,21 @@ class MainWindow(QMainWindow):
         if file_name:
             with open(file_name, 'r') as f:
                 data = json.load(f)
-                self.node_editor.state_machine = StateMachine.from_dict(data, self.agents)
-                self.node_editor.scene.clear()
-                node_items = {}
-                for state_data in data['states']:
-                    state = next(s for s in self.node_editor.state_machine.states if s.get_name() == state_data['name'])
-                    node_item = self.node_editor.addNode(state.agent, state_data['x'], state_data['y'])
-                    node_items[state.get_name()] = node_item
-                for state_data in data['states']:
-                    for connection_data in state_data.get('connections', []):
-                        from_item = node_items[state_data['name']]
-                        to_item = node_items[connection_data['to']]
-                        connection = Connection(from_item, to_item, connection_data['pass_context'])
-                        self.node_editor.scene.addItem(connection)
+            # The nodes show the states and transitions from_dict built, so each agent runs once per run
+            self.node_editor.load_state_machine(StateMachine.from_dict(data, self.agents))
+
+    def format_context(self, state):
+        if not state.context:
+            return "No context"
+        if state.context_tokens:
+            return f"{state.context}\n\n(Context: {state.context_tokens['before']} tokens, {state.context_tokens['after']} after compaction)"
+        return str(state.context)
 
     def update_sidebar_on_click(self, state_wrapper):
         state = state_wrapper.get_state()
+        self.sidebar_state = state
         self.sidebar.update_properties(state.agent)
-        context_text = str(state.context) if state.context else "No context"
+        context_text = self.format_context(state)
         response_text = str(state.get_response()) if state.get_response() else "No response yet"
         self.sidebar.update_context_and_response(context_text, response_text)
         if not self.sidebar.content.isVisible():
@@ -172,37 +185,98 @@ class MainWindow(QMainWindow):
 
     def update_sidebar_with_context_and_response(self, state_wrapper):
         state = state_wrapper.get_state()
+        self.sidebar_state = state
         self.sidebar.update_properties(state.agent)
-        context_text = str(state.context) if state.context else "No context"
+        context_text = self.format_context(state)
         response_text = str(state.get_response()) if state.get_response() else "No response yet"
         self.sidebar.update_context_and_response(context_text, response_text)
         if not self.sidebar.content.isVisible():
             self.toggle_sidebar(True)
 
-    def run_state_machine(self):
-        initial_state = next(iter(self.node_editor.state_machine.states), None)
-        if initial_state:
-            self.node_editor.state_machine.set_initial_state(initial_state)
-
-            self.thread = QThread()
-            self.worker = StateMachineWorker(self.node_editor.state_machine)
-            self.worker.moveToThread(self.thread)
-
-            self.thread.started.connect(self.worker.run)
-            self.worker.finished.connect(self.thread.quit)
-            self.worker.finished.connect(self.worker.deleteLater)
-            self.thread.finished.connect(self.thread.deleteLater)
-            self.worker.error.connect(self.handle_error)
-
-            self.thread.start()
-        else:
+    def update_sidebar_with_response_chunk(self, state_wrapper, chunk):
+        # Only stream into the sidebar if it is showing the state that produced the chunk
+        if state_wrapper.get_state() is self.sidebar_state:
+            self.sidebar.append_response_chunk(chunk)
+
+    def resume_state_machine(self):
+        run_id = self.node_editor.state_machine.get_checkpoint_store().get_latest_run(unfinished_only=True)
+        if run_id is None:
+            QMessageBox.information(self, "Resume", "There is no unfinished run to resume.")
+            return
+        self.run_state_machine(run_id)
+
+    def run_state_machine(self, run_id=None, force=False):
+        """Start a run of the graph; unless ``force`` is set, unchanged states reuse their earlier results."""
+        state_machine = self.node_editor.state_machine
+        if not state_machine.states:
             print("No states in the state machine.")
+            return
+        if self.run_manager.get_active_run(state_machine) is not None:
+            QMessageBox.information(self, "Run", "This graph is already running. Cancel the run or wait for it to finish.")
+            return
+        # Run every entry point of the graph; independent branches are scheduled concurrently
+        state_machine.current_state = None
+        state_machine.stream = True
+        state_machine.incremental = not force
+        run = self.run_manager.start(state_machine, run_id)
+
+        previous = self.run_items.pop(run.run_id, None)
+        if previous is not None:
+            # A resumed run replaces the line of the run it continues
+            self.runs_list.takeItem(self.runs_list.row(previous))
+        item = QListWidgetItem(run.describe())
+        item.setData(Qt.ItemDataRole.UserRole, run.run_id)
+        self.runs_list.insertItem(0, item)
+        self.runs_list.setCurrentItem(item)
+        self.run_items[run.run_id] = item
+
+    def get_selected_run_id(self):
+        """Return the run selected in the runs list, or else the active run of the graph being edited."""
+        item = self.runs_list.currentItem()
+        if item is not None:
+            return item.data(Qt.ItemDataRole.UserRole)
+        run = self.run_manager.get_active_run(self.node_editor.state_machine)
+        return run.run_id if run is not None else None
+
+    def pause_run(self):
+        run_id = self.get_selected_run_id()
+        if run_id is not None:
+            self.run_manager.pause(run_id)
+
+    def continue_run(self):
+        run_id = self.get_selected_run_id()
+        if run_id is not None:
+            self.run_manager.resume(run_id)
+
+    def cancel_run(self):
+        run_id = self.get_selected_run_id()
+        if run_id is not None:
+            self.run_manager.cancel(run_id)
+
+    @Slot(str)
+    def update_run_item(self, run_id):
+        item = self.run_items.get(run_id)
+        if item is not None:
+            item.setText(self.run_manager.get_run(run_id).describe())
+
+    def update_run_items(self):
+        for run in self.run_manager.get_runs():
+            if run.is_active():
+                self.update_run_item(run.run_id)
+
+    @Slot(str)
+    def on_run_finished(self, run_id):
+        self.update_run_item(run_id)
+        run = self.run_manager.get_run(run_id)
+        if run.status == RUN_FAILED:
+            self.handle_error(run.error)
 
     def handle_error(self, error_message):
         QMessageBox.critical(self, "Error", f"An error occurred while running the state machine: {error_message}")
 
     def closeEvent(self, event):
-        if self.thread and self.thread.isRunning():
-            self.thread.quit()
-            self.thread.wait()
+        # Cancelled runs stop waiting on their provider calls at once, so this returns promptly
+        self.run_manager.cancel_all()
+        if not self.run_manager.wait(CLOSE_TIMEOUT_SECONDS):
+            print("Some runs were still stopping when the window closed.")
         super().closeEvent(event)
\ No newline at end of file
@@ -1,13 +1,19 @@
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsLineItem, QGraphicsItem, QGraphicsEllipseItem, QGraphicsProxyWidget, QCheckBox
-from PySide6.QtCore import Qt, Signal, Slot, QPointF, QRectF, QObject
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsLineItem, QGraphicsItem, QGraphicsEllipseItem, QStyleOptionGraphicsItem
+from PySide6.QtCore import Qt, Signal, Slot, QPointF, QRectF, QObject, QLineF
 from PySide6.QtGui import QPen, QColor, QPainter, QBrush
 
 from gui.state import State, StateWrapper, StateMachine
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsLineItem, QGraphicsItem, QGraphicsEllipseItem, QGraphicsProxyWidget, QCheckBox
-from PySide6.QtCore import Qt, Signal, Slot, QPointF, QRectF, QObject
-from PySide6.QtGui import QPen, QColor, QPainter, QBrush
 
-from gui.state import State, StateWrapper, StateMachine
+# Below these zoom levels, node labels and ports, and connection checkboxes, are not drawn
+TEXT_MIN_ZOOM = 0.4
+PORT_MIN_ZOOM = 0.4
+CHECKBOX_MIN_ZOOM = 0.6
+# Graphs with more nodes than this are drawn without antialiasing
+LARGE_GRAPH_NODES = 500
+
+
+def level_of_detail(painter) -> float:
+    return QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
 
 class NodeSignals(QObject):
     clicked = Signal(object)
@@ -38,7 +44,8 @@ class NodeItem(QGraphicsItem):
         else:
             painter.setBrush(QBrush(Qt.white))
         painter.drawRect(self.boundingRect())
-        painter.drawText(10, 20, self.state.get_name())
+        if level_of_detail(painter) >= TEXT_MIN_ZOOM:
+            painter.drawText(10, 20, self.state.get_name())
 
     def highlight(self, highlight=True):
         self.is_highlighted = highlight
@@ -66,6 +73,10 @@ class Port(QGraphicsEllipseItem):
         self.setPen(QPen(Qt.black))
         self.setZValue(1)
 
+    def paint(self, painter, option, widget=None):
+        if level_of_detail(painter) >= PORT_MIN_ZOOM:
+            super().paint(painter, option, widget)
+
     def hoverEnterEvent(self, event):
         self.setBrush(QBrush(Qt.red))
         super().hoverEnterEvent(event)
@@ -75,6 +86,16 @@ class Port(QGraphicsEllipseItem):
         super().hoverLeaveEvent(event)
 
 class Connection(QGraphicsLineItem):
+    """A transition between two nodes, with a "Pass Context" toggle drawn on the line.
+
+    The toggle is painted and hit-tested by the connection itself rather than
+    being a QCheckBox in a proxy widget, so that graphs with thousands of
+    connections do not create thousands of widgets.
+    """
+    TOGGLE_SIZE = 12
+    TOGGLE_LABEL = "Pass Context"
+    TOGGLE_WIDTH = 100
+
     def __init__(self, start_item, end_item, pass_context=False):
         super().__init__()
         self.start_item = start_item
@@ -82,48 +103,87 @@ class Connection(QGraphicsLineItem):
         self.pass_context = pass_context
         self.setZValue(-1)
         self.setPen(QPen(Qt.green, 2))
+        self._toggle_rect = QRectF()
+        self._bounding_rect = QRectF()
+        self._shape = None
         self.start_item.connections.append(self)
         self.end_item.connections.append(self)
         self.updatePosition()
 
-        self.context_checkbox = QCheckBox("Pass Context")
-        self.context_checkbox.setChecked(pass_context)
-        self.context_checkbox.stateChanged.connect(self.toggleContextPassing)
-
-        self.checkbox_proxy = QGraphicsProxyWidget(self)
-        self.checkbox_proxy.setWidget(self.context_checkbox)
-        self.updateCheckboxPosition()
+    def setContextPassing(self, pass_context):
+        self.pass_context = pass_context
+        # The engine's transition is what decides whether the result is passed on when the graph runs
+        self.start_item.state.set_pass_context(self.end_item.state, pass_context)
+        self.update()
 
-    def toggleContextPassing(self, state):
-        self.pass_context = (state == Qt.Checked)
+    def toggleRect(self):
+        """Where the toggle's box and label are drawn, in item coordinates."""
+        return self._toggle_rect
 
     def updatePosition(self):
         start_pos = self.start_item.mapToScene(self.start_item.output_port.pos() + QPointF(5, 5))
         end_pos = self.end_item.mapToScene(self.end_item.input_port.pos() + QPointF(5, 5))
-        self.setLine(start_pos.x(), start_pos.y(), end_pos.x(), end_pos.y())
-        self.updateCheckboxPosition()
+        line = QLineF(start_pos, end_pos)
+        anchor = line.pointAt(0.2)
+        # The scene asks for the geometry far more often than it changes, so it is computed here once
+        self.prepareGeometryChange()
+        self.setLine(line)
+        self._toggle_rect = QRectF(anchor.x(), anchor.y(), self.TOGGLE_WIDTH, self.TOGGLE_SIZE + 4)
+        self._bounding_rect = super().boundingRect().united(self._toggle_rect)
+        # Only needed for hit-testing, so built on first use
+        self._shape = None
 
-    def updateCheckboxPosition(self):
-        if self.scene():
-            line = self.line()
-            center = line.pointAt(0.2)
-            self.checkbox_proxy.setPos(center)
+    def boundingRect(self):
+        return self._bounding_rect
+
+    def shape(self):
+        if self._shape is None:
+            self._shape = super().shape()
+            self._shape.addRect(self._toggle_rect)
+        return self._shape
 
     def paint(self, painter, option, widget=None):
         super().paint(painter, option, widget)
-        if self.pass_context:
+        lod = level_of_detail(painter)
+        if lod >= CHECKBOX_MIN_ZOOM:
+            self.paintToggle(painter)
+        elif self.pass_context and lod >= TEXT_MIN_ZOOM:
             painter.drawText(self.boundingRect().center(), "Context")
 
+    def paintToggle(self, painter):
+        rect = self.toggleRect()
+        box = QRectF(rect.left() + 2, rect.top() + 2, self.TOGGLE_SIZE, self.TOGGLE_SIZE)
+        painter.setPen(QPen(Qt.black, 1))
+        painter.setBrush(QBrush(Qt.white))
+        painter.drawRect(box)
+        if self.pass_context:
+            painter.drawLine(QLineF(box.left() + 3, box.center().y(), box.center().x(), box.bottom() - 3))
+            painter.drawLine(QLineF(box.center().x(), box.bottom() - 3, box.right() - 3, box.top() + 3))
+        painter.drawText(QRectF(box.right() + 4, rect.top(), rect.width() - box.width() - 6, rect.height()),
+                         Qt.AlignmentFlag.AlignVCenter, self.TOGGLE_LABEL)
+
+    def mousePressEvent(self, event):
+        view = event.widget().parent() if event.widget() is not None else None
+        zoom = view.transform().m11() if isinstance(view, QGraphicsView) else 1.0
+        if event.button() == Qt.LeftButton and zoom >= CHECKBOX_MIN_ZOOM and self.toggleRect().contains(event.pos()):
+            self.setContextPassing(not self.pass_context)
+            event.accept()
+        else:
+            event.ignore()
+
 class NodeEditor(QGraphicsView):
     node_clicked = Signal(StateWrapper)
     node_properties_updated = Signal(StateWrapper)
+    node_response_chunk = Signal(StateWrapper, str)
 
     def __init__(self, agents):
         super().__init__()
         self.scene = QGraphicsScene(self)
         self.setScene(self.scene)
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
-        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        # Repaint only what changed, e.g. one node when it is highlighted, and keep the grid in a cached pixmap
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
+        self.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
@@ -131,49 +191,93 @@ class NodeEditor(QGraphicsView):
         self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
 
-        self.state_machine = StateMachine()
-        self.state_machine.state_changed.connect(self.on_state_changed)
-        self.state_machine.execution_finished.connect(self.clear_highlights)
+        self.set_state_machine(StateMachine())
 
         self.connection_start = None
         self.current_connection = None
         self.agents = agents
         self.states = {}
+        self.node_items = {}
+        self.connections = []
+        self.highlighted_items = set()
+        self.checkboxes_visible = True
+        self.large_graph_mode = False
         self.setAcceptDrops(True)
 
         self.last_node_pos = QPointF(0, 0)
         self.node_spacing = 120
 
+    def set_state_machine(self, state_machine):
+        previous = getattr(self, 'state_machine', None)
+        if previous is not None:
+            # The previous graph may still be running in the background; its progress is no longer shown here
+            previous.state_changed.disconnect(self.on_state_changed)
+            previous.state_finished.disconnect(self.on_state_finished)
+            previous.response_chunk.disconnect(self.node_response_chunk)
+            previous.execution_finished.disconnect(self.clear_highlights)
+            previous.execution_cancelled.disconnect(self.clear_highlights)
+        self.state_machine = state_machine
+        self.state_machine.state_changed.connect(self.on_state_changed)
+        self.state_machine.state_finished.connect(self.on_state_finished)
+        self.state_machine.response_chunk.connect(self.node_response_chunk)
+        self.state_machine.execution_finished.connect(self.clear_highlights)
+        self.state_machine.execution_cancelled.connect(self.clear_highlights)
+
     def update_last_node_pos(self, pos):
         self.last_node_pos = pos
 
+    def get_node_item(self, state):
+        return self.node_items.get(state)
+
+    def _set_node_highlight(self, state, highlight):
+        item = self.node_items.get(state)
+        if item is None:
+            return
+        item.highlight(highlight)
+        if highlight:
+            self.highlighted_items.add(item)
+        else:
+            self.highlighted_items.discard(item)
+
+    def clear_graph(self):
+        """Remove every node and connection from the scene."""
+        self.scene.clear()
+        self.node_items = {}
+        self.connections = []
+        self.highlighted_items = set()
+        self.set_large_graph_mode(False)
+
+    def set_large_graph_mode(self, enabled):
+        """Turn off antialiasing, which dominates paint time once thousands of items are visible."""
+        self.large_graph_mode = enabled
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, not enabled)
+
     @Slot(StateWrapper)
     def on_state_changed(self, state_wrapper):
-        for item in self.scene.items():
-            if isinstance(item, NodeItem):
-                item.highlight(item.state == state_wrapper.get_state())
+        # Independent branches run concurrently, so several nodes may be lit at once
+        self._set_node_highlight(state_wrapper.get_state(), True)
         self.node_properties_updated.emit(state_wrapper)
-        state_wrapper.response_ready.connect(self.on_response_ready)
 
-    @Slot(str)
-    def on_response_ready(self, response):
-        current_state = self.state_machine.current_state
-        if current_state:
-            state_wrapper = StateWrapper(current_state)
-            state_wrapper.update_response(response)
-            self.node_properties_updated.emit(state_wrapper)
+    @Slot(StateWrapper)
+    def on_state_finished(self, state_wrapper):
+        self._set_node_highlight(state_wrapper.get_state(), False)
+        self.node_properties_updated.emit(state_wrapper)
 
     def drawBackground(self, painter, rect):
         super().drawBackground(painter, rect)
         grid_size = 20
+        # Zoomed out, every other line is dropped until lines are at least 8 pixels apart on screen
+        zoom = self.get_zoom()
+        while grid_size * zoom < 8:
+            grid_size *= 2
         pen = QPen(QColor(200, 200, 200), 0.5)
+        pen.setCosmetic(True)
         painter.setPen(pen)
         left = int(rect.left()) - (int(rect.left()) % grid_size)
         top = int(rect.top()) - (int(rect.top()) % grid_size)
-        for x in range(left, int(rect.right()), grid_size):
-            painter.drawLine(x, int(rect.top()), x, int(rect.bottom()))
-        for y in range(top, int(rect.bottom()), grid_size):
-            painter.drawLine(int(rect.left()), y, int(rect.right()), y)
+        lines = [QLineF(x, rect.top(), x, rect.bottom()) for x in range(left, int(rect.right()) + 1, grid_size)]
+        lines += [QLineF(rect.left(), y, rect.right(), y) for y in range(top, int(rect.bottom()) + 1, grid_size)]
+        painter.drawLines(lines)
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasText():
@@ -199,26 +303,66 @@ class NodeEditor(QGraphicsView):
         self.node_clicked.emit(StateWrapper(state))
 
     def addNode(self, agent, x=None, y=None):
+        state = State(agent)
+        self.state_machine.add_state(state)
+        return self.addStateNode(state, x, y)
+
+    def addStateNode(self, state, x=None, y=None):
+        """Show a state that is already in the state machine as a node."""
         if x is None or y is None:
             x = self.last_node_pos.x() + self.node_spacing
             y = self.last_node_pos.y()
 
-        state = State(agent)
+        agent = state.agent
         node_item = NodeItem(state, x, y, self)
         node_item.signals.clicked.connect(self.on_node_clicked)
         self.scene.addItem(node_item)
-        self.state_machine.add_state(state)
+        self.node_items[state] = node_item
+        if not self.large_graph_mode and len(self.node_items) > LARGE_GRAPH_NODES:
+            self.set_large_graph_mode(True)
         
         self.last_node_pos = QPointF(x, y)
         
         print(f"Added node for agent: {agent.get_name()} at ({x}, {y})")
         return node_item
 
+    def addConnection(self, start_item, end_item, pass_context=False):
+        connection = Connection(start_item, end_item, pass_context)
+        self.scene.addItem(connection)
+        self.connections.append(connection)
+        return connection
+
+    def load_state_machine(self, state_machine):
+        """Replace the graph with ``state_machine``, one node per state and one connection per transition."""
+        self.set_state_machine(state_machine)
+        self.clear_graph()
+        for state in state_machine.states:
+            self.addStateNode(state, getattr(state, 'x', 0), getattr(state, 'y', 0))
+        for state in state_machine.states:
+            for to_state, pass_context in state.connections:
+                self.addConnection(self.node_items[state], self.node_items[to_state], pass_context)
+
+    def get_zoom(self):
+        return self.transform().m11()
+
+    def update_level_of_detail(self):
+        """Repaint after the zoom changed which details (labels, ports, connection toggles) are drawn.
+
+        Connections draw their toggles themselves, so crossing the threshold
+        only needs a repaint rather than showing or hiding thousands of widgets.
+        """
+        visible = self.get_zoom() >= CHECKBOX_MIN_ZOOM
+        if visible == self.checkboxes_visible:
+            return
+        self.checkboxes_visible = visible
+        self.viewport().update()
+
     def wheelEvent(self, event):
         zoom_in_factor = 1.25
         zoom_out_factor = 1 / zoom_in_factor
         zoom_factor = zoom_in_factor if event.angleDelta().y() > 0 else zoom_out_factor
         self.scale(zoom_factor, zoom_factor)
+        self.update_level_of_detail()
 
     def mouseMoveEvent(self, event):
         if self.connection_start:
@@ -243,9 +387,8 @@ class NodeEditor(QGraphicsView):
         if self.connection_start:
             end_item = self.getNodeItemAt(event.pos())
             if isinstance(end_item, NodeItem) and end_item != self.connection_start:
-                connection = Connection(self.connection_start, end_item)
-                self.scene.addItem(connection)
-                self.state_machine.add_transition(self.connection_start.state, end_item.state)
+                connection = self.addConnection(self.connection_start, end_item)
+                self.state_machine.add_transition(self.connection_start.state, end_item.state, connection.pass_context)
                 print(f"Transition created from {self.connection_start.state.get_name()} to {end_item.state.get_name()}")
             self.scene.removeItem(self.current_connection)
             self.current_connection = None
@@ -268,13 +411,14 @@ class NodeEditor(QGraphicsView):
     @Slot(StateWrapper)
     def highlight_current_node(self, state_wrapper):
         state = state_wrapper.get_state()
-        for item in self.scene.items():
-            if isinstance(item, NodeItem):
-                item.highlight(item.state == state)
+        for item in list(self.highlighted_items):
+            if item.state is not state:
+                self._set_node_highlight(item.state, False)
+        self._set_node_highlight(state, True)
         self.node_properties_updated.emit(state_wrapper)
 
     @Slot()
     def clear_highlights(self):
-        for item in self.scene.items():
-            if isinstance(item, NodeItem):
-                item.highlight(False)
\ No newline at end of file
+        for item in list(self.highlighted_items):
+            item.highlight(False)
+        self.highlighted_items.clear()
\ No newline at end of file
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from PySide6.QtCore import QObject, Qt, Signal, Slot
+from gui.state import StateMachine, StateWrapper
+from llm_wrap_lib.cancellation import CancellationToken, RunCancelled
+from state_machine.checkpoint import RUN_CANCELLED, RUN_COMPLETED, RUN_FAILED, RUN_RUNNING
+
+RUN_PAUSED = "paused"
+RUN_CANCELLING = "cancelling"
+ACTIVE_STATUSES = (RUN_RUNNING, RUN_PAUSED, RUN_CANCELLING)
+
+
+class Run:
+    """One execution of a state machine on its own thread."""
+
+    def __init__(self, run_id: str, state_machine: StateMachine):
+        self.run_id = run_id
+        self.state_machine = state_machine
+        self.cancellation = CancellationToken()
+        self.status = RUN_RUNNING
+        self.error = None
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.thread = None
+
+    def is_active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def get_progress(self) -> Tuple[int, int]:
+        """Return (states finished, states in the run)."""
+        metrics = self.state_machine.get_metrics()
+        finished = len(metrics.states) if metrics is not None and metrics.run_id == self.run_id else 0
+        return finished, len(self.state_machine.get_reachable_states())
+
+    def get_elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def describe(self) -> str:
+        finished, total = self.get_progress()
+        return f"Run {self.run_id[:8]}: {self.status}, {finished}/{total} states, {self.get_elapsed():.0f}s"
+
+
+class RunManager(QObject):
+    """Starts state machine runs on background threads and controls them from the GUI.
+
+    Several runs can be in progress at once, one per StateMachine. Runs are
+    paused, resumed and cancelled through their engine, so the calls return
+    immediately; a cancelled run stops waiting on its LLM and tool calls
+    straight away and can later be resumed from its checkpoints.
+    """
+    run_started = Signal(str)
+    # Emitted when a run's status or progress changes
+    run_updated = Signal(str)
+    # Emitted once a run has completed, been cancelled or failed; see get_run(run_id).status
+    run_finished = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._runs: Dict[str, Run] = {}
+        self._lock = threading.Lock()
+        self.run_finished.connect(self._on_run_finished)
+
+    def get_run(self, run_id: str) -> Optional[Run]:
+        return self._runs.get(run_id)
+
+    def get_runs(self) -> List[Run]:
+        return list(self._runs.values())
+
+    def get_active_run(self, state_machine: StateMachine) -> Optional[Run]:
+        return next((run for run in self._runs.values()
+                     if run.state_machine is state_machine and run.is_active()), None)
+
+    def start(self, state_machine: StateMachine, run_id: str = None) -> Run:
+        """Run ``state_machine`` in the background; pass the ID of an earlier run to resume it."""
+        if self.get_active_run(state_machine) is not None:
+            raise RuntimeError("This state machine is already running")
+        run = Run(run_id or uuid.uuid4().hex, state_machine)
+        self._runs[run.run_id] = run
+        state_machine.state_finished.connect(self._on_state_finished, Qt.ConnectionType.UniqueConnection)
+        # An earlier run may have finished while paused
+        state_machine.resume()
+        run.thread = threading.Thread(target=self._execute, args=(run,), name=f"run-{run.run_id[:8]}", daemon=True)
+        run.thread.start()
+        self.run_started.emit(run.run_id)
+        return run
+
+    def _execute(self, run: Run) -> None:
+        try:
+            run.state_machine.run(run.run_id, cancellation=run.cancellation)
+            status = RUN_COMPLETED
+        except RunCancelled:
+            status = RUN_CANCELLED
+        except Exception as e:
+            logging.error(f"Run {run.run_id} failed: {e}")
+            run.error = str(e)
+            status = RUN_FAILED
+        with self._lock:
+            run.status = status
+            run.finished_at = time.monotonic()
+        self.run_finished.emit(run.run_id)
+
+    def _set_status(self, run_id: str, expected: Tuple[str, ...], status: str) -> bool:
+        run = self._runs.get(run_id)
+        with self._lock:
+            if run is None or run.status not in expected:
+                return False
+            run.status = status
+        self.run_updated.emit(run_id)
+        return True
+
+    def pause(self, run_id: str) -> bool:
+        """Let the run's executing states finish but start no new ones."""
+        if not self._set_status(run_id, (RUN_RUNNING,), RUN_PAUSED):
+            return False
+        self._runs[run_id].state_machine.pause()
+        return True
+
+    def resume(self, run_id: str) -> bool:
+        if not self._set_status(run_id, (RUN_PAUSED,), RUN_RUNNING):
+            return False
+        self._runs[run_id].state_machine.resume()
+        return True
+
+    def cancel(self, run_id: str) -> bool:
+        if not self._set_status(run_id, (RUN_RUNNING, RUN_PAUSED), RUN_CANCELLING):
+            return False
+        run = self._runs[run_id]
+        run.cancellation.cancel()
+        # A paused run has to wake up to notice that it was cancelled
+        run.state_machine.resume()
+        return True
+
+    def cancel_all(self) -> None:
+        for run in self.get_runs():
+            self.cancel(run.run_id)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait up to ``timeout`` seconds for every run thread to exit; return True if they all did."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for run in self.get_runs():
+            run.thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(run.thread.is_alive() for run in self.get_runs())
+
+    @Slot(StateWrapper)
+    def _on_state_finished(self, state_wrapper):
+        run = self.get_active_run(self.sender())
+        if run is not None:
+            self.run_updated.emit(run.run_id)
+
+    @Slot(str)
+    def _on_run_finished(self, run_id):
+        run = self._runs[run_id]
+        if self.get_active_run(run.state_machine) is None:
+            run.state_machine.state_finished.disconnect(self._on_state_finished)
@@ -53,10 +53,16 @@ class Sidebar(QWidget):
         self.layout.addWidget(self.content)
         
         self.content.hide()
+        self._streamed_response = ""
 
     def update_context_and_response(self, context, response):
         self.context_label.setText(context)
         self.response_label.setText(response)
+        self._streamed_response = ""
+
+    def append_response_chunk(self, chunk):
+        self._streamed_response += chunk
+        self.response_label.setText(self._streamed_response)
 
     def update_properties(self, agent):
         self.name_label.setText(f"Name: {agent.get_name()}")
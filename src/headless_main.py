@@ -0,0 +1,165 @@
+import argparse
+import json
+import logging
+import sys
+import uuid
+from state_machine.batch import BatchRunner, iter_jsonl
+from state_machine.context import CONTEXT_STRATEGIES, create_context_strategy
+from state_machine.checkpoint import DEFAULT_CHECKPOINT_PATH, SQLiteCheckpointStore, set_default_store
+from state_machine.engine import StateMachineEngine
+from state_machine.loader import load_agents, load_graph
+from llm_wrap_lib.shared_config import SharedConfig
+from tool_handler.tool_bank import ToolBank
+from tool_handler.tool_cache import ToolResultCache
+from trace_handler.tracer import JsonFileSpanExporter, OTLPHttpSpanExporter, Tracer, set_tracer
+from transcript_handler.transcript import FileTranscriptSink, set_default_sink
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a saved state machine without the GUI.")
+    parser.add_argument("graph", help="State machine JSON saved from the editor")
+    parser.add_argument("--agents", required=True, help="JSON file defining the agents, their tasks and tools")
+    parser.add_argument("--output", default="-", help="Where to write the results JSON (default: stdout)")
+    parser.add_argument("--max-workers", type=int, default=4, help="Maximum number of states run at once")
+    parser.add_argument("--batch", default=None,
+                        help="JSONL file of input variables; runs the graph once per record and writes JSONL results")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of batch records run at once")
+    parser.add_argument("--resume", default=None, metavar="RUN_ID",
+                        help="Resume an earlier run, skipping the states it already completed")
+    parser.add_argument("--checkpoints", default=DEFAULT_CHECKPOINT_PATH,
+                        help="SQLite file that checkpoints are written to and resumed from")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse checkpointed results of states whose inputs have not changed")
+    parser.add_argument("--context-strategy", choices=sorted(CONTEXT_STRATEGIES), default=None,
+                        help="How upstream results are passed on; overrides the strategy saved in the graph")
+    parser.add_argument("--context-tokens", type=int, default=None,
+                        help="Token budget for the truncate and summarise strategies")
+    parser.add_argument("--context-last-n", type=int, default=None, help="Results kept by the last_n strategy")
+    parser.add_argument("--summary-model", default=None, help="Model used by the summarise strategy")
+    parser.add_argument("--metrics", default=None, help="File to write per-state and per-run metrics to")
+    parser.add_argument("--metrics-format", choices=("json", "prometheus"), default="json",
+                        help="Format of the --metrics file")
+    parser.add_argument("--trace", default=None,
+                        help="Write tracing spans to this JSON file (Chrome trace format, opens as a flame graph)")
+    parser.add_argument("--otlp-endpoint", default=None,
+                        help="Also send spans to an OpenTelemetry collector, e.g. http://localhost:4318/v1/traces")
+    parser.add_argument("--mock-backend", default=None, metavar="JSON",
+                        help="Send LLM requests to a simulated provider configured by this JSON file "
+                             "(latency, streaming, tool calls, error rate) instead of the real models")
+    parser.add_argument("--tool-cache", default=None, metavar="PATH",
+                        help="SQLite file that memoized results of pure and cacheable tools are kept in across runs")
+    parser.add_argument("--transcript-dir", default=None, help="Directory for the JSONL transcript")
+    parser.add_argument("--verbose", action="store_true", help="Log progress to stderr")
+    return parser.parse_args(argv)
+
+
+def context_strategy_options(args):
+    if args.context_strategy is None:
+        return None
+    options = {"strategy": args.context_strategy}
+    if args.context_strategy in ("truncate", "summarise"):
+        options["max_tokens"] = args.context_tokens
+    if args.context_strategy == "last_n":
+        options["n"] = args.context_last_n
+    if args.context_strategy == "summarise":
+        options["model"] = args.summary_model
+    return options
+
+
+def write_metrics(metrics, path, metrics_format="json"):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(metrics.to_prometheus() if metrics_format == "prometheus" else metrics.to_json())
+
+
+def run(graph_path, agents_path, max_workers=4, run_id=None, incremental=False, context_strategy=None,
+        metrics_path=None, metrics_format="json"):
+    agents = load_agents(agents_path)
+    state_machine = StateMachineEngine.from_dict(load_graph(graph_path), agents)
+    state_machine.max_workers = max_workers
+    state_machine.incremental = incremental
+    if context_strategy is not None:
+        state_machine.set_context_strategy(create_context_strategy(context_strategy))
+    try:
+        results = state_machine.run(run_id)
+    finally:
+        # Metrics of a failed run show where it got to and what it cost
+        if metrics_path and state_machine.get_metrics() is not None:
+            write_metrics(state_machine.get_metrics(), metrics_path, metrics_format)
+
+    return {
+        "run_id": state_machine.run_id,
+        "states": [
+            {
+                "name": state.get_name(),
+                "context": state.context,
+                "context_tokens": state.context_tokens,
+                "response": response,
+                "cost": state.cost,
+            }
+            for state, response in results.items()
+        ],
+        "costs": {name: agent.get_cost_summary() for name, agent in agents.items()},
+        "metrics": state_machine.get_metrics().to_dict(),
+        "tool_cache": ToolBank().get_cache_stats(),
+    }
+
+
+def run_batch(graph_path, agents_path, batch_path, output_file, concurrency=4, max_workers=4):
+    with open(agents_path, 'r', encoding='utf-8') as file:
+        agent_definitions = json.load(file)
+    runner = BatchRunner(load_graph(graph_path), agent_definitions, concurrency=concurrency, state_workers=max_workers)
+    for result in runner.run(iter_jsonl(batch_path)):
+        output_file.write(json.dumps(result) + "\n")
+        output_file.flush()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+    if args.mock_backend:
+        # In memory only, so the simulated provider never ends up in config.json
+        with open(args.mock_backend, 'r', encoding='utf-8') as file:
+            SharedConfig().data['mock_backend'] = json.load(file)
+    if args.transcript_dir:
+        set_default_sink(FileTranscriptSink(args.transcript_dir))
+    store = SQLiteCheckpointStore(args.checkpoints)
+    set_default_store(store)
+    if args.tool_cache:
+        ToolBank().set_result_cache(ToolResultCache(path=args.tool_cache))
+    exporters = []
+    if args.trace:
+        exporters.append(JsonFileSpanExporter(args.trace))
+    if args.otlp_endpoint:
+        exporters.append(OTLPHttpSpanExporter(args.otlp_endpoint))
+    if exporters:
+        set_tracer(Tracer(exporters))
+
+    if args.batch:
+        if args.output == "-":
+            run_batch(args.graph, args.agents, args.batch, sys.stdout, args.concurrency, args.max_workers)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                run_batch(args.graph, args.agents, args.batch, file, args.concurrency, args.max_workers)
+        return
+
+    run_id = args.resume or uuid.uuid4().hex
+    try:
+        output = run(args.graph, args.agents, args.max_workers, run_id, args.incremental,
+                     context_strategy_options(args), args.metrics, args.metrics_format)
+    except Exception:
+        logging.exception("Run failed")
+        # Bad arguments and unreadable files fail before the engine checkpoints anything
+        if store.load_states(run_id):
+            sys.stderr.write(f"Completed states were checkpointed; resume with --resume {run_id}\n")
+        sys.exit(1)
+
+    if args.output == "-":
+        json.dump(output, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(output, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import contextlib
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+_current_cancellation: contextvars.ContextVar = contextvars.ContextVar("cancellation", default=None)
+
+
+class RunCancelled(Exception):
+    """Raised inside a run once it has been cancelled."""
+
+
+class CancellationToken:
+    """Cooperative cancellation shared by everything working on one run.
+
+    Code checks the token between steps with raise_if_cancelled(). Blocking
+    waits include ``future`` in the futures they wait on, so they return as
+    soon as the token is cancelled rather than when the slowest call does.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.future = Future()
+
+    def cancel(self) -> None:
+        if not self._event.is_set():
+            self._event.set()
+            try:
+                self.future.set_result(None)
+            except Exception:
+                # Another thread cancelled the token at the same time
+                pass
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RunCancelled("The run was cancelled")
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep like time.sleep, but raise RunCancelled as soon as the token is cancelled."""
+        if self._event.wait(max(0.0, seconds)):
+            self.raise_if_cancelled()
+
+
+def current_cancellation() -> Optional[CancellationToken]:
+    """Return the token of the run executing in this thread or task, if any."""
+    return _current_cancellation.get()
+
+
+@contextlib.contextmanager
+def use_cancellation(token: Optional[CancellationToken]):
+    """Make ``token`` the current cancellation token for a block."""
+    reset = _current_cancellation.set(token)
+    try:
+        yield token
+    finally:
+        _current_cancellation.reset(reset)
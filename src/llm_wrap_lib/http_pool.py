@@ -0,0 +1,213 @@
+import importlib.util
+import threading
+from typing import Any, Dict, List, Optional
+import httpx
+
+# httpcore trace events marking an attempt to open a connection, a new connection and its TLS handshake
+CONNECT_STARTED_EVENT = "connection.connect_tcp.started"
+CONNECT_EVENT = "connection.connect_tcp.complete"
+TLS_EVENT = "connection.start_tls.complete"
+
+
+class _Counters:
+    """Request and connection counts shared by the sync and async transports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.connections_opened = 0
+            self.tls_handshakes = 0
+            self.reused_connections = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish(self, events: List[str]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            if CONNECT_STARTED_EVENT not in events:
+                self.reused_connections += 1
+            self.connections_opened += CONNECT_EVENT in events
+            self.tls_handshakes += TLS_EVENT in events
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """HTTP transport that records, through httpcore's trace extension, whether a request opened a connection."""
+
+    def __init__(self, counters: _Counters, **kwargs):
+        super().__init__(**kwargs)
+        self._counters = counters
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        events = []
+        request.extensions["trace"] = lambda name, info: events.append(name)
+        self._counters.start()
+        try:
+            return super().handle_request(request)
+        finally:
+            self._counters.finish(events)
+
+    def get_connections(self) -> list:
+        return self._pool.connections
+
+
+class _AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    """Asynchronous counterpart of _CountingTransport."""
+
+    def __init__(self, counters: _Counters, **kwargs):
+        super().__init__(**kwargs)
+        self._counters = counters
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        events = []
+
+        async def trace(name, info):
+            events.append(name)
+        request.extensions["trace"] = trace
+        self._counters.start()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self._counters.finish(events)
+
+    def get_connections(self) -> list:
+        return self._pool.connections
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """Process-wide pooled HTTP clients, sync and async, that litellm sends every request through.
+
+    Without them each provider client litellm builds may open its own
+    connections, so short calls keep paying for TCP and TLS handshakes.
+    The shared clients keep connections alive for ``keepalive_expiry``
+    seconds, use HTTP/2 when ``http2`` is set and h2 is installed, and hold
+    at most ``max_connections`` connections each, ``max_keepalive_connections``
+    of them idle. get_stats() reports how many requests reused a connection
+    and how busy the pool is.
+
+    The async client's connections belong to the event loop they were
+    opened on, so it should be used from one long-lived loop.
+    """
+    _instance = None
+
+    DEFAULTS = {
+        "http2": True,
+        "max_connections": 100,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30.0,
+        "connect_timeout": 10.0,
+        "timeout": 600.0,
+    }
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(HttpClientPool, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_lock'):
+            self._lock = threading.Lock()
+            self._options = dict(self.DEFAULTS)
+            self._client: Optional[httpx.Client] = None
+            self._async_client: Optional[httpx.AsyncClient] = None
+            self._counters = _Counters()
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """Set pool options from the "http" section of config.json.
+
+        Clients already created are kept unless the options changed, in which
+        case they are replaced on next use; requests in flight on the old
+        clients still complete.
+        """
+        options = {**self.DEFAULTS, **{key: value for key, value in config.items() if key in self.DEFAULTS}}
+        with self._lock:
+            if options == self._options:
+                return
+            self._options = options
+            self._client = None
+            self._async_client = None
+
+    def _client_options(self) -> Dict[str, Any]:
+        options = self._options
+        return {
+            "http2": bool(options["http2"]) and http2_available(),
+            "limits": httpx.Limits(max_connections=options["max_connections"],
+                                   max_keepalive_connections=options["max_keepalive_connections"],
+                                   keepalive_expiry=options["keepalive_expiry"]),
+        }
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self._options["timeout"], connect=self._options["connect_timeout"])
+
+    def get_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                transport = _CountingTransport(self._counters, **self._client_options())
+                self._client = httpx.Client(transport=transport, timeout=self._timeout(), follow_redirects=True)
+            return self._client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_client is None:
+                transport = _AsyncCountingTransport(self._counters, **self._client_options())
+                self._async_client = httpx.AsyncClient(transport=transport, timeout=self._timeout(),
+                                                       follow_redirects=True)
+            return self._async_client
+
+    def install(self, litellm) -> None:
+        """Make litellm send requests through the shared clients.
+
+        Clients that were set on litellm by someone else are left alone.
+        """
+        for attribute, get in (("client_session", self.get_client), ("aclient_session", self.get_async_client)):
+            current = getattr(litellm, attribute, None)
+            if current is None or isinstance(getattr(current, "_transport", None),
+                                             (_CountingTransport, _AsyncCountingTransport)):
+                client = get()
+                if current is not client:
+                    setattr(litellm, attribute, client)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return request and connection-reuse counts and the current pool utilisation."""
+        with self._lock:
+            clients = [client for client in (self._client, self._async_client) if client is not None]
+            max_connections = self._options["max_connections"]
+            http2 = bool(self._options["http2"]) and http2_available()
+        connections = [connection for client in clients for connection in client._transport.get_connections()]
+        busy = sum(1 for connection in connections if not connection.is_idle())
+        counters = self._counters
+        with counters._lock:
+            stats = {
+                "requests": counters.requests,
+                "in_flight": counters.in_flight,
+                "max_in_flight": counters.max_in_flight,
+                "connections_opened": counters.connections_opened,
+                "tls_handshakes": counters.tls_handshakes,
+                "reused_connections": counters.reused_connections,
+            }
+        stats["reuse_rate"] = stats["reused_connections"] / stats["requests"] if stats["requests"] else 0.0
+        stats.update({
+            "http2": http2,
+            "open_connections": len(connections),
+            "busy_connections": busy,
+            "max_connections": max_connections,
+            "utilisation": busy / (max_connections * len(clients)) if clients and max_connections else 0.0,
+        })
+        return stats
+
+    def reset_stats(self) -> None:
+        self._counters.reset()
@@ -1,14 +1,39 @@
-from typing import List, Dict
-import litellm
-from litellm.utils import get_valid_models
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import asyncio
 import json
-import os
+import logging
+import re
+import threading
+import time
 from tool_handler.tool_bank import ToolBank
+from tool_handler.tool_executor import ToolExecutor
+from llm_wrap_lib.response_cache import ResponseCache
+from llm_wrap_lib.model_registry import ModelRegistry
+from llm_wrap_lib.shared_config import SharedConfig
+from llm_wrap_lib.rate_limiter import RateLimiter
+from llm_wrap_lib.micro_batching import MicroBatcher
+from llm_wrap_lib.retry import RetryPolicy, LatencyTracker, is_retryable
+from llm_wrap_lib.streaming import StreamAccumulator, StreamingResponse, AsyncStreamingResponse
+from llm_wrap_lib.cancellation import RunCancelled, current_cancellation
+from trace_handler.tracer import get_tracer
+
+# Hedged duplicates run here so that neither attempt ties up the caller's thread
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
 
 class Response:
     def __init__(self, response_dict: Dict[str, any]):
         self._content = response_dict.get('content', '')
         self._cost = response_dict.get('cost', 0.0)
+        self._model = response_dict.get('model')
+        self._prompt_tokens = response_dict.get('prompt_tokens', 0)
+        self._completion_tokens = response_dict.get('completion_tokens', 0)
+        self._wall_time = response_dict.get('wall_time', 0.0)
+        self._time_to_first_token = response_dict.get('time_to_first_token')
+        self._tool_calls = response_dict.get('tool_calls', 0)
+        self._iterations = response_dict.get('iterations', 0)
+        self._retries = response_dict.get('retries', 0)
+        self._cached = response_dict.get('cached', False)
 
     def get_response_content(self) -> str:
         """Return the content of the LLM response."""
@@ -18,24 +43,222 @@ class Response:
         """Return the cost of the LLM call."""
         return self._cost
 
+    def get_model(self) -> str:
+        """Return the model that produced the final answer (after any fallback)."""
+        return self._model
+
+    def get_prompt_tokens(self) -> int:
+        return self._prompt_tokens
+
+    def get_completion_tokens(self) -> int:
+        return self._completion_tokens
+
+    def get_total_tokens(self) -> int:
+        return self._prompt_tokens + self._completion_tokens
+
+    def get_wall_time(self) -> float:
+        """Return the seconds from the call until the final answer was complete."""
+        return self._wall_time
+
+    def get_time_to_first_token(self) -> float:
+        """Return the seconds until the first text of the final answer was available."""
+        return self._time_to_first_token
+
+    def get_tool_call_count(self) -> int:
+        return self._tool_calls
+
+    def get_iterations(self) -> int:
+        """Return the number of completions made, including tool-call turns."""
+        return self._iterations
+
+    def get_retries(self) -> int:
+        return self._retries
+
+    def is_cached(self) -> bool:
+        return self._cached
+
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            "content": self._content,
+            "cost": self._cost,
+            "model": self._model,
+            "prompt_tokens": self._prompt_tokens,
+            "completion_tokens": self._completion_tokens,
+            "wall_time": self._wall_time,
+            "time_to_first_token": self._time_to_first_token,
+            "tool_calls": self._tool_calls,
+            "iterations": self._iterations,
+            "retries": self._retries,
+            "cached": self._cached,
+        }
+
     def __str__(self) -> str:
         """Return the response content when the object is cast to a string."""
         return self.get_response_content()
     
 
+class _CallStats:
+    """Token, timing and retry counts gathered over one call_model/stream_model call."""
+
+    def __init__(self, model_name: str):
+        self.model = model_name
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+        self.iterations = 0
+        self.retries = 0
+
+    def add_completion(self, response, model_name: str) -> None:
+        self.model = model_name
+        self.iterations += 1
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def to_response(self, content: str, total_cost: float, cached: bool = False) -> Response:
+        finished = time.monotonic()
+        # Non-streamed answers arrive all at once, when the final completion returns
+        first_token_at = self.first_token_at if self.first_token_at is not None else finished
+        return Response({
+            "content": content,
+            "cost": format(total_cost, '.4f'),
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "wall_time": finished - self.started,
+            "time_to_first_token": first_token_at - self.started,
+            "tool_calls": self.tool_calls,
+            "iterations": self.iterations,
+            "retries": self.retries,
+            "cached": cached,
+        })
+
+
+class _CacheLookup:
+    """Where a call's answer is cached once it is known.
+
+    ``key`` is its exact-match cache key and ``scope``/``prompt`` its place in
+    the semantic cache. ``sampled_hit`` is a semantic hit that was sent to the
+    model anyway, to be checked against the fresh answer.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.scope = None
+        self.prompt = None
+        self.sampled_hit = None
+
+
 class DynamicLLMWrapper:
     def __init__(self):
-        self.available_models: Dict[str, str] = {}
+        # Filled on first use, so creating agents never waits for model discovery
+        self._available_models: Optional[Dict[str, str]] = None
+        self._default_model = None
         self.model_costs: Dict[str, float] = {}
         self.total_cost: float = 0.0
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.semantic_hits: int = 0
+        # Set by the agent that owns this wrapper; separates agents when the semantic cache is scoped per agent
+        self.cache_scope: Optional[str] = None
+        self.cost_saved: float = 0.0
+        self.retried_requests: int = 0
+        self.hedged_requests: int = 0
+        self.fallback_requests: int = 0
+        self.abandoned_cost: float = 0.0
+        self._cost_lock = threading.Lock()
         self.config = self.load_config()
-        self.initialize_models()
+        self.retry_policy = RetryPolicy.from_config(self.config.get('retry', {}))
+        self.response_cache = self.create_response_cache()
+        self.semantic_cache = self.create_semantic_cache()
+        self.backend = self.create_backend()
+        self.batcher = self.create_batcher()
+        RateLimiter().configure(self.config.get('rate_limits', {}))
 
-    def initialize_models(self):
-        valid_models = get_valid_models()
-        
+    def create_response_cache(self):
+        cache_config = self.config.get('cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        return ResponseCache.get_shared(
+            cache_config.get('path', '.llm_cache.sqlite3'),
+            max_entries=cache_config.get('max_entries', 1000),
+            ttl_seconds=cache_config.get('ttl_seconds'),
+            deterministic_only=cache_config.get('deterministic_only', True),
+        )
+
+    def default_temperature(self) -> Optional[float]:
+        """Return the temperature agents call with when they set none.
+
+        The caches only keep calls made at temperature 0 unless
+        "deterministic_only" is false, so while one of them is enabled that
+        way agents ask for 0 and re-runs of a pipeline can be served from it.
+        Otherwise None, leaving the provider's default.
+        """
+        for cache in (self.response_cache, self.semantic_cache):
+            if cache is not None and not cache.is_cacheable({}):
+                return 0
+        return None
+
+    def create_semantic_cache(self):
+        """Return the shared near-duplicate prompt cache if "semantic_cache" is enabled, else None."""
+        cache_config = self.config.get('semantic_cache') or {}
+        if not cache_config.get('enabled', False):
+            return None
+        # Imported on first use, so that numpy is only loaded when the cache is enabled
+        from llm_wrap_lib.semantic_cache import SemanticCache
+        return SemanticCache.get_shared(cache_config)
+
+    def create_backend(self):
+        """Return the simulated provider configured under "mock_backend", or None to call litellm."""
+        backend_config = self.config.get('mock_backend')
+        if not backend_config:
+            return None
+        from llm_wrap_lib.mock_backend import MockBackend
+        return MockBackend.from_config(backend_config)
+
+    def create_batcher(self):
+        """Return the shared micro-batcher if "batching" is enabled, else None."""
+        batching_config = self.config.get('batching') or {}
+        if not batching_config.get('enabled', False):
+            return None
+        return MicroBatcher.get_shared(batching_config)
+
+    def get_backend(self):
+        """Return the module or object requests are sent to: litellm, or a MockBackend."""
+        if self.backend is not None:
+            return self.backend
+        # Imported on first use; litellm takes a second or more to import
+        import litellm
+        http_config = self.config.get('http') or {}
+        if http_config.get('enabled', True):
+            # Every agent's requests share one set of kept-alive connections
+            from llm_wrap_lib.http_pool import HttpClientPool
+            pool = HttpClientPool()
+            pool.configure(http_config)
+            pool.install(litellm)
+        return litellm
+
+    def initialize_models(self, force_refresh: bool = False):
+        if self.backend is not None:
+            # Every request goes to the simulated provider, so only its models are offered
+            valid_models = list(self.backend.models)
+        else:
+            # Model discovery is shared process-wide, so building a wrapper per agent stays cheap
+            registry = ModelRegistry()
+            registry.ttl_seconds = self.config.get('model_refresh_seconds', registry.ttl_seconds)
+            valid_models = registry.get_models(force_refresh=force_refresh)
+
+        if self._available_models is None:
+            self._available_models = {}
         for model in valid_models:
-            self.available_models[model] = model
+            self._available_models[model] = model
         
         # Set the default model from config, or use the first available model as fallback
         self._default_model = self.config.get('default_model')
@@ -48,8 +271,26 @@ class DynamicLLMWrapper:
                 self.config['mocking'] = True
                 self.save_config()
 
+    def is_mocking(self) -> bool:
+        # Discovery switches to mock responses when no model is usable, so it has to run first
+        if self._available_models is None:
+            self.initialize_models()
+        return self.config.get('mocking', False)
+
+    @property
+    def available_models(self) -> Dict[str, str]:
+        if self._available_models is None:
+            self.initialize_models()
+        return self._available_models
+
+    @available_models.setter
+    def available_models(self, models: Dict[str, str]):
+        self._available_models = models
+
     @property
     def default_model(self) -> str:
+        if self._available_models is None:
+            self.initialize_models()
         return self._default_model
 
     @default_model.setter
@@ -65,24 +306,27 @@ class DynamicLLMWrapper:
         return list(self.available_models.keys())
 
     def _update_return_costs(self, response, model_name: str):
+        return format(self._record_cost(response, model_name), '.4f')
+
+    def _record_cost(self, response, model_name: str) -> float:
         if isinstance(response, dict):
             cost = response.get("response_cost", 0.0)
         else:
             cost = response._hidden_params.get("response_cost", 0.0)
+        cost = cost or 0.0
 
-        if model_name not in self.model_costs:
-            self.model_costs[model_name] = 0.0
+        # Agents running on worker threads or a shared event loop may finish
+        # calls concurrently, so updates to the running totals are serialized.
+        with self._cost_lock:
+            if model_name not in self.model_costs:
+                self.model_costs[model_name] = 0.0
 
-        self.model_costs[model_name] += cost
-        self.total_cost += cost
+            self.model_costs[model_name] += cost
+            self.total_cost += cost
 
-        return format(cost, '.4f')
-        
-    def call_model(self, prompt: str, model_name: str = None, tools: list = [], **kwargs) -> Response:
-        if self.config.get('mocking', False):
-            # Return a mocked response
-            return self.mock_response(prompt, model_name or self.default_model or "mock_model")
+        return cost
 
+    def _prepare_call(self, prompt: str, model_name: str, tools: list):
         if model_name is None:
             model_name = self.default_model
         if model_name not in self.available_models:
@@ -95,12 +339,336 @@ class DynamicLLMWrapper:
         if not tools:
             tools = None
 
-        if self.config.get('mocking', False):
+        return model_name, messages, tools
+
+    @staticmethod
+    def estimate_tokens(model_name: str, messages: list, kwargs: dict) -> int:
+        """Estimate the tokens a request will count against a tokens-per-minute budget.
+
+        This is the prompt size plus the completion allowance (max_tokens),
+        which is how providers meter requests before they are answered.
+        """
+        import litellm
+        try:
+            prompt_tokens = litellm.token_counter(model=model_name, messages=messages)
+        except Exception:
+            prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+        return prompt_tokens + (kwargs.get('max_tokens') or 0)
+
+    def get_fallback_chain(self, model_name: str) -> List[str]:
+        """Return the model followed by its configured fallbacks that are available."""
+        fallbacks = self.config.get('fallbacks', {}).get(model_name, [])
+        return [model_name] + [model for model in fallbacks if model in self.available_models and model != model_name]
+
+    def _batchable(self, model_name: str, kwargs: dict) -> bool:
+        """Whether a request goes through the micro-batcher.
+
+        Only requests to providers with a batch endpoint do; any other request
+        is sent from the caller's thread or event loop, where the run's
+        cancellation token and the current span are.
+        """
+        return (self.batcher is not None and not kwargs.get('stream')
+                and self.batcher.supports_batch_completion(self.get_backend(), model_name))
+
+    def _send(self, model_name: str, messages: list, tools: list, kwargs: dict):
+        with get_tracer().span("llm.completion", model=model_name, stream=bool(kwargs.get('stream'))):
+            limiter = RateLimiter().get_limiter(model_name)
+            if limiter is not None:
+                limiter.acquire(id(self), self.estimate_tokens(model_name, messages, kwargs))
+            started = time.monotonic()
+            if self._batchable(model_name, kwargs):
+                future = self.batcher.submit(self.get_backend(), model_name, messages, tools, kwargs)
+                response = future.result()
+            else:
+                response = self.get_backend().completion(model=model_name, messages=messages, tools=tools, **kwargs)
+            if not kwargs.get('stream'):
+                LatencyTracker().record(model_name, time.monotonic() - started)
+            return response
+
+    async def _asend(self, model_name: str, messages: list, tools: list, kwargs: dict):
+        with get_tracer().span("llm.completion", model=model_name, stream=bool(kwargs.get('stream'))):
+            limiter = RateLimiter().get_limiter(model_name)
+            if limiter is not None:
+                await limiter.aacquire(id(self), self.estimate_tokens(model_name, messages, kwargs))
+            started = time.monotonic()
+            if self._batchable(model_name, kwargs):
+                future = self.batcher.submit(self.get_backend(), model_name, messages, tools, kwargs)
+                response = await asyncio.wrap_future(future)
+            else:
+                response = await self.get_backend().acompletion(model=model_name, messages=messages, tools=tools, **kwargs)
+            if not kwargs.get('stream'):
+                LatencyTracker().record(model_name, time.monotonic() - started)
+            return response
+
+    def _charge_abandoned(self, response, model_name: str) -> None:
+        """Charge a hedged attempt that finished after another attempt had already won."""
+        cost = self._record_cost(response, model_name)
+        with self._cost_lock:
+            self.abandoned_cost += cost
+
+    def _abandon(self, attempts, model_name: str, stream: bool) -> None:
+        """Leave attempts that are still running to finish in the background, charging their cost."""
+        if stream:
+            # A stream that was never read has not produced a priced completion
+            return
+        for attempt in attempts:
+            attempt.add_done_callback(
+                lambda future: future.exception() is None and self._charge_abandoned(future.result(), model_name)
+            )
+
+    def _hedged_send(self, model_name: str, messages: list, tools: list, kwargs: dict):
+        hedge_delay = None if kwargs.get('stream') else self.retry_policy.hedge_delay(model_name)
+        cancellation = current_cancellation()
+        if hedge_delay is None and cancellation is None:
+            return self._send(model_name, messages, tools, kwargs)
+
+        # In a cancellable run the request is sent from the pool, so that a provider that
+        # never answers holds up a pool thread rather than the run
+        if cancellation is not None:
+            cancellation.raise_if_cancelled()
+        cancelled = [cancellation.future] if cancellation is not None else []
+        # Each attempt gets its own copy of the messages, which the tool loop keeps appending to
+        attempts = [_hedge_pool.submit(get_tracer().bind(self._send), model_name, list(messages), tools, kwargs)]
+        if hedge_delay is not None:
+            done, _ = wait(attempts + cancelled, timeout=hedge_delay)
+            if not done:
+                with self._cost_lock:
+                    self.hedged_requests += 1
+                attempts.append(_hedge_pool.submit(get_tracer().bind(self._send), model_name, list(messages), tools, kwargs))
+
+        error = None
+        while attempts:
+            done, _ = wait(attempts + cancelled, return_when=FIRST_COMPLETED)
+            if cancellation is not None and cancellation.is_cancelled():
+                self._abandon(attempts, model_name, bool(kwargs.get('stream')))
+                raise RunCancelled(f"The run was cancelled while waiting for {model_name}")
+            for attempt in done:
+                attempts.remove(attempt)
+                if attempt.exception() is not None:
+                    error = attempt.exception()
+                    continue
+                # The slower duplicate is left to finish so that its cost is still recorded
+                self._abandon(attempts, model_name, bool(kwargs.get('stream')))
+                return attempt.result()
+        raise error
+
+    async def _ahedged_send(self, model_name: str, messages: list, tools: list, kwargs: dict):
+        hedge_delay = None if kwargs.get('stream') else self.retry_policy.hedge_delay(model_name)
+        if hedge_delay is None:
+            return await self._asend(model_name, messages, tools, kwargs)
+
+        attempts = {asyncio.ensure_future(self._asend(model_name, list(messages), tools, kwargs))}
+        done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+        if not done:
+            with self._cost_lock:
+                self.hedged_requests += 1
+            attempts.add(asyncio.ensure_future(self._asend(model_name, list(messages), tools, kwargs)))
+
+        error = None
+        while attempts:
+            done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is not None:
+                    error = attempt.exception()
+                    continue
+                for loser in attempts:
+                    loser.add_done_callback(
+                        lambda task: not task.cancelled() and task.exception() is None
+                        and self._charge_abandoned(task.result(), model_name)
+                    )
+                return attempt.result()
+        raise error
+
+    def _note_retry(self, model_name: str, attempt: int, error: Exception) -> None:
+        logging.warning(f"Call to {model_name} failed (attempt {attempt + 1}): {error}")
+        with self._cost_lock:
+            self.retried_requests += 1
+
+    def _note_fallback(self, model_name: str, error: Exception) -> None:
+        logging.warning(f"Falling back from {model_name} after error: {error}")
+        with self._cost_lock:
+            self.fallback_requests += 1
+
+    def _completion(self, model_name: str, messages: list, tools: list, kwargs: dict, stats: _CallStats = None):
+        """Send a request with retries, hedging and model fallbacks.
+
+        Returns (response, model that produced it).
+        """
+        policy = self.retry_policy
+        chain = self.get_fallback_chain(model_name)
+        for position, candidate in enumerate(chain):
+            for attempt in range(policy.max_attempts):
+                try:
+                    return self._hedged_send(candidate, messages, tools, kwargs), candidate
+                except RunCancelled:
+                    raise
+                except Exception as e:
+                    error = e
+                    if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                        break
+                    self._note_retry(candidate, attempt, e)
+                    if stats is not None:
+                        stats.retries += 1
+                    self._backoff(policy.backoff(attempt))
+            if position == len(chain) - 1:
+                raise error
+            self._note_fallback(candidate, error)
+            if stats is not None:
+                stats.retries += 1
+
+    @staticmethod
+    def _backoff(seconds: float) -> None:
+        cancellation = current_cancellation()
+        if cancellation is None:
+            time.sleep(seconds)
+        else:
+            cancellation.sleep(seconds)
+
+    async def _acompletion(self, model_name: str, messages: list, tools: list, kwargs: dict, stats: _CallStats = None):
+        """Asynchronous counterpart of _completion."""
+        policy = self.retry_policy
+        chain = self.get_fallback_chain(model_name)
+        for position, candidate in enumerate(chain):
+            for attempt in range(policy.max_attempts):
+                try:
+                    return await self._ahedged_send(candidate, messages, tools, kwargs), candidate
+                except Exception as e:
+                    error = e
+                    if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                        break
+                    self._note_retry(candidate, attempt, e)
+                    if stats is not None:
+                        stats.retries += 1
+                    await asyncio.sleep(policy.backoff(attempt))
+            if position == len(chain) - 1:
+                raise error
+            self._note_fallback(candidate, error)
+            if stats is not None:
+                stats.retries += 1
+
+    def get_batching_stats(self) -> Dict[str, float]:
+        """Return how many requests the shared micro-batcher coalesced, or {} if batching is disabled."""
+        return self.batcher.get_stats() if self.batcher is not None else {}
+
+    def get_http_stats(self) -> Dict[str, float]:
+        """Return connection reuse and pool utilisation of the shared HTTP clients, or {} if they are disabled."""
+        if not (self.config.get('http') or {}).get('enabled', True):
+            return {}
+        from llm_wrap_lib.http_pool import HttpClientPool
+        return HttpClientPool().get_stats()
+
+    def get_rate_limit_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return queue depth and wait-time metrics for every rate-limited model."""
+        return RateLimiter().get_stats()
+
+    def _lookup_cache(self, model_name: str, messages: list, tools: list, kwargs: dict, stats: _CallStats = None):
+        """Return (_CacheLookup, cached Response or None) for a call.
+
+        The exact-match cache is tried first, then the semantic cache.
+        """
+        lookup = _CacheLookup()
+        stats = stats or _CallStats(model_name)
+        if self.response_cache is not None and self.response_cache.is_cacheable(kwargs):
+            lookup.key = ResponseCache.make_key(model_name, messages, tools, kwargs)
+            cached = self.response_cache.get(lookup.key)
+            with self._cost_lock:
+                if cached is None:
+                    self.cache_misses += 1
+                else:
+                    self.cache_hits += 1
+                    self.cost_saved += cached["cost"]
+            if cached is not None:
+                return lookup, stats.to_response(cached["content"], 0.0, cached=True)
+
+        if self.semantic_cache is None or not self.semantic_cache.is_cacheable(kwargs):
+            return lookup, None
+        lookup.scope = self.semantic_cache.make_scope(model_name, tools, kwargs, self.cache_scope)
+        lookup.prompt = messages[-1]["content"]
+        hit = self.semantic_cache.get(lookup.scope, lookup.prompt)
+        if hit is None:
+            return lookup, None
+        if self.semantic_cache.should_verify():
+            # Answered by the model anyway, to measure how often a near-duplicate prompt needs a different answer
+            lookup.sampled_hit = hit
+            return lookup, None
+        with self._cost_lock:
+            self.semantic_hits += 1
+            self.cost_saved += hit["cost"]
+        return lookup, stats.to_response(hit["content"], 0.0, cached=True)
+
+    def _store_in_cache(self, lookup: _CacheLookup, content: str, total_cost: float) -> None:
+        if lookup.key is not None:
+            self.response_cache.put(lookup.key, content, total_cost)
+        if lookup.scope is None or content is None:
+            return
+        if lookup.sampled_hit is not None:
+            self.semantic_cache.record_verification(lookup.sampled_hit, content)
+        else:
+            self.semantic_cache.put(lookup.scope, lookup.prompt, content, total_cost)
+
+    def get_semantic_cache_stats(self) -> Dict[str, float]:
+        """Return hit and false-positive rates of the shared semantic cache, or {} if it is disabled."""
+        return self.semantic_cache.get_stats() if self.semantic_cache is not None else {}
+
+    def _resolve_tool_calls(self, tool_calls):
+        """Return (tool_call_id, tool, params) triples for a model turn."""
+        calls = []
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            tool_params = json.loads(tool_call.function.arguments)
+            tool = ToolBank().get_tool(tool_name)  # assuming ToolBank is a singleton
+            if tool is None:
+                raise ValueError(f"Tool {tool_name} is not registered in the ToolBank")
+            calls.append((tool_call.id, tool, tool_params))
+        return calls
+
+    def _finish_call(self, response, total_cost: float, lookup: _CacheLookup, stats: _CallStats) -> Response:
+        self._store_in_cache(lookup, response.choices[0].message.content, total_cost)
+
+        return stats.to_response(response.choices[0].message.content, total_cost)
+
+    @staticmethod
+    def _annotate_span(span, response: Response) -> None:
+        if not span.is_recording():
+            return
+        span.set_attributes({
+            key: value for key, value in {
+                "served_model": response.get_model(),
+                "prompt_tokens": response.get_prompt_tokens(),
+                "completion_tokens": response.get_completion_tokens(),
+                "cost": float(response.get_cost()),
+                "cached": response.is_cached(),
+                "tool_calls": response.get_tool_call_count(),
+                "iterations": response.get_iterations(),
+                "retries": response.get_retries(),
+                "time_to_first_token": response.get_time_to_first_token(),
+            }.items() if value is not None
+        })
+
+    def call_model(self, prompt: str, model_name: str = None, tools: list = [], **kwargs) -> Response:
+        with get_tracer().span("llm.call_model", model=model_name or self.default_model) as span:
+            response = self._call_model(prompt, model_name, tools, **kwargs)
+            self._annotate_span(span, response)
+            return response
+
+    def _call_model(self, prompt: str, model_name: str, tools: list, **kwargs) -> Response:
+        if self.is_mocking():
             # Return a mocked response
-            return self.mock_response(prompt, model_name)
+            return self.mock_response(prompt, model_name or self.default_model or "mock_model")
+
+        model_name, messages, tools = self._prepare_call(prompt, model_name, tools)
+        stats = _CallStats(model_name)
 
+        lookup, cached_response = self._lookup_cache(model_name, messages, tools, kwargs, stats)
+        if cached_response is not None:
+            return cached_response
+
+        total_cost = 0.0
         while True:
-            response = litellm.completion(model=model_name, messages=messages, tools=tools, **kwargs)
+            response, served_model = self._completion(model_name, messages, tools, kwargs, stats)
+            # Every completion is charged, including the intermediate tool-call turns
+            total_cost += self._record_cost(response, served_model)
+            stats.add_completion(response, served_model)
             
             tool_calls = response.choices[0].message.tool_calls
             
@@ -110,48 +678,249 @@ class DynamicLLMWrapper:
             
             # Process tool calls
             messages.append({"role": "assistant", "content": response.choices[0].message.content, "tool_calls": tool_calls})
+            stats.tool_calls += len(tool_calls)
             
-            for tool_call in tool_calls:
-                tool_name = tool_call.function.name
-                tool_params = json.loads(tool_call.function.arguments)
-                tool = ToolBank().get_tool(tool_name)  # assuming ToolBank is a singleton
-                tool_response = tool.call(**tool_params)
-                messages.append({"role": "tool", "content": str(tool_response), "tool_call_id": tool_call.id})
+            # Independent tool calls are dispatched in parallel; results come back in call order
+            calls = self._resolve_tool_calls(tool_calls)
+            for tool_call_id, tool_response in ToolExecutor().run_calls(calls, current_cancellation()):
+                messages.append({"role": "tool", "content": tool_response, "tool_call_id": tool_call_id})
 
-        cost = self._update_return_costs(response, model_name)
+        return self._finish_call(response, total_cost, lookup, stats)
 
-        return Response({
-            "content": response.choices[0].message.content,
-            "cost": cost
-        })
+    async def acall_model(self, prompt: str, model_name: str = None, tools: list = [], **kwargs) -> Response:
+        """Asynchronous counterpart of call_model built on litellm.acompletion.
+
+        Tool calls are resolved on the ToolExecutor pools so that slow tools
+        do not block the event loop driving other agents.
+        """
+        with get_tracer().span("llm.call_model", model=model_name or self.default_model) as span:
+            response = await self._acall_model(prompt, model_name, tools, **kwargs)
+            self._annotate_span(span, response)
+            return response
+
+    async def _acall_model(self, prompt: str, model_name: str, tools: list, **kwargs) -> Response:
+        if self.is_mocking():
+            # Return a mocked response
+            return self.mock_response(prompt, model_name or self.default_model or "mock_model")
+
+        model_name, messages, tools = self._prepare_call(prompt, model_name, tools)
+        stats = _CallStats(model_name)
+
+        lookup, cached_response = self._lookup_cache(model_name, messages, tools, kwargs, stats)
+        if cached_response is not None:
+            return cached_response
+
+        total_cost = 0.0
+        while True:
+            response, served_model = await self._acompletion(model_name, messages, tools, kwargs, stats)
+            # Every completion is charged, including the intermediate tool-call turns
+            total_cost += self._record_cost(response, served_model)
+            stats.add_completion(response, served_model)
+
+            tool_calls = response.choices[0].message.tool_calls
+
+            if not tool_calls:
+                # If there are no tool calls, we have our final response
+                break
+
+            # Process tool calls
+            messages.append({"role": "assistant", "content": response.choices[0].message.content, "tool_calls": tool_calls})
+            stats.tool_calls += len(tool_calls)
+
+            tool_results = await ToolExecutor().arun_calls(self._resolve_tool_calls(tool_calls))
+            for tool_call_id, tool_response in tool_results:
+                messages.append({"role": "tool", "content": tool_response, "tool_call_id": tool_call_id})
+
+        return self._finish_call(response, total_cost, lookup, stats)
+
+    def _record_stream_cost(self, accumulator: StreamAccumulator, messages: list, model_name: str,
+                            stats: _CallStats = None) -> float:
+        """Price a streamed completion from its chunks and add it to the running totals."""
+        built_response = None
+        try:
+            built_response = self.get_backend().stream_chunk_builder(accumulator.chunks, messages=messages)
+            cost = self.get_backend().completion_cost(completion_response=built_response)
+        except Exception:
+            # Models without pricing information (e.g. custom models) are not charged
+            cost = 0.0
+        self._update_return_costs({"response_cost": cost}, model_name)
+        if stats is not None:
+            stats.add_completion(built_response, model_name)
+        return cost
+
+    def stream_model(self, prompt: str, model_name: str = None, tools: list = [], **kwargs) -> StreamingResponse:
+        """Call the model with stream=True, yielding text deltas as they arrive.
+
+        Tool calls requested mid-stream are executed and the conversation is
+        continued, exactly as in call_model. The final Response is available
+        from get_response() once the stream is exhausted.
+        """
+        if self.is_mocking():
+            mock_model = model_name or self.default_model or "mock_model"
+            return StreamingResponse(lambda finish: self._mock_deltas(prompt, mock_model, finish))
+
+        model_name, messages, tools = self._prepare_call(prompt, model_name, tools)
+        span = get_tracer().start_span("llm.stream_model", model=model_name)
+        return StreamingResponse(
+            lambda finish: self._stream_deltas(model_name, messages, tools, kwargs, self._traced_finish(span, finish), span)
+        )
+
+    def _stream_deltas(self, model_name: str, messages: list, tools: list, kwargs: dict, finish, span=None):
+        stats = _CallStats(model_name)
+        lookup, cached_response = self._lookup_cache(model_name, messages, tools, kwargs, stats)
+        if cached_response is not None:
+            if cached_response.get_response_content():
+                yield cached_response.get_response_content()
+            finish(cached_response)
+            return
+
+        total_cost = 0.0
+        while True:
+            accumulator = StreamAccumulator()
+            # The stream's span is only made current around blocking work, never across a yield
+            with get_tracer().use_span(span):
+                stream, served_model = self._completion(model_name, messages, tools, {**kwargs, "stream": True}, stats)
+            cancellation = current_cancellation()
+            for chunk in stream:
+                if cancellation is not None:
+                    cancellation.raise_if_cancelled()
+                delta = accumulator.add(chunk)
+                if delta:
+                    stats.mark_first_token()
+                    yield delta
+            total_cost += self._record_stream_cost(accumulator, messages, served_model, stats)
+
+            if not accumulator.has_tool_calls():
+                break
+
+            messages.append(accumulator.get_assistant_message())
+            stats.tool_calls += len(accumulator.get_tool_calls())
+            with get_tracer().use_span(span):
+                tool_results = ToolExecutor().run_calls(self._resolve_tool_calls(accumulator.get_tool_calls()),
+                                                        cancellation)
+            for tool_call_id, tool_response in tool_results:
+                messages.append({"role": "tool", "content": tool_response, "tool_call_id": tool_call_id})
+
+        content = accumulator.get_content()
+        self._store_in_cache(lookup, content, total_cost)
+        finish(stats.to_response(content, total_cost))
+
+    def astream_model(self, prompt: str, model_name: str = None, tools: list = [], **kwargs) -> AsyncStreamingResponse:
+        """Async iterator counterpart of stream_model built on litellm.acompletion."""
+        if self.is_mocking():
+            mock_model = model_name or self.default_model or "mock_model"
+            return AsyncStreamingResponse(lambda finish: self._amock_deltas(prompt, mock_model, finish))
+
+        model_name, messages, tools = self._prepare_call(prompt, model_name, tools)
+        span = get_tracer().start_span("llm.stream_model", model=model_name)
+        return AsyncStreamingResponse(
+            lambda finish: self._astream_deltas(model_name, messages, tools, kwargs, self._traced_finish(span, finish), span)
+        )
+
+    def _traced_finish(self, span, finish):
+        """Wrap a stream's finish callback so that the stream's span ends with it."""
+        def traced_finish(response):
+            self._annotate_span(span, response)
+            span.end()
+            finish(response)
+        return traced_finish
+
+    async def _astream_deltas(self, model_name: str, messages: list, tools: list, kwargs: dict, finish, span=None):
+        stats = _CallStats(model_name)
+        lookup, cached_response = self._lookup_cache(model_name, messages, tools, kwargs, stats)
+        if cached_response is not None:
+            if cached_response.get_response_content():
+                yield cached_response.get_response_content()
+            finish(cached_response)
+            return
+
+        total_cost = 0.0
+        while True:
+            accumulator = StreamAccumulator()
+            with get_tracer().use_span(span):
+                stream, served_model = await self._acompletion(model_name, messages, tools, {**kwargs, "stream": True}, stats)
+            async for chunk in stream:
+                delta = accumulator.add(chunk)
+                if delta:
+                    stats.mark_first_token()
+                    yield delta
+            total_cost += self._record_stream_cost(accumulator, messages, served_model, stats)
+
+            if not accumulator.has_tool_calls():
+                break
+
+            messages.append(accumulator.get_assistant_message())
+            stats.tool_calls += len(accumulator.get_tool_calls())
+            with get_tracer().use_span(span):
+                tool_results = await ToolExecutor().arun_calls(self._resolve_tool_calls(accumulator.get_tool_calls()))
+            for tool_call_id, tool_response in tool_results:
+                messages.append({"role": "tool", "content": tool_response, "tool_call_id": tool_call_id})
+
+        content = accumulator.get_content()
+        self._store_in_cache(lookup, content, total_cost)
+        finish(stats.to_response(content, total_cost))
+
+    @staticmethod
+    def _split_mock_deltas(content: str) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", content)
+
+    def _mock_deltas(self, prompt: str, model_name: str, finish):
+        response = self.mock_response(prompt, model_name)
+        yield from self._split_mock_deltas(response.get_response_content())
+        finish(response)
+
+    async def _amock_deltas(self, prompt: str, model_name: str, finish):
+        response = self.mock_response(prompt, model_name)
+        for delta in self._split_mock_deltas(response.get_response_content()):
+            yield delta
+        finish(response)
 
     def add_custom_model(self, name: str, model_path: str):
         self.available_models[name] = model_path
 
     def refresh_models(self):
         """Refresh the list of available models"""
-        self.initialize_models()
+        self.initialize_models(force_refresh=True)
 
     def get_cost_summary(self) -> Dict[str, float]:
-        return {
-            "model_costs": {model: cost for model, cost in self.model_costs.items() if cost > 0},
-            "total_cost": self.total_cost
-        }
+        with self._cost_lock:
+            return {
+                "model_costs": {model: cost for model, cost in self.model_costs.items() if cost > 0},
+                "total_cost": self.total_cost,
+                "cache": {
+                    "hits": self.cache_hits,
+                    "misses": self.cache_misses,
+                    "semantic_hits": self.semantic_hits,
+                    "cost_saved": self.cost_saved
+                },
+                "reliability": {
+                    "retries": self.retried_requests,
+                    "hedged": self.hedged_requests,
+                    "fallbacks": self.fallback_requests,
+                    "abandoned_cost": self.abandoned_cost
+                }
+            }
 
     def reset_costs(self):
         """Reset all cost tracking to zero"""
-        self.model_costs.clear()
-        self.total_cost = 0.0
+        with self._cost_lock:
+            self.model_costs.clear()
+            self.total_cost = 0.0
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.semantic_hits = 0
+            self.cost_saved = 0.0
+            self.retried_requests = 0
+            self.hedged_requests = 0
+            self.fallback_requests = 0
+            self.abandoned_cost = 0.0
 
     def load_config(self):
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        with open(config_path, 'r') as config_file:
-            return json.load(config_file)
+        # Every wrapper shares one config dictionary, read from disk only once
+        return SharedConfig().data
 
     def save_config(self):
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        with open(config_path, 'w') as config_file:
-            json.dump(self.config, config_file, indent=2)
+        SharedConfig().save()
 
     def mock_response(self, prompt: str, model_name: str) -> Response:
         mocked_content = f"Mocked response for prompt: {prompt[:50]}..."
@@ -161,5 +930,7 @@ class DynamicLLMWrapper:
         
         return Response({
             "content": mocked_content,
-            "cost": format(mocked_cost, '.4f')
+            "cost": format(mocked_cost, '.4f'),
+            "model": model_name,
+            "iterations": 1
         })
\ No newline at end of file
@@ -0,0 +1,183 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Batch:
+    """Requests waiting to be sent together; they share a backend, model, tools and sampling kwargs."""
+
+    def __init__(self, backend, model_name: str, tools: Optional[list], kwargs: Dict[str, Any], deadline: float):
+        self.backend = backend
+        self.model_name = model_name
+        self.tools = tools
+        self.kwargs = kwargs
+        self.deadline = deadline
+        self.messages: List[list] = []
+        self.futures: List[Future] = []
+
+
+class MicroBatcher:
+    """Coalesces concurrent completion requests to the same model into batches.
+
+    The first request for a model, tools and sampling kwargs opens a batch
+    that stays open for ``window_seconds``; requests like it arriving in the
+    meantime join it, and it is sent when the window ends or once
+    ``max_batch_size`` requests are waiting. A batch goes out in a single
+    batch_completion call if the provider has a batch endpoint: models of the
+    ``batch_providers`` (litellm only batches vllm natively), or any model of a
+    backend whose supports_batch_completion() says so. Batches are sent from
+    a pool of ``max_workers`` threads. Requests to other providers are not
+    held back but sent as single requests from the same pool, in the
+    submitter's context; DynamicLLMWrapper sends those itself instead.
+
+    Every request gets its own future, resolved with its own response (and
+    so its own usage and cost) or with its own exception.
+    """
+    _shared: Optional['MicroBatcher'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, window_seconds: float = 0.01, max_batch_size: int = 16,
+                 batch_providers: Tuple[str, ...] = ("vllm",), max_workers: int = 32):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.batch_providers = tuple(batch_providers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-batch")
+        self._batches: Dict[tuple, _Batch] = {}
+        self._condition = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stats = {"requests": 0, "batches": 0, "batched_requests": 0, "pooled_requests": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'MicroBatcher':
+        return cls(
+            window_seconds=config.get("window_ms", 10) / 1000.0,
+            max_batch_size=config.get("max_batch_size", 16),
+            batch_providers=tuple(config.get("batch_providers", ("vllm",))),
+            max_workers=config.get("max_workers", 32),
+        )
+
+    @classmethod
+    def get_shared(cls, config: Dict[str, Any]) -> 'MicroBatcher':
+        """Return the process-wide batcher, creating it from ``config`` on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls.from_config(config)
+            return cls._shared
+
+    def supports_batch_completion(self, backend, model_name: str) -> bool:
+        supports = getattr(backend, "supports_batch_completion", None)
+        if supports is not None:
+            return supports(model_name)
+        return model_name.split("/", 1)[0] in self.batch_providers
+
+    def submit(self, backend, model_name: str, messages: list, tools: Optional[list],
+               kwargs: Dict[str, Any]) -> Future:
+        """Queue a non-streamed completion request; the returned future resolves to its response."""
+        future = Future()
+        batchable = self.supports_batch_completion(backend, model_name)
+        with self._condition:
+            self._stats["requests"] += 1
+            self._stats["pooled_requests"] += not batchable
+        if not batchable:
+            # Carries the caller's cancellation token and current span over to the pool thread
+            self._pool.submit(contextvars.copy_context().run, self._send_one, backend, model_name, messages,
+                              tools, kwargs, future)
+            return future
+
+        key = (id(backend), model_name, json.dumps({"tools": tools, "kwargs": kwargs}, sort_keys=True, default=str))
+        full = None
+        with self._condition:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = _Batch(backend, model_name, tools, kwargs,
+                                                    time.monotonic() + self.window_seconds)
+                self._start_dispatcher()
+                self._condition.notify()
+            batch.messages.append(messages)
+            batch.futures.append(future)
+            if len(batch.futures) >= self.max_batch_size:
+                full = self._batches.pop(key)
+        if full is not None:
+            self._pool.submit(self._send_batch, full)
+        return future
+
+    def _start_dispatcher(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name="llm-batch-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self) -> None:
+        """Send every batch whose window has ended; runs on the dispatcher thread."""
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                due = [key for key, batch in self._batches.items() if batch.deadline <= now]
+                ready = [self._batches.pop(key) for key in due]
+                if not ready:
+                    deadline = min((batch.deadline for batch in self._batches.values()), default=None)
+                    self._condition.wait(None if deadline is None else deadline - now)
+                    continue
+            for batch in ready:
+                self._pool.submit(self._send_batch, batch)
+
+    @staticmethod
+    def _send_one(backend, model_name: str, messages: list, tools: Optional[list], kwargs: Dict[str, Any],
+                  future: Future) -> None:
+        try:
+            future.set_result(backend.completion(model=model_name, messages=messages, tools=tools, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _send_batch(self, batch: _Batch) -> None:
+        if len(batch.futures) == 1:
+            # Nothing joined the batch; a single request is cheaper than a batch of one
+            self._send_one(batch.backend, batch.model_name, batch.messages[0], batch.tools, batch.kwargs,
+                           batch.futures[0])
+            return
+        with self._condition:
+            self._stats["batches"] += 1
+            self._stats["batched_requests"] += len(batch.futures)
+        try:
+            results = batch.backend.batch_completion(model=batch.model_name, messages=batch.messages,
+                                                     tools=batch.tools, **batch.kwargs)
+            if len(results) != len(batch.futures):
+                raise RuntimeError(f"batch_completion for {batch.model_name} returned {len(results)} "
+                                   f"responses to {len(batch.futures)} requests")
+        except Exception as e:
+            logging.warning(f"Batch of {len(batch.futures)} requests to {batch.model_name} failed: {e}")
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        # batch_completion reports failed requests in place of their responses
+        for future, result in zip(batch.futures, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(self._priced(batch.backend, result))
+
+    @staticmethod
+    def _priced(backend, response):
+        """Make sure a batched response carries its own cost, which the caller's wrapper is charged."""
+        hidden_params = getattr(response, "_hidden_params", None)
+        if hidden_params is None or hidden_params.get("response_cost") is not None:
+            return response
+        try:
+            hidden_params["response_cost"] = backend.completion_cost(completion_response=response)
+        except Exception:
+            # Models without pricing information (e.g. self-hosted ones) are not charged
+            hidden_params["response_cost"] = 0.0
+        return response
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._condition:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = stats["batched_requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._condition:
+            self._stats = {key: 0 for key in self._stats}
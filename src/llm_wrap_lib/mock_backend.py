@@ -0,0 +1,273 @@
+import asyncio
+import inspect
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class LatencyModel:
+    """Distribution that simulated latencies are drawn from, in seconds.
+
+    ``distribution`` is one of constant, uniform (between ``low`` and
+    ``high``), normal, lognormal or exponential (around ``mean`` with
+    ``stddev``). Samples are never negative.
+    """
+    distribution: str = "constant"
+    mean: float = 0.0
+    stddev: float = 0.0
+    low: float = 0.0
+    high: float = 0.0
+
+    DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+    def __post_init__(self):
+        if self.distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {self.distribution!r}; expected one of {self.DISTRIBUTIONS}")
+
+    @classmethod
+    def from_config(cls, config) -> 'LatencyModel':
+        """Build a model from a number (constant latency) or a dict of the dataclass fields."""
+        if config is None:
+            return cls()
+        if isinstance(config, (int, float)):
+            return cls(mean=float(config))
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in config.items() if key in fields})
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "uniform":
+            value = rng.uniform(self.low, self.high)
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean, self.stddev)
+        elif self.distribution == "lognormal":
+            if self.mean <= 0:
+                return 0.0
+            # Parameters of the underlying normal that give the requested mean and stddev
+            sigma = math.sqrt(math.log(1 + (self.stddev / self.mean) ** 2))
+            value = rng.lognormvariate(math.log(self.mean) - sigma ** 2 / 2, sigma)
+        elif self.distribution == "exponential":
+            value = rng.expovariate(1 / self.mean) if self.mean > 0 else 0.0
+        else:
+            value = self.mean
+        return max(0.0, value)
+
+
+class MockBackendError(Exception):
+    """Simulated provider failure; its status_code makes 429s and 5xxs retryable."""
+
+    def __init__(self, status_code: int, model: str):
+        super().__init__(f"Simulated {status_code} error from {model}")
+        self.status_code = status_code
+
+
+class MockBackend:
+    """Simulated LLM provider for offline benchmarks and tests.
+
+    It implements the part of litellm's module API the wrapper uses
+    (completion, acompletion, batch_completion, stream_chunk_builder and
+    completion_cost) and
+    returns objects shaped like litellm's, so requests go through the real
+    retry, hedging, tool-call and streaming paths. Unlike the ``mocking``
+    mode, responses take time: each request waits for a latency sampled
+    from ``latency``; streamed requests wait ``time_to_first_token`` and
+    then ``chunk_interval`` between chunks.
+
+    With ``tool_call_rate`` > 0 and tools offered, a request answers with
+    the calls in ``tool_calls`` (``{"name": ..., "arguments": {...}}``) for
+    up to ``max_tool_rounds`` rounds per conversation. A fraction
+    ``error_rate`` of requests fails with one of ``error_status_codes``.
+
+    With ``batch_endpoint`` a batch_completion batch is answered in one
+    round trip, taking as long as its slowest request, like a provider with
+    a batch API; otherwise the backend reports that it cannot batch.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None, latency: LatencyModel = None,
+                 time_to_first_token: LatencyModel = None, chunk_interval: float = 0.0,
+                 completion_tokens: int = 32, tool_calls: Optional[List[Dict[str, Any]]] = None,
+                 tool_call_rate: float = 0.0, max_tool_rounds: int = 1, error_rate: float = 0.0,
+                 error_status_codes: Optional[List[int]] = None, cost_per_token: float = 1e-6,
+                 batch_endpoint: bool = True, seed: Optional[int] = None):
+        self.models = list(models or ["mock-model"])
+        self.latency = latency or LatencyModel()
+        self.time_to_first_token = time_to_first_token or self.latency
+        self.chunk_interval = chunk_interval
+        self.completion_tokens = completion_tokens
+        self.tool_calls = list(tool_calls or [])
+        self.tool_call_rate = tool_call_rate
+        self.max_tool_rounds = max_tool_rounds
+        self.error_rate = error_rate
+        self.error_status_codes = list(error_status_codes or [429, 503])
+        self.cost_per_token = cost_per_token
+        self.batch_endpoint = batch_endpoint
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._request_ids = 0
+        self.reset_stats()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'MockBackend':
+        """Build a backend from the "mock_backend" section of config.json."""
+        options = dict(config)
+        for key in ("latency", "time_to_first_token"):
+            if key in options:
+                options[key] = LatencyModel.from_config(options[key])
+        parameters = inspect.signature(cls).parameters
+        return cls(**{key: value for key, value in options.items() if key in parameters})
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"requests": 0, "streamed": 0, "batches": 0, "errors": 0, "tool_call_turns": 0,
+                           "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _plan(self, model: str, messages: list, tools: Optional[list], stream: bool) -> Dict[str, Any]:
+        """Draw everything random about one request up front, under the lock."""
+        offered = {tool["function"]["name"] for tool in tools or []}
+        rounds = sum(1 for message in messages if message.get("role") == "assistant" and message.get("tool_calls"))
+        with self._lock:
+            self._request_ids += 1
+            request_id = self._request_ids
+            failed = self._rng.random() < self.error_rate
+            plan = {
+                "request_id": request_id,
+                "latency": (self.time_to_first_token if stream else self.latency).sample(self._rng),
+                "error": self._rng.choice(self.error_status_codes) if failed else None,
+                "tool_calls": [],
+            }
+            if offered and rounds < self.max_tool_rounds and self._rng.random() < self.tool_call_rate:
+                plan["tool_calls"] = [call for call in self.tool_calls if call["name"] in offered]
+
+            self._stats["requests"] += 1
+            self._stats["streamed"] += stream
+            if failed:
+                self._stats["errors"] += 1
+            elif plan["tool_calls"]:
+                self._stats["tool_call_turns"] += 1
+        return plan
+
+    def _usage(self, messages: list, completion_tokens: int) -> SimpleNamespace:
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+        with self._lock:
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["completion_tokens"] += completion_tokens
+        return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                               total_tokens=prompt_tokens + completion_tokens)
+
+    def _content(self, model: str, messages: list) -> str:
+        prompt = str(messages[-1].get("content") or "")
+        words = [f"Simulated answer from {model} to: {prompt[:40]}"]
+        words += [f"token{index}" for index in range(max(0, self.completion_tokens - len(words[0].split())))]
+        return " ".join(words)
+
+    def _tool_call_objects(self, plan: Dict[str, Any]) -> list:
+        return [
+            SimpleNamespace(
+                id=f"call_{plan['request_id']}_{index}",
+                type="function",
+                function=SimpleNamespace(name=call["name"], arguments=json.dumps(call.get("arguments", {}))),
+            )
+            for index, call in enumerate(plan["tool_calls"])
+        ]
+
+    def _response(self, model: str, messages: list, plan: Dict[str, Any]) -> SimpleNamespace:
+        tool_calls = self._tool_call_objects(plan) or None
+        content = None if tool_calls else self._content(model, messages)
+        usage = self._usage(messages, len(content.split()) if content else 8 * len(tool_calls))
+        return SimpleNamespace(
+            id=f"mock-{plan['request_id']}",
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                message=SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls),
+                finish_reason="tool_calls" if tool_calls else "stop",
+            )],
+            usage=usage,
+            _hidden_params={"response_cost": usage.total_tokens * self.cost_per_token},
+        )
+
+    @staticmethod
+    def _chunk(model: str, content: str = None, tool_calls: list = None, finish_reason: str = None):
+        delta = SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason)])
+
+    def _chunks(self, model: str, messages: list, plan: Dict[str, Any]) -> list:
+        """Split a response into stream chunks; tool calls arrive as a name chunk and an arguments chunk."""
+        response = self._response(model, messages, plan)
+        message = response.choices[0].message
+        chunks = []
+        for index, tool_call in enumerate(message.tool_calls or []):
+            chunks.append(self._chunk(model, tool_calls=[SimpleNamespace(
+                index=index, id=tool_call.id, function=SimpleNamespace(name=tool_call.function.name, arguments=None))]))
+            chunks.append(self._chunk(model, tool_calls=[SimpleNamespace(
+                index=index, id=None, function=SimpleNamespace(name=None, arguments=tool_call.function.arguments))]))
+        words = (message.content or "").split(" ")
+        for index, word in enumerate(words if message.content else []):
+            chunks.append(self._chunk(model, content=word if index == len(words) - 1 else word + " "))
+        final = self._chunk(model, finish_reason=response.choices[0].finish_reason)
+        final.usage = response.usage
+        final._hidden_params = response._hidden_params
+        chunks.append(final)
+        return chunks
+
+    def completion(self, model: str, messages: list, tools: list = None, stream: bool = False, **kwargs):
+        plan = self._plan(model, messages, tools, stream)
+        time.sleep(plan["latency"])
+        if plan["error"] is not None:
+            raise MockBackendError(plan["error"], model)
+        if not stream:
+            return self._response(model, messages, plan)
+        return self._stream(self._chunks(model, messages, plan))
+
+    def supports_batch_completion(self, model: str) -> bool:
+        return self.batch_endpoint
+
+    def batch_completion(self, model: str, messages: list, tools: list = None, **kwargs) -> list:
+        """Answer a list of conversations in one round trip; failed requests are returned as exceptions."""
+        plans = [self._plan(model, conversation, tools, False) for conversation in messages]
+        with self._lock:
+            self._stats["batches"] += 1
+        time.sleep(max(plan["latency"] for plan in plans))
+        return [MockBackendError(plan["error"], model) if plan["error"] is not None
+                else self._response(model, conversation, plan)
+                for conversation, plan in zip(messages, plans)]
+
+    def _stream(self, chunks: list):
+        for index, chunk in enumerate(chunks):
+            if index and self.chunk_interval:
+                time.sleep(self.chunk_interval)
+            yield chunk
+
+    async def acompletion(self, model: str, messages: list, tools: list = None, stream: bool = False, **kwargs):
+        plan = self._plan(model, messages, tools, stream)
+        await asyncio.sleep(plan["latency"])
+        if plan["error"] is not None:
+            raise MockBackendError(plan["error"], model)
+        if not stream:
+            return self._response(model, messages, plan)
+        return self._astream(self._chunks(model, messages, plan))
+
+    async def _astream(self, chunks: list):
+        for index, chunk in enumerate(chunks):
+            if index and self.chunk_interval:
+                await asyncio.sleep(self.chunk_interval)
+            yield chunk
+
+    @staticmethod
+    def stream_chunk_builder(chunks: list, messages: list = None):
+        """Return the usage and cost carried by the final chunk, like litellm's rebuilt response."""
+        final = chunks[-1]
+        return SimpleNamespace(usage=final.usage, _hidden_params=final._hidden_params)
+
+    @staticmethod
+    def completion_cost(completion_response) -> float:
+        return completion_response._hidden_params.get("response_cost", 0.0)
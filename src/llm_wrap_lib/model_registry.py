@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+from typing import List
+
+
+def get_valid_models() -> List[str]:
+    # litellm takes a second or more to import, so it is only loaded when models are first discovered
+    from litellm.utils import get_valid_models as litellm_get_valid_models
+    return litellm_get_valid_models()
+
+
+class ModelRegistry:
+    """Process-wide cache of the models litellm reports as usable.
+
+    Discovery runs once and is reused by every DynamicLLMWrapper until the
+    refresh TTL expires or a refresh is forced.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ModelRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, ttl_seconds: float = 3600.0):
+        if not hasattr(self, '_lock'):
+            self._lock = threading.Lock()
+            self._models = None
+            self._loaded_at = 0.0
+            self.ttl_seconds = ttl_seconds
+
+    def is_stale(self) -> bool:
+        if self._models is None:
+            return True
+        return self.ttl_seconds is not None and time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def get_models(self, force_refresh: bool = False) -> List[str]:
+        with self._lock:
+            if force_refresh or self.is_stale():
+                self._models = list(get_valid_models())
+                self._loaded_at = time.monotonic()
+            return list(self._models)
+
+    def prefetch(self) -> threading.Thread:
+        """Run discovery on a background thread, so that the first wrapper to need the models waits less."""
+        thread = threading.Thread(target=self._prefetch, name="model-discovery", daemon=True)
+        thread.start()
+        return thread
+
+    def _prefetch(self) -> None:
+        try:
+            self.get_models()
+        except Exception as e:
+            logging.warning(f"Model discovery failed: {e}")
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._models = None
@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class TokenBucket:
+    """Bucket holding up to ``capacity`` units, refilled continuously at ``refill_per_second``."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def time_until_available(self, amount: float, now: float) -> float:
+        # A request larger than the bucket can never fit; let it through once the bucket is full
+        amount = min(amount, self.capacity)
+        self._refill(now)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / self.refill_per_second
+
+    def consume(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self._level -= min(amount, self.capacity)
+
+
+@dataclass
+class _Ticket:
+    client: Hashable
+    tokens: int
+    seq: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one model.
+
+    Waiting requests are served fairly across clients (agents): the next
+    request to go is the oldest one from the client served least recently,
+    so a single busy agent cannot starve the others.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._request_bucket = TokenBucket(rpm, rpm / 60.0) if rpm else None
+        self._token_bucket = TokenBucket(tpm, tpm / 60.0) if tpm else None
+        self._condition = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._serve_seq = itertools.count()
+        self._last_served: Dict[Hashable, int] = {}
+
+        self.total_requests = 0
+        self.throttled_requests = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _next_ticket(self) -> _Ticket:
+        return min(self._waiting, key=lambda ticket: (self._last_served.get(ticket.client, -1), ticket.seq))
+
+    def _delay(self, ticket: _Ticket, now: float) -> float:
+        delay = 0.0
+        if self._request_bucket is not None:
+            delay = max(delay, self._request_bucket.time_until_available(1, now))
+        if self._token_bucket is not None:
+            delay = max(delay, self._token_bucket.time_until_available(ticket.tokens, now))
+        return delay
+
+    def _try_grant(self, ticket: _Ticket) -> Tuple[bool, Optional[float]]:
+        """Grant the ticket if it is next in line and the budget allows it.
+
+        Must be called with the condition held. Returns (granted, wait), where
+        wait is how long until the budget allows the ticket, or None if other
+        tickets are ahead of it.
+        """
+        if self._next_ticket() is not ticket:
+            return False, None
+        now = time.monotonic()
+        delay = self._delay(ticket, now)
+        if delay > 0:
+            return False, delay
+
+        if self._request_bucket is not None:
+            self._request_bucket.consume(1, now)
+        if self._token_bucket is not None:
+            self._token_bucket.consume(ticket.tokens, now)
+        self._waiting.remove(ticket)
+        self._last_served[ticket.client] = next(self._serve_seq)
+
+        waited = now - ticket.enqueued_at
+        self.total_requests += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        if waited > 0.001:
+            self.throttled_requests += 1
+        self._condition.notify_all()
+        return True, 0.0
+
+    def acquire(self, client: Hashable, tokens: int) -> None:
+        """Block until a request of ``tokens`` estimated tokens may be sent."""
+        with self._condition:
+            ticket = _Ticket(client, tokens, next(self._seq))
+            self._waiting.append(ticket)
+            while True:
+                granted, delay = self._try_grant(ticket)
+                if granted:
+                    return
+                # Behind other tickets (delay is None): sleep until someone else is served
+                self._condition.wait(delay)
+
+    async def aacquire(self, client: Hashable, tokens: int) -> None:
+        """Asynchronous acquire; waits with asyncio.sleep so the event loop keeps running."""
+        with self._condition:
+            ticket = _Ticket(client, tokens, next(self._seq))
+            self._waiting.append(ticket)
+        try:
+            while True:
+                with self._condition:
+                    granted, delay = self._try_grant(ticket)
+                if granted:
+                    return
+                await asyncio.sleep(delay if delay is not None else 0.01)
+        except BaseException:
+            with self._condition:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._condition.notify_all()
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "queue_depth": len(self._waiting),
+                "total_requests": self.total_requests,
+                "throttled_requests": self.throttled_requests,
+                "total_wait_seconds": self.total_wait_seconds,
+                "average_wait_seconds": self.total_wait_seconds / self.total_requests if self.total_requests else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+class RateLimiter:
+    """Process-wide set of per-model rate limiters shared by every wrapper."""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(RateLimiter, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_limiters'):
+            self._limiters: Dict[str, ModelRateLimiter] = {}
+            self._lock = threading.Lock()
+
+    def configure(self, limits: Dict[str, Dict[str, float]]) -> None:
+        """Set budgets from a mapping of model name to {"rpm": ..., "tpm": ...}.
+
+        Models whose budget is unchanged keep their limiter (and its state).
+        """
+        with self._lock:
+            for model_name, limit in limits.items():
+                rpm, tpm = limit.get("rpm"), limit.get("tpm")
+                current = self._limiters.get(model_name)
+                if current is not None and (current.rpm, current.tpm) == (rpm, tpm):
+                    continue
+                self._limiters[model_name] = ModelRateLimiter(rpm=rpm, tpm=tpm)
+
+    def get_limiter(self, model_name: str) -> Optional[ModelRateLimiter]:
+        return self._limiters.get(model_name)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {model_name: limiter.get_stats() for model_name, limiter in self._limiters.items()}
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class ResponseCache:
+    """On-disk cache of final LLM responses, backed by SQLite.
+
+    Entries are keyed on the model, messages, tools and sampling kwargs of a
+    call. The cache is bounded to ``max_entries`` (least recently used entries
+    are evicted first) and entries older than ``ttl_seconds`` are discarded.
+    """
+    _shared: Dict[str, 'ResponseCache'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, max_entries: int = 1000, ttl_seconds: Optional[float] = None,
+                 deterministic_only: bool = True):
+        self._path = path
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._deterministic_only = deterministic_only
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT,"
+            " cost REAL,"
+            " created_at REAL,"
+            " last_accessed REAL)"
+        )
+        self._connection.commit()
+
+    @classmethod
+    def get_shared(cls, path: str, **kwargs) -> 'ResponseCache':
+        """Return the process-wide cache for ``path``, opening it on first use."""
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(path, **kwargs)
+            return cls._shared[path]
+
+    @staticmethod
+    def make_key(model_name: str, messages: List[Dict[str, Any]], tools: Optional[list],
+                 kwargs: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model_name, "messages": messages, "tools": tools, "kwargs": kwargs},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, kwargs: Dict[str, Any]) -> bool:
+        """Return True if a call made with these sampling kwargs may be cached."""
+        if not self._deterministic_only:
+            return True
+        return kwargs.get('temperature') == 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, cost, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, cost, created_at = row
+            if self._ttl_seconds is not None and now - created_at > self._ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            self._connection.execute("UPDATE responses SET last_accessed = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+        return {"content": content, "cost": cost}
+
+    def put(self, key: str, content: str, cost: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, cost, created_at, last_accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, content, cost, now, now),
+            )
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now: float) -> None:
+        if self._ttl_seconds is not None:
+            self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self._ttl_seconds,))
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - self._max_entries
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY last_accessed ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,101 @@
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+# litellm exception types worth retrying; looked up by name since not every
+# litellm release defines all of them
+RETRYABLE_EXCEPTION_NAMES = (
+    "RateLimitError",
+    "Timeout",
+    "APIConnectionError",
+    "ServiceUnavailableError",
+    "InternalServerError",
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return True for transient failures (rate limits, timeouts, 5xx, dropped connections)."""
+    import litellm
+    retryable_types = tuple(
+        getattr(litellm, name) for name in RETRYABLE_EXCEPTION_NAMES if isinstance(getattr(litellm, name, None), type)
+    )
+    if isinstance(error, retryable_types + (ConnectionError, TimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+@dataclass
+class RetryPolicy:
+    """How a single model call is retried and hedged.
+
+    Retries back off exponentially from ``base_delay`` up to ``max_delay``;
+    ``jitter`` is the fraction of each delay that is randomised (1.0 is "full
+    jitter"). With ``hedge`` enabled, a duplicate request is sent if the first
+    has not answered within ``hedge_after_seconds``, or, when that is unset,
+    within the model's observed ``hedge_percentile`` latency.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    jitter: float = 1.0
+    hedge: bool = False
+    hedge_after_seconds: Optional[float] = None
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError(f"Retry max_attempts must be at least 1 (the first call counts), got {self.max_attempts}")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RetryPolicy':
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in config.items() if key in fields})
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (0-based)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay - random.uniform(0, delay * self.jitter)
+
+    def hedge_delay(self, model_name: str) -> Optional[float]:
+        """Seconds to wait before hedging a call, or None if it should not be hedged."""
+        if not self.hedge:
+            return None
+        if self.hedge_after_seconds is not None:
+            return self.hedge_after_seconds
+        return LatencyTracker().percentile(model_name, self.hedge_percentile, self.hedge_min_samples)
+
+
+class LatencyTracker:
+    """Process-wide record of recent successful call latencies per model."""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(LatencyTracker, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, window: int = 200):
+        if not hasattr(self, '_latencies'):
+            self._latencies: Dict[str, Deque[float]] = {}
+            self._window = window
+            self._lock = threading.Lock()
+
+    def record(self, model_name: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(model_name, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, model_name: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(model_name, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latencies.clear()
@@ -0,0 +1,216 @@
+import importlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Embeds text offline by hashing its words and word pairs into a fixed-size vector.
+
+    Whitespace, case and punctuation do not change the vector, and moving a
+    block of text only changes the word pairs at its edges, so such
+    near-duplicates score close to 1.0 under cosine similarity.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def features(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        features = self.features(text)
+        if not features:
+            return vector
+        # crc32 is stable across processes, unlike hash(); its top bit picks the sign so collisions cancel out
+        hashes = np.array([zlib.crc32(feature.encode('utf-8')) for feature in features], dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (hashes & 0x7FFFFFFF) % self.dimensions, signs)
+        # Damp repeated features so that one long repeated block does not dominate
+        return np.sign(vector) * np.log1p(np.abs(vector))
+
+
+def load_embedder(spec: Optional[str], dimensions: int = 1024):
+    """Return the embedder named by ``spec`` ("module:attribute"), or a HashingEmbedder if spec is empty.
+
+    The attribute may be an object with an ``embed(text)`` method or a class
+    or factory that returns one.
+    """
+    if not spec:
+        return HashingEmbedder(dimensions)
+    module_name, _, attribute = spec.partition(":")
+    embedder = getattr(importlib.import_module(module_name), attribute)
+    return embedder() if isinstance(embedder, type) or not hasattr(embedder, "embed") else embedder
+
+
+class _Index:
+    """The vectors and answers of one scope; rows are reused as entries are evicted."""
+
+    def __init__(self, dimensions: int, capacity: int):
+        self.vectors = np.zeros((min(capacity, 64), dimensions), dtype=np.float32)
+        self.created_at = np.zeros(len(self.vectors))
+        self.last_used = np.zeros(len(self.vectors))
+        self.entries: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def grow(self, capacity: int) -> None:
+        size = min(capacity, 2 * len(self.vectors))
+        self.vectors = np.resize(self.vectors, (size, self.vectors.shape[1]))
+        self.created_at = np.resize(self.created_at, size)
+        self.last_used = np.resize(self.last_used, size)
+
+
+class SemanticCache:
+    """In-memory cache that answers prompts that are near-duplicates of earlier ones.
+
+    Prompts are embedded (by a HashingEmbedder unless another ``embedder`` is
+    given) and kept per scope in a NumPy matrix of unit vectors, so a lookup
+    is one matrix-vector product. A cached answer is served when its prompt's
+    cosine similarity to the new one is at least ``threshold``.
+
+    Scopes keep answers apart that must not be mixed: the model, tools and
+    sampling kwargs of a call, and with ``scope="agent"`` also the agent.
+
+    A fraction ``verify_rate`` of hits is not served but sent to the model,
+    and the fresh answer is compared with the cached one; answers less similar
+    than ``verify_threshold`` count as false positives.
+    """
+    _shared: Optional['SemanticCache'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, threshold: float = 0.97, scope: str = "model", max_entries: int = 1000,
+                 ttl_seconds: Optional[float] = None, deterministic_only: bool = True, verify_rate: float = 0.0,
+                 verify_threshold: float = 0.8, embedder=None, seed: Optional[int] = None):
+        if scope not in ("model", "agent"):
+            raise ValueError(f"Unknown semantic cache scope {scope!r}; expected 'model' or 'agent'")
+        self.threshold = threshold
+        self.scope = scope
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.deterministic_only = deterministic_only
+        self.verify_rate = verify_rate
+        self.verify_threshold = verify_threshold
+        self.embedder = embedder or HashingEmbedder()
+        self._random = random.Random(seed)
+        self._indexes: Dict[str, _Index] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "verified": 0, "false_positives": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SemanticCache':
+        options = {key: value for key, value in config.items()
+                   if key in ("threshold", "scope", "max_entries", "ttl_seconds", "deterministic_only",
+                              "verify_rate", "verify_threshold", "seed")}
+        return cls(embedder=load_embedder(config.get("embedder"), config.get("dimensions", 1024)), **options)
+
+    @classmethod
+    def get_shared(cls, config: Dict[str, Any]) -> 'SemanticCache':
+        """Return the process-wide cache, creating it from ``config`` on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls.from_config(config)
+            return cls._shared
+
+    def make_scope(self, model_name: str, tools: Optional[list], kwargs: Dict[str, Any], agent: str = None) -> str:
+        return json.dumps({
+            "model": model_name,
+            "agent": agent if self.scope == "agent" else None,
+            "tools": tools,
+            "kwargs": kwargs,
+        }, sort_keys=True, default=str)
+
+    def is_cacheable(self, kwargs: Dict[str, Any]) -> bool:
+        """Return True if a call made with these sampling kwargs may be cached."""
+        return not self.deterministic_only or kwargs.get('temperature') == 0
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.embed(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get(self, scope: str, prompt: str) -> Optional[Dict[str, Any]]:
+        """Return the closest cached answer in ``scope`` as a dict, or None if nothing is similar enough.
+
+        The dict has the answer's ``content`` and ``cost``, the ``prompt`` it
+        was given for and the ``similarity`` of that prompt to this one.
+        """
+        query = self.embed(prompt)
+        now = time.time()
+        with self._lock:
+            index = self._indexes.get(scope)
+            match = None
+            if index is not None and len(index):
+                count = len(index)
+                similarities = index.vectors[:count] @ query
+                if self.ttl_seconds is not None:
+                    similarities[index.created_at[:count] < now - self.ttl_seconds] = -np.inf
+                row = int(np.argmax(similarities))
+                if similarities[row] >= self.threshold:
+                    index.last_used[row] = now
+                    match = dict(index.entries[row], similarity=float(similarities[row]))
+            self._stats["hits" if match is not None else "misses"] += 1
+        return match
+
+    def should_verify(self) -> bool:
+        """Decide whether a hit is sent to the model anyway to check the cached answer."""
+        return self.verify_rate > 0 and self._random.random() < self.verify_rate
+
+    def record_verification(self, hit: Dict[str, Any], content: str) -> bool:
+        """Compare a sampled hit with the model's fresh answer; return True if it was a false positive."""
+        cached, fresh = self.embed(hit["content"] or ""), self.embed(content or "")
+        false_positive = float(cached @ fresh) < self.verify_threshold
+        with self._lock:
+            self._stats["verified"] += 1
+            self._stats["false_positives"] += int(false_positive)
+        return false_positive
+
+    def put(self, scope: str, prompt: str, content: str, cost: float) -> None:
+        vector = self.embed(prompt)
+        now = time.time()
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = _Index(len(vector), self.max_entries)
+            entry = {"prompt": prompt, "content": content, "cost": cost}
+            if len(index) < self.max_entries:
+                if len(index) == len(index.vectors):
+                    index.grow(self.max_entries)
+                row = len(index)
+                index.entries.append(entry)
+            else:
+                # Full: the least recently used row is overwritten
+                row = int(np.argmin(index.last_used[:len(index)]))
+                index.entries[row] = entry
+            index.vectors[row] = vector
+            index.created_at[row] = now
+            index.last_used[row] = now
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = sum(len(index) for index in self._indexes.values())
+            stats["scopes"] = len(self._indexes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["false_positive_rate"] = stats["false_positives"] / stats["verified"] if stats["verified"] else 0.0
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._stats = {"hits": 0, "misses": 0, "verified": 0, "false_positives": 0}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(index) for index in self._indexes.values())
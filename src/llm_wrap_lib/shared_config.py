@@ -0,0 +1,35 @@
+import json
+import os
+import threading
+from typing import Any, Dict
+
+
+class SharedConfig:
+    """Single in-memory copy of config.json shared by every wrapper."""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(SharedConfig, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, config_path: str = None):
+        if not hasattr(self, 'data'):
+            self._config_path = config_path or os.path.join(os.path.dirname(__file__), 'config.json')
+            self._lock = threading.Lock()
+            self.data: Dict[str, Any] = {}
+            self.reload()
+
+    def reload(self) -> Dict[str, Any]:
+        """Re-read config.json, updating the shared dictionary in place."""
+        with self._lock:
+            with open(self._config_path, 'r') as config_file:
+                loaded = json.load(config_file)
+            self.data.clear()
+            self.data.update(loaded)
+        return self.data
+
+    def save(self) -> None:
+        with self._lock:
+            with open(self._config_path, 'w') as config_file:
+                json.dump(self.data, config_file, indent=2)
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+
+class StreamAccumulator:
+    """Collects the chunks of one streamed completion.
+
+    Text deltas are returned as they arrive; tool-call deltas are merged by
+    index, since a single call's name and arguments are split over many chunks.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self._content_parts: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, str]] = {}
+
+    def add(self, chunk) -> Optional[str]:
+        self.chunks.append(chunk)
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+
+        for tool_call_delta in getattr(delta, 'tool_calls', None) or []:
+            tool_call = self._tool_calls.setdefault(tool_call_delta.index, {"id": None, "name": "", "arguments": ""})
+            if tool_call_delta.id:
+                tool_call["id"] = tool_call_delta.id
+            function = tool_call_delta.function
+            if function is not None:
+                if function.name:
+                    tool_call["name"] += function.name
+                if function.arguments:
+                    tool_call["arguments"] += function.arguments
+
+        content = getattr(delta, 'content', None)
+        if content:
+            self._content_parts.append(content)
+            return content
+        return None
+
+    def get_content(self) -> Optional[str]:
+        return "".join(self._content_parts) if self._content_parts else None
+
+    def has_tool_calls(self) -> bool:
+        return bool(self._tool_calls)
+
+    def get_tool_calls(self) -> list:
+        """Return the completed tool calls in the shape of a non-streamed message."""
+        return [
+            SimpleNamespace(
+                id=tool_call["id"],
+                type="function",
+                function=SimpleNamespace(name=tool_call["name"], arguments=tool_call["arguments"]),
+            )
+            for _, tool_call in sorted(self._tool_calls.items())
+        ]
+
+    def get_assistant_message(self) -> dict:
+        return {
+            "role": "assistant",
+            "content": self.get_content(),
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+                }
+                for tool_call in self.get_tool_calls()
+            ],
+        }
+
+
+class StreamingResponse:
+    """Iterator over the text deltas of a streamed call.
+
+    Once the stream is exhausted, get_response() returns the final Response;
+    calling it early drains the remaining deltas first.
+    """
+
+    def __init__(self, deltas_factory):
+        self._response = None
+        self._deltas = deltas_factory(self._set_response)
+
+    def _set_response(self, response) -> None:
+        self._response = response
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._deltas)
+
+    def get_response(self):
+        for _ in self:
+            pass
+        return self._response
+
+
+class AsyncStreamingResponse:
+    """Async iterator counterpart of StreamingResponse."""
+
+    def __init__(self, deltas_factory):
+        self._response = None
+        self._deltas = deltas_factory(self._set_response)
+
+    def _set_response(self, response) -> None:
+        self._response = response
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        return await self._deltas.__anext__()
+
+    async def get_response(self):
+        async for _ in self:
+            pass
+        return self._response
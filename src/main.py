@@ -1,10 +1,12 @@
 import logging; from logging_config import setup_logging
 import sys
 import sys
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from agent_handler.agent import Agent
 from agent_handler.task import Task
 from gui.gui_main import MainWindow
+from llm_wrap_lib.model_registry import ModelRegistry
 
 def create_sample_agents():
     agents = {
@@ -39,6 +41,9 @@ def main():
     window.set_agents(agents)  # Use the new set_agents method
     window.show()
 
+    # Discover models once the event loop is running, so that the window is drawn first
+    QTimer.singleShot(0, ModelRegistry().prefetch)
+
     sys.exit(app.exec())
 
 if __name__ == "__main__":
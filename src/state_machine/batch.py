@@ -0,0 +1,124 @@
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, Iterator
+from state_machine.engine import StateMachineEngine
+from state_machine.loader import build_agents
+
+# Agent and task fields that may reference record variables, e.g. "Research {topic}"
+TEMPLATED_AGENT_FIELDS = ("goal", "backstory")
+TEMPLATED_TASK_FIELDS = ("description", "expected_output")
+
+# "{{" and "}}" stand for single braces and "{name}" is a variable; any other brace is literal text
+_FIELD_PATTERN = re.compile(r"\{\{|\}\}|\{([^\W\d]\w*)\}")
+
+
+def substitute_variables(text: str, variables: Dict[str, Any]) -> str:
+    """Replace each ``{name}`` in ``text`` with the record's value for it.
+
+    Unlike str.format, braces that do not enclose a plain name, such as JSON
+    or code in a backstory, are kept as they are. Raises KeyError for a name
+    the record does not have.
+    """
+    def replace(match):
+        name = match.group(1)
+        return match.group(0)[0] if name is None else str(variables[name])
+    return _FIELD_PATTERN.sub(replace, text)
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield one input record per non-empty line of a JSONL file."""
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class BatchRunner:
+    """Runs one state machine over many input records.
+
+    Each record gets its own agents, tasks and states, built from the agent
+    definitions with the record's variables substituted into their text
+    fields, so runs never share mutable state. At most ``concurrency``
+    records run at once and results are yielded as soon as each finishes.
+    """
+
+    def __init__(self, graph: Dict[str, Any], agent_definitions: Dict[str, Any],
+                 concurrency: int = 4, state_workers: int = 4):
+        self.graph = graph
+        self.agent_definitions = agent_definitions
+        self.concurrency = concurrency
+        self.state_workers = state_workers
+
+    def render_definitions(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self._render_definitions(variables)
+        except KeyError as e:
+            raise ValueError(f"Input record is missing variable {e}") from e
+
+    def _render_definitions(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        agents = []
+        for agent_data in self.agent_definitions["agents"]:
+            agent_data = dict(agent_data)
+            for field in TEMPLATED_AGENT_FIELDS:
+                if field in agent_data:
+                    agent_data[field] = substitute_variables(agent_data[field], variables)
+            if agent_data.get("task") is not None:
+                task_data = dict(agent_data["task"])
+                for field in TEMPLATED_TASK_FIELDS:
+                    if field in task_data:
+                        task_data[field] = substitute_variables(task_data[field], variables)
+                agent_data["task"] = task_data
+            agents.append(agent_data)
+        return {**self.agent_definitions, "agents": agents}
+
+    def build_state_machine(self, variables: Dict[str, Any]) -> StateMachineEngine:
+        agents = build_agents(self.render_definitions(variables))
+        state_machine = StateMachineEngine.from_dict(self.graph, agents)
+        state_machine.max_workers = self.state_workers
+        return state_machine
+
+    def run_record(self, index: int, variables: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"index": index, "input": variables, "run_id": None, "states": [], "error": None}
+        try:
+            state_machine = self.build_state_machine(variables)
+            responses = state_machine.run()
+        except Exception as e:
+            logging.error(f"Batch record {index} failed: {e}")
+            result["error"] = str(e)
+            return result
+
+        result["run_id"] = state_machine.run_id
+        result["states"] = [
+            {"name": state.get_name(), "response": response}
+            for state, response in responses.items()
+        ]
+        result["cost"] = sum(state.agent.get_cost_summary()["total_cost"] for state in state_machine.states)
+        result["metrics"] = state_machine.get_metrics().totals()
+        return result
+
+    def run(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield one result per record, in completion order.
+
+        Records are pulled from the iterable lazily, so arbitrarily large
+        inputs (e.g. iter_jsonl over a big file) are never held in memory.
+        Each result carries the record's position in ``index``.
+        """
+        records = enumerate(records)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = set()
+
+            def fill():
+                for index, variables in records:
+                    pending.add(pool.submit(self.run_record, index, variables))
+                    if len(pending) >= self.concurrency:
+                        return
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield future.result()
+                fill()
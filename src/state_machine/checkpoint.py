@@ -0,0 +1,218 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+DEFAULT_CHECKPOINT_PATH = ".checkpoints.sqlite3"
+
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_FAILED = "failed"
+RUN_CANCELLED = "cancelled"
+
+
+class CheckpointStore(ABC):
+    """Where the engine persists each finished state so an interrupted run can be resumed.
+
+    A checkpoint is a dict with the state's ``response``, the ``context`` it
+    was given, the ``cost`` of producing it and, for incremental runs, the
+    ``fingerprint`` of its inputs. Runs are identified by their run ID and
+    states by name.
+    """
+
+    @abstractmethod
+    def save_state(self, run_id: str, state_name: str, checkpoint: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def load_states(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def find_result(self, state_name: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the latest checkpoint of ``state_name`` from any run whose inputs had this fingerprint."""
+
+    @abstractmethod
+    def set_run_status(self, run_id: str, status: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_run_status(self, run_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def get_latest_run(self, unfinished_only: bool = True) -> Optional[str]:
+        """Return the most recently updated run ID, skipping completed runs if unfinished_only."""
+
+    @abstractmethod
+    def delete_run(self, run_id: str) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """Keeps checkpoints in memory; they do not survive the process. Mainly for tests."""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._by_fingerprint: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def save_state(self, run_id: str, state_name: str, checkpoint: Dict[str, Any]) -> None:
+        with self._lock:
+            self._states.setdefault(run_id, {})[state_name] = dict(checkpoint)
+            if checkpoint.get("fingerprint"):
+                self._by_fingerprint[(state_name, checkpoint["fingerprint"])] = dict(checkpoint)
+
+    def load_states(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(checkpoint) for name, checkpoint in self._states.get(run_id, {}).items()}
+
+    def find_result(self, state_name: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            checkpoint = self._by_fingerprint.get((state_name, fingerprint))
+        return dict(checkpoint) if checkpoint is not None else None
+
+    def set_run_status(self, run_id: str, status: str) -> None:
+        with self._lock:
+            self._runs[run_id] = {"status": status, "updated_at": time.time()}
+
+    def get_run_status(self, run_id: str) -> Optional[str]:
+        with self._lock:
+            run = self._runs.get(run_id)
+        return run["status"] if run else None
+
+    def get_latest_run(self, unfinished_only: bool = True) -> Optional[str]:
+        with self._lock:
+            runs = [
+                (run["updated_at"], run_id) for run_id, run in self._runs.items()
+                if not unfinished_only or run["status"] != RUN_COMPLETED
+            ]
+        return max(runs)[1] if runs else None
+
+    def delete_run(self, run_id: str) -> None:
+        with self._lock:
+            for state_name, checkpoint in self._states.pop(run_id, {}).items():
+                key = (state_name, checkpoint.get("fingerprint"))
+                if self._by_fingerprint.get(key) == checkpoint:
+                    del self._by_fingerprint[key]
+            self._runs.pop(run_id, None)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoints stored in a SQLite database, safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " status TEXT,"
+            " updated_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS states ("
+            " run_id TEXT,"
+            " state_name TEXT,"
+            " checkpoint TEXT,"
+            " fingerprint TEXT,"
+            " completed_at REAL,"
+            " PRIMARY KEY (run_id, state_name))"
+        )
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(states)")}
+        if "fingerprint" not in columns:
+            # Stores created before incremental runs existed
+            self._connection.execute("ALTER TABLE states ADD COLUMN fingerprint TEXT")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS states_by_fingerprint ON states (state_name, fingerprint)"
+        )
+        self._connection.commit()
+
+    def save_state(self, run_id: str, state_name: str, checkpoint: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO states (run_id, state_name, checkpoint, fingerprint, completed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (run_id, state_name, json.dumps(checkpoint, default=str), checkpoint.get("fingerprint"), now),
+            )
+            self._connection.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+            self._connection.commit()
+
+    def load_states(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT state_name, checkpoint FROM states WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {state_name: json.loads(checkpoint) for state_name, checkpoint in rows}
+
+    def find_result(self, state_name: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT checkpoint FROM states WHERE state_name = ? AND fingerprint = ?"
+                " ORDER BY completed_at DESC LIMIT 1",
+                (state_name, fingerprint),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_run_status(self, run_id: str, status: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs (run_id, status, updated_at) VALUES (?, ?, ?)",
+                (run_id, status, time.time()),
+            )
+            self._connection.commit()
+
+    def get_run_status(self, run_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT status FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_latest_run(self, unfinished_only: bool = True) -> Optional[str]:
+        query = "SELECT run_id FROM runs"
+        parameters = ()
+        if unfinished_only:
+            query += " WHERE status != ?"
+            parameters = (RUN_COMPLETED,)
+        with self._lock:
+            row = self._connection.execute(query + " ORDER BY updated_at DESC LIMIT 1", parameters).fetchone()
+        return row[0] if row else None
+
+    def delete_run(self, run_id: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM states WHERE run_id = ?", (run_id,))
+            self._connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_default_store: Optional[CheckpointStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> CheckpointStore:
+    """Return the process-wide store, creating a SQLiteCheckpointStore in the working directory on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SQLiteCheckpointStore()
+        return _default_store
+
+
+def set_default_store(store: CheckpointStore) -> None:
+    """Replace the process-wide store, closing the previous one."""
+    global _default_store
+    with _default_store_lock:
+        previous, _default_store = _default_store, store
+    if previous is not None and previous is not store:
+        previous.close()
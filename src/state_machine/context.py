@@ -0,0 +1,165 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from trace_handler.tracer import get_tracer
+
+# (source state name, text); the source is None for the single result of a plain hand-off
+ContextEntry = Tuple[Optional[str], str]
+
+TOKEN_COUNT_MODEL = "gpt-3.5-turbo"
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    if not text:
+        return 0
+    import litellm
+    try:
+        return litellm.token_counter(model=model or TOKEN_COUNT_MODEL, text=text)
+    except Exception:
+        # Unknown tokenizer; roughly four characters per token
+        return len(text) // 4
+
+
+def context_entries(context: Dict[str, Any]) -> List[ContextEntry]:
+    """Flatten a merged context ({"previous_result": ...} or {"previous_results": {...}}) into entries."""
+    if "previous_results" in context:
+        return [(name, str(result)) for name, result in context["previous_results"].items()]
+    if "previous_result" in context:
+        return [(None, str(context["previous_result"]))]
+    return [(name, str(value)) for name, value in context.items()]
+
+
+def format_entries(entries: List[ContextEntry]) -> str:
+    return "\n\n".join(text if name is None else f"{name}:\n{text}" for name, text in entries)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    """Cut text down to at most max_tokens, keeping its beginning."""
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    marker = " [truncated]"
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0 and count_tokens(text[:cut] + marker, model) > max_tokens:
+        cut = int(cut * 0.9)
+    return text[:cut] + marker if cut > 0 else ""
+
+
+class ContextStrategy(ABC):
+    """Decides what the results of upstream states look like in the next agent's prompt."""
+    name = None
+
+    @abstractmethod
+    def compact(self, entries: List[ContextEntry], agent) -> List[ContextEntry]:
+        ...
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"strategy": self.name}
+
+
+class FullContext(ContextStrategy):
+    """Passes every upstream result through unchanged."""
+    name = "full"
+
+    def compact(self, entries: List[ContextEntry], agent) -> List[ContextEntry]:
+        return entries
+
+
+class TruncateContext(ContextStrategy):
+    """Cuts the context down to a token budget, shared equally between upstream results."""
+    name = "truncate"
+
+    def __init__(self, max_tokens: int = 2000, model: str = None):
+        self.max_tokens = max_tokens
+        self.model = model
+
+    def compact(self, entries: List[ContextEntry], agent) -> List[ContextEntry]:
+        if not entries:
+            return entries
+        budget = max(1, self.max_tokens // len(entries))
+        return [(name, truncate_to_tokens(text, budget, self.model)) for name, text in entries]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"strategy": self.name, "max_tokens": self.max_tokens, "model": self.model}
+
+
+class LastNContext(ContextStrategy):
+    """Keeps only the last ``n`` upstream results, in the order the states were scheduled."""
+    name = "last_n"
+
+    def __init__(self, n: int = 1):
+        self.n = n
+
+    def compact(self, entries: List[ContextEntry], agent) -> List[ContextEntry]:
+        return entries[-self.n:] if self.n > 0 else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"strategy": self.name, "n": self.n}
+
+
+class SummariseContext(ContextStrategy):
+    """Summarises context longer than ``max_tokens`` with a cheaper model.
+
+    The summary call goes through the receiving agent's LLM wrapper, so its
+    cost is charged to that agent. Context already within budget is passed
+    through untouched.
+    """
+    name = "summarise"
+
+    PROMPT = (
+        "Summarise the following output from previous agents in at most {max_tokens} tokens. "
+        "Keep every fact, figure and decision the next agent may need.\n\n{context}"
+    )
+
+    def __init__(self, model: str = TOKEN_COUNT_MODEL, max_tokens: int = 500):
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def compact(self, entries: List[ContextEntry], agent) -> List[ContextEntry]:
+        text = format_entries(entries)
+        if count_tokens(text, self.model) <= self.max_tokens:
+            return entries
+        prompt = self.PROMPT.format(max_tokens=self.max_tokens, context=text)
+        # temperature=0 keeps summaries reproducible and lets the response cache serve repeats
+        response = agent.get_llm_wrapper().call_model(prompt, model_name=self.model, temperature=0)
+        summary = response.get_response_content() or ""
+        # The model does not always respect the budget; enforce it
+        return [(None, truncate_to_tokens(summary, self.max_tokens, self.model))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"strategy": self.name, "model": self.model, "max_tokens": self.max_tokens}
+
+
+CONTEXT_STRATEGIES = {
+    strategy.name: strategy for strategy in (FullContext, TruncateContext, LastNContext, SummariseContext)
+}
+
+
+def create_context_strategy(options: Optional[Dict[str, Any]]) -> ContextStrategy:
+    """Build a strategy from its to_dict() form, e.g. {"strategy": "truncate", "max_tokens": 1000}."""
+    if not options:
+        return FullContext()
+    options = dict(options)
+    name = options.pop("strategy", FullContext.name)
+    if name not in CONTEXT_STRATEGIES:
+        raise ValueError(f"Unknown context strategy {name!r}; expected one of {sorted(CONTEXT_STRATEGIES)}")
+    return CONTEXT_STRATEGIES[name](**{key: value for key, value in options.items() if value is not None})
+
+
+def compact_context(context: Optional[Dict[str, Any]], strategy: ContextStrategy,
+                    agent) -> Tuple[Optional[str], Optional[Dict[str, int]]]:
+    """Apply a strategy to a merged context.
+
+    Returns the text to show the agent and the token counts before and
+    after compaction, or (None, None) when there is no context.
+    """
+    if not context or not isinstance(context, dict):
+        return None, None
+    with get_tracer().span("context.compact", strategy=strategy.name) as span:
+        entries = context_entries(context)
+        before = count_tokens(format_entries(entries))
+        text = format_entries(strategy.compact(entries, agent))
+        tokens = {"before": before, "after": count_tokens(text)}
+        span.set_attributes({"tokens_before": tokens["before"], "tokens_after": tokens["after"]})
+    logging.info(f"Context for {agent.get_name()} ({strategy.name}): {tokens['before']} -> {tokens['after']} tokens")
+    return text, tokens
@@ -0,0 +1,447 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Callable
+from agent_handler.agent import Agent
+from llm_wrap_lib.cancellation import CancellationToken, RunCancelled, use_cancellation
+from state_machine.context import ContextStrategy, FullContext, compact_context, create_context_strategy
+from state_machine.metrics import RunMetrics, StateMetrics
+from trace_handler.tracer import get_tracer
+from state_machine.checkpoint import (
+    CheckpointStore, get_default_store, RUN_CANCELLED, RUN_COMPLETED, RUN_FAILED, RUN_RUNNING
+)
+
+
+class State:
+    def __init__(self, agent: Agent, context_strategy: ContextStrategy = None):
+        self.agent = agent
+        self.action = self.execute_task
+        self.connections = []
+        self.context = None
+        self.context_tokens = None
+        self.context_strategy = context_strategy
+        self.response = None
+        self.llm_response = None
+        self.cost = 0.0
+        self.metrics = None
+
+    def execute_task(self, context=None, on_delta=None, run_id=None):
+        self.context = context
+        self.agent.set_transcript_context(run_id, self.get_name())
+        cost_before = self.agent.get_cost_summary()["total_cost"]
+        # The context goes into the prompt for this call only; the task itself is left untouched
+        prompt_context, self.context_tokens = compact_context(context, self.get_context_strategy(), self.agent)
+        self.response = self.agent.execute_task(on_delta=on_delta, context=prompt_context)
+        self.llm_response = self.agent.get_last_response()
+        self.cost = self.agent.get_cost_summary()["total_cost"] - cost_before
+        return self.response
+
+    def get_context_strategy(self) -> ContextStrategy:
+        return self.context_strategy or FullContext()
+
+    def set_context_strategy(self, strategy: ContextStrategy):
+        self.context_strategy = strategy
+
+    def fingerprint(self, context=None) -> str:
+        """Hash of the agent's effective inputs together with the context passed in."""
+        payload = json.dumps({
+            "agent": self.agent.describe_inputs(),
+            "context": context,
+            "context_strategy": self.get_context_strategy().to_dict(),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def restore(self, checkpoint):
+        """Load the result of a previous run of this state instead of executing it."""
+        self.context = checkpoint.get("context")
+        self.context_tokens = checkpoint.get("context_tokens")
+        self.response = checkpoint.get("response")
+        self.llm_response = None
+        self.cost = checkpoint.get("cost", 0.0)
+        metrics = dict(checkpoint.get("metrics") or {"name": self.get_name(), "cost": self.cost})
+        metrics["restored"] = True
+        self.metrics = StateMetrics.from_dict(metrics)
+
+    def add_connection(self, to_state: 'State', pass_context: bool = False):
+        self.connections.append((to_state, pass_context))
+
+    def set_pass_context(self, to_state: 'State', pass_context: bool):
+        """Change whether this state's result is passed on along its connections to ``to_state``."""
+        self.connections = [(target, pass_context if target is to_state else passes)
+                            for target, passes in self.connections]
+
+    def get_name(self):
+        return self.agent.get_name()
+
+    def get_agent(self):
+        return self.agent
+
+    def get_response(self):
+        return self.response
+
+    def get_next_state(self):
+        return self.connections[0][0] if self.connections else None
+
+    def should_pass_context(self):
+        return self.connections[0][1] if self.connections else False
+
+
+class StateMachineEngine:
+    """Executes a graph of States without any dependency on Qt.
+
+    Progress is reported through the on_* hook methods, which do nothing by
+    default. The GUI's StateMachine overrides them to emit Qt signals; the
+    headless runner uses the engine directly.
+
+    Each finished state is checkpointed to ``checkpoint_store`` (the shared
+    SQLite store by default). Passing the ID of an earlier run to run()
+    resumes it: states already checkpointed under that ID are restored
+    rather than executed again.
+
+    With ``incremental`` enabled, each state is fingerprinted from its
+    agent's inputs and its upstream outputs, and a state whose fingerprint
+    matches an earlier checkpoint reuses that result. Only edited states
+    and the states downstream of a changed output are executed.
+
+    A run can be cancelled or paused from another thread. Cancelling is
+    cooperative: the run's CancellationToken is made current while each state
+    executes, so LLM calls, retries and tool calls stop waiting as soon as it
+    is cancelled. Pausing lets running states finish but starts no new ones
+    until resume() is called.
+    """
+
+    def __init__(self, max_workers: int = 4, stream: bool = False, checkpoint_store: CheckpointStore = None,
+                 incremental: bool = False):
+        self.states = []
+        self.current_state = None
+        self.max_workers = max_workers
+        self.stream = stream
+        self.incremental = incremental
+        self.run_id = None
+        self.metrics = None
+        self.cancellation = CancellationToken()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._checkpoint_store = checkpoint_store
+
+    def get_checkpoint_store(self) -> CheckpointStore:
+        return self._checkpoint_store or get_default_store()
+
+    def set_checkpoint_store(self, store: CheckpointStore):
+        self._checkpoint_store = store
+
+    def cancel(self) -> None:
+        """Stop the current run; it raises RunCancelled and is left resumable from its checkpoints."""
+        self.cancellation.cancel()
+        self._resumed.set()
+
+    def pause(self) -> None:
+        """Start no further states until resume() is called; states already running finish."""
+        self._resumed.clear()
+
+    def resume(self) -> None:
+        self._resumed.set()
+
+    def is_paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def get_metrics(self) -> RunMetrics:
+        """Return the metrics of the current or most recent run."""
+        return self.metrics
+
+    def get_reachable_states(self) -> List[State]:
+        """Return the states reachable from the initial state.
+
+        If no initial state is set, every state without incoming connections
+        is treated as an entry point.
+        """
+        if self.current_state:
+            roots = [self.current_state]
+        else:
+            targets = {to_state for state in self.states for to_state, _ in state.connections}
+            # A graph made only of cycles has no entry point; schedule everything so the cycle is reported
+            roots = [state for state in self.states if state not in targets] or list(self.states)
+
+        reachable = []
+        seen = set()
+        stack = list(reversed(roots))
+        while stack:
+            state = stack.pop()
+            if state in seen:
+                continue
+            seen.add(state)
+            reachable.append(state)
+            stack.extend(to_state for to_state, _ in reversed(state.connections))
+        return reachable
+
+    def topological_order(self, states: List[State]) -> List[State]:
+        """Order states so that every state comes after all of its predecessors."""
+        in_degree = {state: 0 for state in states}
+        for state in states:
+            for to_state, _ in state.connections:
+                if to_state in in_degree:
+                    in_degree[to_state] += 1
+
+        ready = [state for state in states if in_degree[state] == 0]
+        order = []
+        while ready:
+            state = ready.pop(0)
+            order.append(state)
+            for to_state, _ in state.connections:
+                if to_state in in_degree:
+                    in_degree[to_state] -= 1
+                    if in_degree[to_state] == 0:
+                        ready.append(to_state)
+
+        if len(order) != len(states):
+            raise ValueError("State machine contains a cycle and cannot be scheduled")
+        return order
+
+    def merge_context(self, predecessors, results):
+        """Build the context for a state from the results of its predecessors.
+
+        A single context-passing predecessor yields ``{"previous_result": ...}``
+        as before; fan-in states receive every result keyed by state name.
+        """
+        passed = [(state, results[state]) for state, pass_context in predecessors if pass_context]
+        if not passed:
+            return None
+        if len(passed) == 1:
+            return {"previous_result": passed[0][1]}
+        return {"previous_results": {state.get_name(): result for state, result in passed}}
+
+    def run(self, run_id: str = None, cancellation: CancellationToken = None):
+        """Execute every reachable state and return a {State: response} dict.
+
+        If run_id names an earlier run, its checkpointed states are restored
+        and only the remaining states are executed. The run stops with
+        RunCancelled once ``cancellation`` (a new token by default) is cancelled.
+        """
+        self.run_id = run_id or uuid.uuid4().hex
+        self.cancellation = cancellation or CancellationToken()
+        with get_tracer().span("state_machine.run", run_id=self.run_id, incremental=self.incremental) as span:
+            results = self._run()
+            span.set_attributes({
+                "states_executed": self.metrics.totals()["states_executed"],
+                "states_restored": self.metrics.totals()["states_restored"],
+            })
+            return results
+
+    def _run(self):
+        order = self.topological_order(self.get_reachable_states())
+        predecessors = {state: [] for state in order}
+        for state in order:
+            for to_state, pass_context in state.connections:
+                if to_state in predecessors:
+                    predecessors[to_state].append((state, pass_context))
+
+        remaining = {state: len(predecessors[state]) for state in order}
+        results = {}
+        self.metrics = RunMetrics(self.run_id)
+        started = time.monotonic()
+        store = self.get_checkpoint_store()
+        checkpoints = store.load_states(self.run_id)
+        store.set_run_status(self.run_id, RUN_RUNNING)
+
+        def complete(state, result):
+            """Record a result and return the successors it made ready to run."""
+            results[state] = result
+            ready = []
+            for to_state, _ in state.connections:
+                if to_state in remaining:
+                    remaining[to_state] -= 1
+                    if remaining[to_state] == 0 and to_state not in results:
+                        ready.append(to_state)
+            return ready
+
+        for state in order:
+            if state.get_name() in checkpoints and remaining[state] == 0:
+                state.restore(checkpoints[state.get_name()])
+                self.metrics.add_state(state.metrics)
+                complete(state, state.get_response())
+                self.on_state_restored(state, state.get_response())
+        if results:
+            logging.info(f"Resuming run {self.run_id}: restored {len(results)} of {len(order)} states")
+
+        reused = 0
+        cancellation = self.cancellation
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = {}
+            ready = deque(state for state in order if remaining[state] == 0 and state not in results)
+
+            while ready or pending:
+                while ready:
+                    self._resumed.wait()
+                    if cancellation.is_cancelled():
+                        break
+                    state = ready.popleft()
+                    context = self.merge_context(predecessors[state], results)
+                    fingerprint = state.fingerprint(context) if self.incremental else None
+                    checkpoint = store.find_result(state.get_name(), fingerprint) if fingerprint else None
+                    if checkpoint is not None:
+                        # Inputs are unchanged since an earlier run; reuse its result
+                        reused += 1
+                        state.restore(checkpoint)
+                        self.metrics.add_state(state.metrics)
+                        store.save_state(self.run_id, state.get_name(), checkpoint)
+                        self.on_state_restored(state, state.get_response())
+                        ready.extend(complete(state, state.get_response()))
+                        continue
+                    pending[pool.submit(get_tracer().bind(self._execute_state), state, context)] = (state, fingerprint)
+
+                if cancellation.is_cancelled():
+                    self._cancel_run(pending, started)
+                if not pending:
+                    break
+                done, _ = wait(list(pending) + [cancellation.future], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future is cancellation.future:
+                        continue
+                    state, fingerprint = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if cancellation.is_cancelled():
+                            # The state was interrupted by the cancellation, which stops the run on the next pass
+                            continue
+                        for other in pending:
+                            other.cancel()
+                        store.set_run_status(self.run_id, RUN_FAILED)
+                        self.metrics.wall_time = time.monotonic() - started
+                        logging.error(f"Run {self.run_id} failed in state {state.get_name()}: {e}")
+                        raise
+                    store.save_state(self.run_id, state.get_name(), {
+                        "response": result,
+                        "context": state.context,
+                        "context_tokens": state.context_tokens,
+                        "cost": state.cost,
+                        "metrics": state.metrics.to_dict(),
+                        "fingerprint": fingerprint,
+                    })
+                    self.metrics.add_state(state.metrics)
+                    ready.extend(complete(state, result))
+        finally:
+            # States stuck in a call are not waited for once the run is cancelled
+            pool.shutdown(wait=not cancellation.is_cancelled(), cancel_futures=True)
+
+        if reused:
+            logging.info(f"Reused the results of {reused} unchanged states")
+        self.metrics.wall_time = time.monotonic() - started
+        store.set_run_status(self.run_id, RUN_COMPLETED)
+        logging.info("Final state reached. Execution complete.")
+        self.on_execution_finished()
+        return results
+
+    def _cancel_run(self, pending, started: float):
+        for future in pending:
+            future.cancel()
+        self.get_checkpoint_store().set_run_status(self.run_id, RUN_CANCELLED)
+        self.metrics.wall_time = time.monotonic() - started
+        logging.info(f"Run {self.run_id} was cancelled; {len(self.metrics.states)} states had finished")
+        self.on_execution_cancelled()
+        raise RunCancelled(f"Run {self.run_id} was cancelled")
+
+    def _execute_state(self, state: State, context):
+        self.cancellation.raise_if_cancelled()
+        logging.info(f"Executing state: {state.agent.get_name()}")
+        self.on_state_started(state, context)
+        on_delta = (lambda delta: self.on_response_chunk(state, delta)) if self.stream else None
+        started = time.monotonic()
+        with get_tracer().span("state.execute", state=state.get_name(), run_id=self.run_id) as span, \
+                use_cancellation(self.cancellation):
+            result = state.execute_task(context, on_delta=on_delta, run_id=self.run_id)
+            span.set_attribute("cost", state.cost)
+        state.metrics = StateMetrics.from_state(state, time.monotonic() - started)
+        self.on_state_finished(state, result)
+        return result
+
+    def on_state_started(self, state: State, context) -> None:
+        """Called on the worker thread just before a state executes."""
+
+    def on_state_restored(self, state: State, result: str) -> None:
+        """Called when a state's result is taken from a checkpoint instead of being executed."""
+
+    def on_response_chunk(self, state: State, delta: str) -> None:
+        """Called for each streamed text chunk when stream is enabled."""
+
+    def on_state_finished(self, state: State, result: str) -> None:
+        """Called on the worker thread once a state has produced its response."""
+
+    def on_execution_finished(self) -> None:
+        """Called once every reachable state has finished."""
+
+    def on_execution_cancelled(self) -> None:
+        """Called when a cancelled run stops, before RunCancelled is raised."""
+
+    def add_state(self, state: State):
+        self.states.append(state)
+
+    def set_context_strategy(self, strategy: ContextStrategy):
+        """Use one context strategy for every state in the machine."""
+        for state in self.states:
+            state.set_context_strategy(strategy)
+
+    def add_transition(self, from_state: State, to_state: State, pass_context: bool = False):
+        from_state.add_connection(to_state, pass_context)
+
+    def set_initial_state(self, state: State):
+        if state not in self.states:
+            raise ValueError("Initial state must exist in the state machine")
+        self.current_state = state
+
+    def to_dict(self):
+        return {
+            "states": [
+                {
+                    "name": state.agent.get_name(),
+                    "x": state.x if hasattr(state, 'x') else 0,
+                    "y": state.y if hasattr(state, 'y') else 0,
+                    "context_strategy": state.get_context_strategy().to_dict(),
+                    "connections": [
+                        {"to": conn[0].agent.get_name(), "pass_context": conn[1]}
+                        for conn in state.connections
+                    ]
+                }
+                for state in self.states
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, agents: Dict[str, Agent]):
+        sm = cls()
+        states = {}
+        for state_data in data["states"]:
+            agent = agents[state_data["name"]]
+            state = State(agent, create_context_strategy(state_data.get("context_strategy")))
+            state.x = state_data.get("x", 0)
+            state.y = state_data.get("y", 0)
+            states[state_data["name"]] = state
+            sm.add_state(state)
+
+        for state_data in data["states"]:
+            state = states[state_data["name"]]
+            for conn in state_data.get("connections", []):
+                to_state = states[conn["to"]]
+                sm.add_transition(state, to_state, conn["pass_context"])
+
+        return sm
+
+class Connection:
+    def __init__(self, from_state: State, to_state: State, pass_context: bool = False):
+        self.from_state = from_state
+        self.to_state = to_state
+        self.pass_context = pass_context
+
+
+
+class Transition:
+    def __init__(self, target_state: State, condition: Callable[[], bool] = lambda: True):
+        self.target_state = target_state
+        self.condition = condition
+
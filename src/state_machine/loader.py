@@ -0,0 +1,65 @@
+import importlib
+import json
+from typing import Any, Dict
+from agent_handler.agent import Agent
+from agent_handler.task import Task
+from tool_handler.tool_bank import ToolBank
+
+
+def build_agents(definitions: Dict[str, Any]) -> Dict[str, Agent]:
+    """Create agents (with their tasks and tools) from a definitions dictionary.
+
+    The expected shape is::
+
+        {
+          "tool_modules": ["my_tools"],
+          "agents": [
+            {"name": "Researcher", "goal": "...", "backstory": "...",
+             "task": {"description": "...", "expected_output": "..."},
+             "tools": ["get_current_weather"]}
+          ]
+        }
+
+    Tool modules are imported so that they can register their tools with the
+    ToolBank; agents then reference tools by name.
+    """
+    for module_name in definitions.get("tool_modules", []):
+        importlib.import_module(module_name)
+
+    agents = {}
+    for agent_data in definitions["agents"]:
+        agent = Agent(
+            agent_data["name"],
+            agent_data.get("goal", ""),
+            agent_data.get("backstory", ""),
+            agent_data.get("verbose", False),
+            json_output=agent_data.get("json_output", False),
+            prompt_template=agent_data.get("prompt_template"),
+            temperature=agent_data.get("temperature"),
+        )
+        task_data = agent_data.get("task")
+        if task_data is not None:
+            agent.set_task(Task(
+                task_data["description"],
+                task_data.get("expected_output", ""),
+                output_json=task_data.get("output_json", False),
+                prompt_template=task_data.get("prompt_template"),
+            ))
+        for tool_name in agent_data.get("tools", []):
+            tool = ToolBank().get_tool(tool_name)
+            if tool is None:
+                raise ValueError(f"Tool {tool_name} used by agent {agent_data['name']} is not registered")
+            agent.add_tool(tool)
+        agents[agent.get_name()] = agent
+    return agents
+
+
+def load_agents(path: str) -> Dict[str, Agent]:
+    with open(path, 'r', encoding='utf-8') as file:
+        return build_agents(json.load(file))
+
+
+def load_graph(path: str) -> Dict[str, Any]:
+    """Load a state machine saved by MainWindow.save_state_machine."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
@@ -0,0 +1,144 @@
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class StateMetrics:
+    """Where the time, tokens and money of one state went.
+
+    ``wall_time`` covers the whole state, including context compaction;
+    ``llm_wall_time`` and ``time_to_first_token`` come from the final LLM
+    call. Restored states (resumed or reused from a checkpoint) keep the
+    figures of the run that produced them.
+    """
+    name: str
+    model: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    wall_time: float = 0.0
+    llm_wall_time: float = 0.0
+    time_to_first_token: Optional[float] = None
+    tool_calls: int = 0
+    iterations: int = 0
+    retries: int = 0
+    cached: bool = False
+    restored: bool = False
+    context_tokens_before: Optional[int] = None
+    context_tokens_after: Optional[int] = None
+
+    @classmethod
+    def from_state(cls, state, wall_time: float) -> 'StateMetrics':
+        metrics = cls(name=state.get_name(), cost=state.cost, wall_time=wall_time)
+        if state.context_tokens:
+            metrics.context_tokens_before = state.context_tokens["before"]
+            metrics.context_tokens_after = state.context_tokens["after"]
+        response = state.llm_response
+        if response is not None:
+            metrics.model = response.get_model()
+            metrics.prompt_tokens = response.get_prompt_tokens()
+            metrics.completion_tokens = response.get_completion_tokens()
+            metrics.llm_wall_time = response.get_wall_time()
+            metrics.time_to_first_token = response.get_time_to_first_token()
+            metrics.tool_calls = response.get_tool_call_count()
+            metrics.iterations = response.get_iterations()
+            metrics.retries = response.get_retries()
+            metrics.cached = response.is_cached()
+        return metrics
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StateMetrics':
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# (metric name, StateMetrics attribute, help text) exported per state
+PROMETHEUS_STATE_METRICS = (
+    ("state_cost_usd", "cost", "Cost of the state's LLM calls in USD"),
+    ("state_prompt_tokens", "prompt_tokens", "Prompt tokens sent by the state"),
+    ("state_completion_tokens", "completion_tokens", "Completion tokens received by the state"),
+    ("state_wall_seconds", "wall_time", "Wall time of the state"),
+    ("state_time_to_first_token_seconds", "time_to_first_token", "Time until the first token of the state's answer"),
+    ("state_tool_calls", "tool_calls", "Tool calls made by the state"),
+    ("state_llm_iterations", "iterations", "Completions made by the state, including tool-call turns"),
+    ("state_retries", "retries", "Retried or fallen-back LLM requests in the state"),
+    ("state_context_tokens", "context_tokens_after", "Context tokens passed to the state after compaction"),
+)
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class RunMetrics:
+    """Per-state and per-run telemetry for one state machine run, exportable as JSON or Prometheus text."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.wall_time = 0.0
+        self.states: Dict[str, StateMetrics] = {}
+
+    def add_state(self, metrics: StateMetrics) -> None:
+        self.states[metrics.name] = metrics
+
+    def get_state(self, name: str) -> Optional[StateMetrics]:
+        return self.states.get(name)
+
+    def totals(self) -> Dict[str, Any]:
+        """Sum the states executed in this run; restored states count towards cost_saved instead."""
+        executed = [metrics for metrics in self.states.values() if not metrics.restored]
+        restored = [metrics for metrics in self.states.values() if metrics.restored]
+        return {
+            "states_executed": len(executed),
+            "states_restored": len(restored),
+            "prompt_tokens": sum(metrics.prompt_tokens for metrics in executed),
+            "completion_tokens": sum(metrics.completion_tokens for metrics in executed),
+            "cost": sum(metrics.cost for metrics in executed),
+            "cost_saved": sum(metrics.cost for metrics in restored),
+            "tool_calls": sum(metrics.tool_calls for metrics in executed),
+            "iterations": sum(metrics.iterations for metrics in executed),
+            "retries": sum(metrics.retries for metrics in executed),
+            "wall_time": self.wall_time,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "totals": self.totals(),
+            "states": [metrics.to_dict() for metrics in self.states.values()],
+        }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "statemachine") -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        run_label = f'run_id="{_escape_label(self.run_id)}"'
+        lines: List[str] = []
+        for metric, attribute, help_text in PROMETHEUS_STATE_METRICS:
+            name = f"{prefix}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for metrics in self.states.values():
+                value = getattr(metrics, attribute)
+                if value is None:
+                    continue
+                labels = (
+                    f'{run_label},state="{_escape_label(metrics.name)}",'
+                    f'model="{_escape_label(metrics.model or "")}",restored="{str(metrics.restored).lower()}"'
+                )
+                lines.append(f"{name}{{{labels}}} {float(value)}")
+
+        for key, value in self.totals().items():
+            name = f"{prefix}_run_{key}"
+            lines.append(f"# HELP {name} Run total: {key.replace('_', ' ')}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{{{run_label}}} {float(value)}")
+        return "\n".join(lines) + "\n"
@@ -31,7 +31,9 @@ def get_current_time(location):
     else:
         return json.dumps({"location": location, "time": "unknown"})
 
-get_current_weather_tool = Tool("get_current_weather", "Get the current weather in a given location", get_current_weather)
+# Agents ask for the same places over and over; answers are reused for a while
+get_current_weather_tool = Tool("get_current_weather", "Get the current weather in a given location", get_current_weather,
+                                cache_ttl=600)
 get_current_weather_tool.define_function_param([
     Param("location", "string", "The location to get the weather for", True),
     Param("unit", "string", "The unit to get the temperature in", False)
@@ -39,7 +41,8 @@ get_current_weather_tool.define_function_param([
 tool_bank.add_tool(get_current_weather_tool)
 
 
-get_current_time_tool = Tool("get_current_time", "Get the current time in a given location", get_current_time)
+get_current_time_tool = Tool("get_current_time", "Get the current time in a given location", get_current_time,
+                             cache_ttl=30)
 get_current_time_tool.define_function_param([
     Param("location", "string", "The location to get the time for", True)
 ])
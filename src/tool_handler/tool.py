@@ -1,5 +1,7 @@
 import inspect
+import json
 from dataclasses import dataclass
+from trace_handler.tracer import get_tracer
 
 @dataclass
 class Param:
@@ -17,10 +19,24 @@ class Param:
         }
 
 class Tool:
-    def __init__(self, name, description, function):
+    """A function agents can call.
+
+    A tool declared ``pure`` (same arguments, same result) has its results
+    memoized for good, and one given a ``cache_ttl`` has them memoized for
+    that many seconds; both share ToolBank's result cache.
+    """
+    EXECUTORS = ("thread", "process")
+
+    def __init__(self, name, description, function, executor="thread", timeout=None, pure=False, cache_ttl=None):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor {executor}, expected one of {self.EXECUTORS}")
         self._name = name
         self._description = description
         self._function = function
+        self._executor = executor
+        self._timeout = timeout
+        self._pure = pure
+        self._cache_ttl = cache_ttl
         self._signature = inspect.signature(function)
         self._sig_parameters = self._signature.parameters
         self._def_params = None
@@ -30,6 +46,26 @@ class Tool:
     
     def get_description(self):
         return self._description
+
+    def get_function(self):
+        return self._function
+
+    def get_executor(self):
+        """Return "thread" for I/O-bound tools or "process" for CPU-heavy ones."""
+        return self._executor
+
+    def get_timeout(self):
+        return self._timeout
+
+    def is_pure(self):
+        return self._pure
+
+    def get_cache_ttl(self):
+        """Return how long results are memoized in seconds, or None if they never expire (or are not memoized)."""
+        return None if self._pure else self._cache_ttl
+
+    def is_cacheable(self):
+        return self._pure or self._cache_ttl is not None
     
     def define_function_param(self, list_of_params):
         self._def_params = list_of_params
@@ -59,7 +95,35 @@ class Tool:
             }
         }
     
-    def call(self, *args, **kwargs):
+    def _bind(self, *args, **kwargs):
         bound_arguments = self._signature.bind(*args, **kwargs)
         bound_arguments.apply_defaults()
-        return self._function(*bound_arguments.args, **bound_arguments.kwargs)
\ No newline at end of file
+        return bound_arguments
+
+    def bind_arguments(self, *args, **kwargs):
+        bound_arguments = self._bind(*args, **kwargs)
+        return bound_arguments.args, bound_arguments.kwargs
+
+    def _make_cache_key(self, bound_arguments):
+        # Arguments are bound and defaults applied first, so positional, keyword
+        # and omitted-default spellings of the same call share a key
+        return f"{self._name}:" + json.dumps(bound_arguments.arguments, sort_keys=True, default=repr)
+
+    def get_cache_key(self, *args, **kwargs):
+        return self._make_cache_key(self._bind(*args, **kwargs))
+
+    def call(self, *args, **kwargs):
+        with get_tracer().span("tool.call", tool=self._name, executor=self._executor) as span:
+            bound_arguments = self._bind(*args, **kwargs)
+            if not self.is_cacheable():
+                return self._function(*bound_arguments.args, **bound_arguments.kwargs)
+            # Imported here because the ToolBank module imports this one
+            from tool_handler.tool_bank import ToolBank
+            cache = ToolBank().get_result_cache()
+            key = self._make_cache_key(bound_arguments)
+            hit, result = cache.get(self._name, key)
+            span.set_attribute("cached", hit)
+            if hit:
+                return result
+            return cache.call(self._name, key, self.get_cache_ttl(),
+                              lambda: self._function(*bound_arguments.args, **bound_arguments.kwargs))
\ No newline at end of file
@@ -1,4 +1,5 @@
 from tool_handler.tool import Tool, Param
+from tool_handler.tool_cache import ToolResultCache
 from typing import Dict, List, Optional
 
 class ToolBank:
@@ -12,6 +13,7 @@ class ToolBank:
     def __init__(self):
         if not hasattr(self, 'tools'):
             self.tools: Dict[str, Tool] = {}
+            self.result_cache = ToolResultCache()
 
     def add_tool(self, tool: Tool) -> None:
         self.tools[tool.get_name()] = tool
@@ -26,3 +28,14 @@ class ToolBank:
     def get_all_tools(self) -> Dict[str, Tool]:
         return self.tools
 
+    def get_result_cache(self) -> ToolResultCache:
+        """Return the cache that memoizes results of pure and cacheable tools for every agent."""
+        return self.result_cache
+
+    def set_result_cache(self, cache: ToolResultCache) -> None:
+        """Replace the result cache, e.g. with one persisted to disk."""
+        self.result_cache = cache
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.result_cache.get_stats()
+
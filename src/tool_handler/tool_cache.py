@@ -0,0 +1,216 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_MISSING = object()
+
+
+class _ToolStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.executed_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        calls = self.hits + self.misses
+        mean_latency = self.executed_seconds / self.misses if self.misses else 0.0
+        return {
+            "calls": calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / calls if calls else 0.0,
+            "mean_latency": mean_latency,
+            # What the hits would have taken had the tool been run for them
+            "seconds_saved": self.hits * mean_latency,
+        }
+
+
+class ToolResultCache:
+    """Memoized results of pure and cacheable tools, shared by every agent through ToolBank.
+
+    Results are keyed on the tool name and its bound arguments (see
+    Tool.get_cache_key) and kept in memory, bounded to ``max_entries`` with
+    least recently used entries evicted first. A result expires after the
+    tool's ``cache_ttl``; results of pure tools never do. With ``path``,
+    results are also written to SQLite, so that later processes start warm;
+    results that are not JSON-serialisable are only kept in memory. The file
+    keeps at most ``max_disk_entries`` results (by default ``max_entries``),
+    dropping the least recently written first.
+
+    Identical calls that arrive while the first is still running wait for its
+    result instead of running the tool again. Errors are not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, max_disk_entries: Optional[int] = None):
+        self._max_entries = max_entries
+        self._max_disk_entries = max_disk_entries if max_disk_entries is not None else max_entries
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[Any, Optional[float]]]' = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._stats: Dict[str, _ToolStats] = {}
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results ("
+                " key TEXT PRIMARY KEY,"
+                " result TEXT,"
+                " expires_at REAL)"
+            )
+            self._connection.commit()
+
+    def _tool_stats(self, tool_name: str) -> _ToolStats:
+        stats = self._stats.get(tool_name)
+        if stats is None:
+            stats = self._stats[tool_name] = _ToolStats()
+        return stats
+
+    def _lookup(self, key: str, now: float) -> Any:
+        """Return the unexpired result for ``key`` or _MISSING; the caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None and self._connection is not None:
+            row = self._connection.execute(
+                "SELECT result, expires_at FROM tool_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (json.loads(row[0]), row[1])
+                self._store(key, entry)
+        if entry is None:
+            return _MISSING
+        result, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return result
+
+    def _store(self, key: str, entry: Tuple[Any, Optional[float]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, tool_name: str, key: str) -> Tuple[bool, Any]:
+        """Return (True, result) for a cached call, counting it as a hit, or (False, None)."""
+        with self._lock:
+            result = self._lookup(key, time.time())
+            if result is _MISSING:
+                return False, None
+            self._tool_stats(tool_name).hits += 1
+            return True, result
+
+    def put(self, tool_name: str, key: str, result: Any, ttl: Optional[float], seconds: float) -> None:
+        """Cache the result of a call that took ``seconds`` to run; it is kept for ``ttl`` seconds (None: forever)."""
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            stats = self._tool_stats(tool_name)
+            stats.misses += 1
+            stats.executed_seconds += seconds
+            self._store(key, (result, expires_at))
+            if self._connection is not None:
+                self._persist(key, result, expires_at)
+
+    def _persist(self, key: str, result: Any, expires_at: Optional[float]) -> None:
+        try:
+            serialised = json.dumps(result)
+        except (TypeError, ValueError):
+            return
+        try:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO tool_results (key, result, expires_at) VALUES (?, ?, ?)",
+                (key, serialised, expires_at),
+            )
+            self._connection.execute(
+                "DELETE FROM tool_results WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            # A replaced row gets a new rowid, so the lowest rowids are the least recently written
+            self._connection.execute(
+                "DELETE FROM tool_results WHERE rowid <= "
+                "(SELECT rowid FROM tool_results ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                (self._max_disk_entries,)
+            )
+            self._connection.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Could not persist a tool result to {self._path}: {e}")
+
+    def claim(self, tool_name: str, key: str) -> Tuple[Future, bool]:
+        """Return (future, owner) for a call of ``key``.
+
+        The future is already done for a cached result, or is shared with an
+        identical call that is still running. Otherwise ``owner`` is True: the
+        caller must run the tool and pass its outcome to settle().
+        """
+        with self._lock:
+            result = self._lookup(key, time.time())
+            if result is not _MISSING:
+                self._tool_stats(tool_name).hits += 1
+                cached = Future()
+                cached.set_result(result)
+                return cached, False
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                self._tool_stats(tool_name).hits += 1
+                return pending, False
+            pending = self._in_flight[key] = Future()
+            return pending, True
+
+    def settle(self, tool_name: str, key: str, ttl: Optional[float], outcome: Future, seconds: float) -> None:
+        """Finish the call of ``key`` claimed with claim() with the done ``outcome``; only results are cached."""
+        succeeded = not outcome.cancelled() and outcome.exception() is None
+        if succeeded:
+            self.put(tool_name, key, outcome.result(), ttl, seconds)
+        with self._lock:
+            pending = self._in_flight.pop(key)
+        if succeeded:
+            pending.set_result(outcome.result())
+        elif outcome.cancelled():
+            pending.cancel()
+        else:
+            pending.set_exception(outcome.exception())
+
+    def call(self, tool_name: str, key: str, ttl: Optional[float], function: Callable[[], Any]) -> Any:
+        """Return the cached result for ``key``, or run ``function`` once and cache what it returns."""
+        pending, owner = self.claim(tool_name, key)
+        if not owner:
+            return pending.result()
+
+        outcome = Future()
+        started = time.monotonic()
+        try:
+            outcome.set_result(function())
+        except BaseException as e:
+            outcome.set_exception(e)
+        self.settle(tool_name, key, ttl, outcome, time.monotonic() - started)
+        return outcome.result()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return hit, miss and latency figures per tool."""
+        with self._lock:
+            return {tool_name: stats.to_dict() for tool_name, stats in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM tool_results")
+                self._connection.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
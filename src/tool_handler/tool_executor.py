@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, List, Tuple
+from tool_handler.tool import Tool
+from tool_handler.tool_bank import ToolBank
+from trace_handler.tracer import get_tracer
+
+
+class ToolExecutor:
+    """Dispatches the tool calls of one model turn in parallel.
+
+    Tools run on a shared thread pool unless they were declared with
+    ``executor="process"``, in which case their function is sent to a process
+    pool (it must then be picklable, i.e. defined at module level). Calls of
+    pure and cacheable tools whose result is already cached are answered
+    without going through either pool, and identical calls that arrive while
+    one is running share its result on either pool.
+
+    A thread cannot be stopped, so a thread tool that times out keeps its
+    pool thread until it returns. Each such thread is logged, and once half
+    of the pool is held by timed-out tools, new calls go to a fresh pool and
+    the old one is left to the tools still running on it.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ToolExecutor, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, max_threads: int = 8, max_processes: int = None, default_timeout: float = 60.0):
+        if not hasattr(self, '_thread_pool'):
+            self._max_threads = max_threads
+            self._thread_pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="tool")
+            self._lock = threading.Lock()
+            # Running thread tools and the pool each runs on, and those of the current pool that timed out
+            self._thread_calls: Dict[Future, ThreadPoolExecutor] = {}
+            self._timed_out_calls = set()
+            self._max_processes = max_processes
+            self._process_pool = None
+            self.default_timeout = default_timeout
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            # Only loads multiprocessing once a process tool is actually called
+            from concurrent.futures import ProcessPoolExecutor
+            self._process_pool = ProcessPoolExecutor(max_workers=self._max_processes)
+        return self._process_pool
+
+    def get_timeout(self, tool: Tool) -> float:
+        timeout = tool.get_timeout()
+        return timeout if timeout is not None else self.default_timeout
+
+    def submit(self, tool: Tool, params: Dict[str, Any]):
+        key = tool.get_cache_key(**params) if tool.is_cacheable() else None
+        if key is not None:
+            hit, result = ToolBank().get_result_cache().get(tool.get_name(), key)
+            if hit:
+                with get_tracer().span("tool.call", tool=tool.get_name(), executor=tool.get_executor(), cached=True):
+                    future = Future()
+                    future.set_result(result)
+                    return future
+        if tool.get_executor() == "process":
+            if key is None:
+                return self._submit_process(tool, params)
+            return self._submit_cached_process(tool, params, key)
+        with self._lock:
+            pool = self._thread_pool
+            future = pool.submit(get_tracer().bind(tool.call), **params)
+            self._thread_calls[future] = pool
+        future.add_done_callback(self._thread_call_done)
+        return future
+
+    def _thread_call_done(self, future) -> None:
+        with self._lock:
+            self._thread_calls.pop(future, None)
+            self._timed_out_calls.discard(future)
+
+    def _abandon(self, tool: Tool, future) -> None:
+        """Give up on a call that timed out; a thread tool that is already running keeps its thread."""
+        future.cancel()
+        with self._lock:
+            if self._thread_calls.get(future) is not self._thread_pool:
+                # Finished, cancelled before it started, a process tool, or on a pool already replaced
+                return
+            self._timed_out_calls.add(future)
+            held = len(self._timed_out_calls)
+            logging.warning(f"Tool {tool.get_name()} is still running after its timeout; "
+                            f"{held} of {self._max_threads} tool threads are held by timed-out calls")
+            if held < max(1, self._max_threads // 2):
+                return
+            retired, self._thread_pool = self._thread_pool, ThreadPoolExecutor(
+                max_workers=self._max_threads, thread_name_prefix="tool")
+            self._timed_out_calls = set()
+        logging.warning(f"Moved tool calls to a new thread pool; {held} timed-out tools keep running on the old one")
+        retired.shutdown(wait=False)
+
+    def _submit_process(self, tool: Tool, params: Dict[str, Any]) -> Future:
+        args, kwargs = tool.bind_arguments(**params)
+        # Spans cannot cross into the worker process, so this one is timed from here
+        span = get_tracer().start_span("tool.call", tool=tool.get_name(), executor="process")
+        future = self._get_process_pool().submit(tool.get_function(), *args, **kwargs)
+        future.add_done_callback(lambda done: self._end_process_span(span, done))
+        return future
+
+    def _submit_cached_process(self, tool: Tool, params: Dict[str, Any], key: str) -> Future:
+        """Start a process job for ``key`` unless an identical call is already running, and follow its result."""
+        cache = ToolBank().get_result_cache()
+        shared, owner = cache.claim(tool.get_name(), key)
+        if owner:
+            started = time.monotonic()
+            try:
+                job = self._submit_process(tool, params)
+            except BaseException as e:
+                job = Future()
+                job.set_exception(e)
+            job.add_done_callback(lambda done: cache.settle(tool.get_name(), key, tool.get_cache_ttl(), done,
+                                                            time.monotonic() - started))
+        return self._follow(shared)
+
+    @staticmethod
+    def _follow(source: Future) -> Future:
+        """Return a future with ``source``'s outcome; cancelling it, e.g. on a timeout, leaves ``source`` to the other callers."""
+        future = Future()
+
+        def copy(done):
+            if not future.set_running_or_notify_cancel():
+                return
+            if done.cancelled():
+                future.set_exception(CancelledError())
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+
+        source.add_done_callback(copy)
+        return future
+
+    @staticmethod
+    def _end_process_span(span, future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            span.record_exception(future.exception())
+        span.end()
+
+    @staticmethod
+    def _timeout_message(tool: Tool, timeout: float) -> str:
+        logging.warning(f"Tool {tool.get_name()} timed out after {timeout}s")
+        return f"Error: tool {tool.get_name()} timed out after {timeout} seconds"
+
+    def run_calls(self, calls: List[Tuple[str, Tool, Dict[str, Any]]], cancellation=None) -> List[Tuple[str, str]]:
+        """Run (tool_call_id, tool, params) triples concurrently.
+
+        Returns (tool_call_id, result) pairs in the order the calls were given.
+        A tool that exceeds its timeout yields an error message for the model
+        instead of a result; other exceptions are raised to the caller. If the
+        ``cancellation`` token is cancelled, calls that have not started are
+        dropped, the rest are left to finish unobserved, and RunCancelled is raised.
+        """
+        submitted = [(call_id, tool, self.submit(tool, params), time.monotonic())
+                     for call_id, tool, params in calls]
+        cancelled = [cancellation.future] if cancellation is not None else []
+
+        results = []
+        for call_id, tool, future, started in submitted:
+            timeout = self.get_timeout(tool)
+            wait([future] + cancelled, timeout=max(0.0, started + timeout - time.monotonic()),
+                 return_when=FIRST_COMPLETED)
+            if cancellation is not None and cancellation.is_cancelled():
+                for _, _, other, _ in submitted:
+                    other.cancel()
+                cancellation.raise_if_cancelled()
+            if future.done():
+                result = future.result()
+            else:
+                self._abandon(tool, future)
+                result = self._timeout_message(tool, timeout)
+            results.append((call_id, str(result)))
+        return results
+
+    async def arun_calls(self, calls: List[Tuple[str, Tool, Dict[str, Any]]]) -> List[Tuple[str, str]]:
+        """Asynchronous counterpart of run_calls for use from an event loop."""
+        async def run_one(tool, params):
+            timeout = self.get_timeout(tool)
+            submitted = self.submit(tool, params)
+            try:
+                return str(await asyncio.wait_for(asyncio.wrap_future(submitted), timeout))
+            except asyncio.TimeoutError:
+                self._abandon(tool, submitted)
+                return self._timeout_message(tool, timeout)
+
+        results = await asyncio.gather(*(run_one(tool, params) for _, tool, params in calls))
+        return [(call_id, result) for (call_id, _, _), result in zip(calls, results)]
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools = set(self._thread_calls.values()) | {self._thread_pool}
+        for pool in pools:
+            pool.shutdown(wait=wait)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
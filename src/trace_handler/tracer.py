@@ -0,0 +1,356 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from background_writer import BackgroundBatchWriter
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation. Spans nest through parent_id and share the trace_id of their root."""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes",
+                 "status", "error", "thread_id", "_tracer")
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = None
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def is_recording(self) -> bool:
+        return self.end_ns is None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer._on_end(self)
+
+    def get_duration(self) -> float:
+        """Return the span's duration in seconds (so far, if it has not ended)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "attributes": dict(self.attributes),
+            "status": self.status,
+            "error": self.error,
+            "thread_id": self.thread_id,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a Span when tracing is disabled; every method does nothing."""
+    name = trace_id = span_id = parent_id = None
+
+    def is_recording(self) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    """Context manager that makes a span current for its block and ends it on exit."""
+    __slots__ = ("_span", "_end", "_token")
+
+    def __init__(self, span: Span, end: bool = True):
+        self._span = span
+        self._end = end
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc is not None:
+            self._span.record_exception(exc)
+        if self._end:
+            self._span.end()
+        return False
+
+
+class SpanExporter:
+    """Destination for finished spans, called with batches from the tracer's export thread."""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in memory, mainly for tests."""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Writes spans to a JSON file in the Chrome trace event format.
+
+    The file opens directly in Perfetto (ui.perfetto.dev), chrome://tracing
+    or speedscope as a flame graph; each event's args carry the span's
+    trace, span and parent IDs and its attributes. Each batch of events is
+    appended as it is exported, and shutdown() closes the JSON document.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pid = os.getpid()
+        self._started = False
+        self._finished = False
+
+    def _to_event(self, span: Span) -> Dict[str, Any]:
+        return {
+            "name": span.name,
+            "cat": span.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": span.start_ns / 1000,
+            "dur": (span.end_ns - span.start_ns) / 1000,
+            "pid": self._pid,
+            "tid": span.thread_id,
+            "args": {
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "status": span.status,
+                "error": span.error,
+                **span.attributes,
+            },
+        }
+
+    def _append(self, text: str) -> None:
+        if not self._started:
+            text = '{"displayTimeUnit": "ms", "traceEvents": [\n' + text
+        with open(self.path, 'a' if self._started else 'w', encoding='utf-8') as file:
+            file.write(text)
+        self._started = True
+
+    def export(self, spans: List[Span]) -> None:
+        events = ",\n".join(json.dumps(self._to_event(span), default=str) for span in spans)
+        self._append(events if not self._started else ",\n" + events)
+
+    def shutdown(self) -> None:
+        if not self._finished:
+            self._finished = True
+            self._append("\n]}\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """Sends spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding.
+
+    Uses only the standard library. Export failures are logged and the batch
+    is dropped, so an unreachable collector never breaks a run.
+    """
+    STATUS_CODES = {"ok": 1, "error": 2}
+
+    def __init__(self, endpoint: str = "http://localhost:4318/v1/traces", service_name: str = "saoirse",
+                 headers: Optional[Dict[str, str]] = None, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+
+    def _to_otlp_span(self, span: Span) -> Dict[str, Any]:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": self.STATUS_CODES[span.status]},
+        }
+        if span.parent_id is not None:
+            otlp_span["parentSpanId"] = span.parent_id
+        if span.error is not None:
+            otlp_span["status"]["message"] = span.error
+        return otlp_span
+
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "trace_handler"},
+                    "spans": [self._to_otlp_span(span) for span in spans],
+                }],
+            }]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        import urllib.request
+        body = json.dumps(self.encode(spans), default=str).encode('utf-8')
+        request = urllib.request.Request(self.endpoint, data=body, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except Exception as e:
+            logging.warning(f"Could not export {len(spans)} spans to {self.endpoint}: {e}")
+
+
+class Tracer:
+    """Creates spans and hands finished ones to exporters from a background thread.
+
+    A tracer without exporters is disabled: span() then returns a shared
+    no-op span, so instrumented code costs one call and one check.
+    """
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None, batch_size: int = 256,
+                 flush_interval: float = 1.0):
+        self._exporters = list(exporters or [])
+        self._writer = None
+        self._closed = False
+        if self._exporters:
+            self._writer = BackgroundBatchWriter(self._export, "span-exporter", batch_size, flush_interval)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._exporters)
+
+    def span(self, name: str, **attributes):
+        """Context manager that starts a child of the current span and makes it current."""
+        if not self._exporters:
+            return _NOOP_SPAN
+        return _ActiveSpan(Span(self, name, _current_span.get(), attributes))
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes):
+        """Start a span without making it current; the caller must end() it."""
+        if not self._exporters:
+            return _NOOP_SPAN
+        return Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+
+    def use_span(self, span, end: bool = False):
+        """Make an existing span current for a block, e.g. between the yields of a generator."""
+        if not isinstance(span, Span):
+            return _NOOP_SPAN
+        return _ActiveSpan(span, end=end)
+
+    def bind(self, function: Callable) -> Callable:
+        """Carry the current span over to a function that will run on another thread."""
+        if not self._exporters:
+            return function
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+    def _on_end(self, span: Span) -> None:
+        if not self._closed:
+            self._writer.put(span)
+
+    def flush(self) -> None:
+        """Block until every span ended so far has been exported."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def shutdown(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._writer.close()
+        for exporter in self._exporters:
+            exporter.shutdown()
+
+    def _export(self, spans: List[Span]) -> None:
+        for exporter in self._exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                logging.warning(f"Span exporter {type(exporter).__name__} failed: {e}")
+
+
+def current_span():
+    """Return the span current in this thread or task, or a no-op span if there is none."""
+    span = _current_span.get()
+    return span if span is not None else _NOOP_SPAN
+
+
+_tracer = Tracer()
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer; it is disabled until set_tracer() installs one with exporters."""
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> None:
+    """Replace the process-wide tracer, shutting down the previous one."""
+    global _tracer
+    with _tracer_lock:
+        previous, _tracer = _tracer, tracer
+    if previous is not tracer:
+        previous.shutdown()
+
+
+@atexit.register
+def _shutdown_tracer() -> None:
+    _tracer.shutdown()
@@ -0,0 +1,113 @@
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from background_writer import BackgroundBatchWriter
+
+
+class TranscriptSink:
+    """Destination for the structured records agents produce while running."""
+
+    def write(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class NullTranscriptSink(TranscriptSink):
+    """Discards every record."""
+
+    def write(self, record: Dict[str, Any]) -> None:
+        pass
+
+
+class MemoryTranscriptSink(TranscriptSink):
+    """Keeps records in memory, mainly for tests and the GUI."""
+
+    def __init__(self):
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def get_records(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record for record in self._records if run_id is None or record.get("run_id") == run_id]
+
+
+class FileTranscriptSink(TranscriptSink):
+    """Appends records as JSON lines from a background writer thread.
+
+    write() only enqueues the record, so agents never wait on the disk. The
+    writer drains the queue in batches of up to ``batch_size`` records, or
+    whatever has arrived within ``flush_interval`` seconds, and appends each
+    batch with a single write.
+    """
+
+    def __init__(self, output_dir: str = ".", filename: str = "transcript.jsonl",
+                 batch_size: int = 100, flush_interval: float = 0.5):
+        os.makedirs(output_dir, exist_ok=True)
+        self.path = os.path.join(output_dir, filename)
+        self._writer = BackgroundBatchWriter(self._append, "transcript-writer", batch_size, flush_interval)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._writer.closed:
+            raise RuntimeError("Transcript sink has been closed")
+        self._writer.put(record)
+
+    def flush(self) -> None:
+        """Block until every record written so far is on disk."""
+        self._writer.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        """Append records to the file, logging and dropping any that cannot be written."""
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            except (TypeError, ValueError) as e:
+                logging.error(f"Could not serialise a transcript record: {e}")
+        try:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write("".join(lines))
+        except OSError as e:
+            logging.error(f"Could not write {len(lines)} transcript records to {self.path}: {e}")
+
+
+_default_sink: Optional[TranscriptSink] = None
+_default_sink_lock = threading.Lock()
+
+
+def get_default_sink() -> TranscriptSink:
+    """Return the process-wide sink, creating a FileTranscriptSink in the working directory on first use."""
+    global _default_sink
+    with _default_sink_lock:
+        if _default_sink is None:
+            _default_sink = FileTranscriptSink()
+        return _default_sink
+
+
+def set_default_sink(sink: TranscriptSink) -> None:
+    """Replace the process-wide sink, closing the previous one."""
+    global _default_sink
+    with _default_sink_lock:
+        previous, _default_sink = _default_sink, sink
+    if previous is not None and previous is not sink:
+        previous.close()
+
+
+@atexit.register
+def _close_default_sink() -> None:
+    if _default_sink is not None:
+        _default_sink.close()
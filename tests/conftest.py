@@ -0,0 +1,21 @@
+import copy
+import pytest
+# Imported under the name the wrapper uses, so that the config is the same singleton
+from llm_wrap_lib.shared_config import SharedConfig
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path):
+    """Keep tests from rewriting the tracked config.json.
+
+    save_config() writes to a copy under tmp_path, and whatever a test
+    changed in the shared config is put back afterwards.
+    """
+    config = SharedConfig()
+    config_path = config._config_path
+    data = copy.deepcopy(config.data)
+    config._config_path = str(tmp_path / "config.json")
+    yield config
+    config._config_path = config_path
+    config.data.clear()
+    config.data.update(data)
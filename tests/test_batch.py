@@ -0,0 +1,56 @@
+import threading
+import time
+import pytest
+from src.state_machine.batch import BatchRunner
+
+
+GRAPH = {"states": [{"name": "Researcher", "connections": []}]}
+DEFINITIONS = {
+    "agents": [{
+        "name": "Researcher",
+        "goal": "Learn about {topic}",
+        "backstory": "Expert",
+        "task": {"description": "Research {topic}", "expected_output": "A report on {topic}"},
+    }]
+}
+
+def test_render_definitions_is_isolated_per_record():
+    runner = BatchRunner(GRAPH, DEFINITIONS)
+    rendered = runner.render_definitions({"topic": "AI"})
+    assert rendered["agents"][0]["task"]["description"] == "Research AI"
+    assert rendered["agents"][0]["goal"] == "Learn about AI"
+    assert DEFINITIONS["agents"][0]["task"]["description"] == "Research {topic}"
+
+def test_literal_braces_are_kept():
+    definitions = {"agents": [{
+        "name": "Researcher",
+        "goal": "Learn about {topic}",
+        "backstory": 'Answers as {"topic": "{topic}", "notes": []}; never writes a stray } or {{ }',
+        "task": {"description": "Fill in {{topic}} for {topic}: def f(): return {}"},
+    }]}
+    rendered = BatchRunner(GRAPH, definitions).render_definitions({"topic": "AI"})["agents"][0]
+    assert rendered["backstory"] == 'Answers as {"topic": "AI", "notes": []}; never writes a stray } or { }'
+    assert rendered["task"]["description"] == "Fill in {topic} for AI: def f(): return {}"
+
+def test_missing_variable():
+    with pytest.raises(ValueError):
+        BatchRunner(GRAPH, DEFINITIONS).render_definitions({})
+
+def test_run_respects_concurrency_and_yields_every_record(monkeypatch):
+    runner = BatchRunner(GRAPH, DEFINITIONS, concurrency=3)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_run_record(index, variables):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {"index": index, "input": variables}
+
+    monkeypatch.setattr(runner, "run_record", fake_run_record)
+    results = list(runner.run({"topic": f"topic {i}"} for i in range(20)))
+
+    assert sorted(result["index"] for result in results) == list(range(20))
+    assert peak[0] == 3
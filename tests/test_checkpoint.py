@@ -0,0 +1,136 @@
+import pytest
+from src.state_machine.checkpoint import CheckpointStore, MemoryCheckpointStore, SQLiteCheckpointStore
+from src.state_machine.engine import State, StateMachineEngine
+
+
+class FakeAgent:
+    def __init__(self, name, fail=False):
+        self._name = name
+        self.goal = f"Do {name}"
+        self.fail = fail
+        self.calls = 0
+
+    def get_name(self):
+        return self._name
+
+    def describe_inputs(self):
+        return {"name": self._name, "goal": self.goal}
+
+    def set_transcript_context(self, run_id, state_name):
+        pass
+
+    def execute_task(self, on_delta=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self._name} failed")
+        return f"{self._name} done: {self.goal}"
+
+
+class ContextState(State):
+    def execute_task(self, context=None, on_delta=None, run_id=None):
+        self.context = context
+        self.response = self.agent.execute_task()
+        self.cost = 0.5
+        return self.response
+
+
+def build_chain(store, failing=None, incremental=False):
+    machine = StateMachineEngine(checkpoint_store=store, incremental=incremental)
+    states = [ContextState(FakeAgent(name, fail=name == failing)) for name in "ABC"]
+    for state in states:
+        machine.add_state(state)
+    machine.add_transition(states[0], states[1], True)
+    machine.add_transition(states[1], states[2], True)
+    return machine, states
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCheckpointStore()
+    return SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+
+def test_stores_must_implement_every_method():
+    class Incomplete(CheckpointStore):
+        def save_state(self, run_id, state_name, checkpoint):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_store_round_trip(store):
+    store.set_run_status("run", "running")
+    store.save_state("run", "A", {"response": "A done", "context": {"previous_result": "x"}, "cost": 0.1})
+    assert store.load_states("run") == {"A": {"response": "A done", "context": {"previous_result": "x"}, "cost": 0.1}}
+    assert store.load_states("other") == {}
+    assert store.get_latest_run() == "run"
+
+    store.set_run_status("run", "completed")
+    assert store.get_run_status("run") == "completed"
+    assert store.get_latest_run() is None
+    assert store.get_latest_run(unfinished_only=False) == "run"
+
+    store.delete_run("run")
+    assert store.load_states("run") == {} and store.get_run_status("run") is None
+
+def test_each_finished_state_is_checkpointed(store):
+    machine, _ = build_chain(store)
+    machine.run()
+    checkpoints = store.load_states(machine.run_id)
+    assert set(checkpoints) == {"A", "B", "C"}
+    assert checkpoints["B"].pop("metrics")["cost"] == 0.5
+    assert checkpoints["B"] == {
+        "response": "B done: Do B", "context": {"previous_result": "A done: Do A"}, "context_tokens": None,
+        "cost": 0.5, "fingerprint": None
+    }
+    assert store.get_run_status(machine.run_id) == "completed"
+
+def test_failed_run_resumes_from_last_completed_state(store):
+    machine, (a, b, c) = build_chain(store, failing="C")
+    with pytest.raises(RuntimeError):
+        machine.run()
+    run_id = machine.run_id
+    assert store.get_run_status(run_id) == "failed"
+    assert store.get_latest_run() == run_id
+
+    c.agent.fail = False
+    restored = []
+    machine.on_state_restored = lambda state, result: restored.append(state)
+    results = machine.run(run_id)
+
+    # A and B come from the checkpoint; only C is executed again
+    assert (a.agent.calls, b.agent.calls, c.agent.calls) == (1, 1, 2)
+    assert restored == [a, b]
+    assert results[c] == "C done: Do C"
+    assert c.context == {"previous_result": "B done: Do B"}
+    assert b.context == {"previous_result": "A done: Do A"} and b.cost == 0.5
+    totals = machine.get_metrics().totals()
+    assert totals["states_restored"] == 2 and totals["states_executed"] == 1
+    assert totals["cost"] == 0.5 and totals["cost_saved"] == 1.0
+    assert store.get_run_status(run_id) == "completed"
+
+def test_incremental_run_only_executes_changed_states(store):
+    machine, (a, b, c) = build_chain(store, incremental=True)
+    machine.run()
+    assert store.find_result("A", a.fingerprint(None))["response"] == "A done: Do A"
+
+    # Nothing changed: every state is reused
+    machine.run()
+    assert (a.agent.calls, b.agent.calls, c.agent.calls) == (1, 1, 1)
+
+    # Editing B re-runs B and, because its output changed, C; A is reused
+    b.agent.goal = "Do B differently"
+    results = machine.run()
+    assert (a.agent.calls, b.agent.calls, c.agent.calls) == (1, 2, 2)
+    assert results[c] == "C done: Do C"
+    assert c.context == {"previous_result": "B done: Do B differently"}
+
+    # Reverting the edit finds the first run's results again
+    b.agent.goal = "Do B"
+    machine.run()
+    assert (a.agent.calls, b.agent.calls, c.agent.calls) == (1, 2, 2)
+
+def test_non_incremental_run_executes_everything(store):
+    machine, states = build_chain(store)
+    machine.run()
+    machine.run()
+    assert [state.agent.calls for state in states] == [2, 2, 2]
@@ -0,0 +1,111 @@
+import pytest
+from src.agent_handler.task import Task
+from src.state_machine.context import (
+    ContextStrategy, FullContext, LastNContext, SummariseContext, TruncateContext,
+    compact_context, count_tokens, create_context_strategy, truncate_to_tokens
+)
+from src.state_machine.engine import State
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self._content = content
+
+    def get_response_content(self):
+        return self._content
+
+
+class FakeWrapper:
+    def __init__(self):
+        self.prompts = []
+
+    def call_model(self, prompt, model_name=None, **kwargs):
+        self.prompts.append((prompt, model_name, kwargs))
+        return FakeResponse("short summary")
+
+
+class FakeAgent:
+    def __init__(self):
+        self._current_task = Task("Write a report", "A report")
+        self.wrapper = FakeWrapper()
+        self.contexts = []
+
+    def get_name(self):
+        return "Writer"
+
+    def get_llm_wrapper(self):
+        return self.wrapper
+
+    def set_transcript_context(self, run_id, state_name):
+        pass
+
+    def get_cost_summary(self):
+        return {"total_cost": 0.0}
+
+    def get_last_response(self):
+        return None
+
+    def execute_task(self, on_delta=None, context=None):
+        self.contexts.append(context)
+        return "done"
+
+
+LONG = " ".join(f"word{i}" for i in range(2000))
+FAN_IN = {"previous_results": {"A": "alpha " * 400, "B": "beta " * 400, "C": "gamma"}}
+
+def test_full_context_is_unchanged():
+    text, tokens = compact_context({"previous_result": "hello"}, FullContext(), FakeAgent())
+    assert text == "hello"
+    assert tokens["before"] == tokens["after"] > 0
+    assert compact_context(None, FullContext(), FakeAgent()) == (None, None)
+
+def test_truncate_respects_budget():
+    assert truncate_to_tokens("short", 100) == "short"
+    truncated = truncate_to_tokens(LONG, 50)
+    assert count_tokens(truncated) <= 50
+    assert truncated.startswith("word0 word1")
+
+    text, tokens = compact_context(FAN_IN, TruncateContext(max_tokens=90), FakeAgent())
+    assert tokens["before"] > tokens["after"]
+    # The budget is shared, so every upstream result is still represented
+    assert "A:" in text and "B:" in text and "C:\ngamma" in text
+
+def test_last_n_keeps_latest_results():
+    text, _ = compact_context(FAN_IN, LastNContext(n=2), FakeAgent())
+    assert "A:" not in text and text.startswith("B:")
+
+def test_summarise_only_when_over_budget():
+    agent = FakeAgent()
+    text, _ = compact_context({"previous_result": "tiny"}, SummariseContext(max_tokens=100), agent)
+    assert text == "tiny" and agent.wrapper.prompts == []
+
+    text, tokens = compact_context({"previous_result": LONG}, SummariseContext(model="cheap", max_tokens=100), agent)
+    assert text == "short summary"
+    assert tokens["after"] < tokens["before"]
+    prompt, model_name, kwargs = agent.wrapper.prompts[0]
+    assert model_name == "cheap" and kwargs == {"temperature": 0} and "word1999" in prompt
+
+def test_create_context_strategy_round_trip():
+    strategy = create_context_strategy({"strategy": "truncate", "max_tokens": 300})
+    assert isinstance(strategy, TruncateContext) and strategy.max_tokens == 300
+    assert isinstance(create_context_strategy(strategy.to_dict()), TruncateContext)
+    assert isinstance(create_context_strategy(None), FullContext)
+    with pytest.raises(ValueError):
+        create_context_strategy({"strategy": "nonexistent"})
+
+def test_strategies_must_implement_compact():
+    class Incomplete(ContextStrategy):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_state_does_not_mutate_task():
+    agent = FakeAgent()
+    state = State(agent, TruncateContext(max_tokens=20))
+    for _ in range(3):
+        state.execute_task({"previous_result": LONG})
+    assert agent._current_task.get_description() == "Write a report"
+    assert agent.contexts[0] == agent.contexts[-1]
+    assert count_tokens(agent.contexts[-1]) <= 20
+    assert state.context_tokens["after"] <= 20 < state.context_tokens["before"]
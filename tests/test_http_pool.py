@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+pytest.importorskip("httpx")
+
+# Imported under the name the wrapper uses, so that the pool is the same singleton
+from llm_wrap_lib.http_pool import HttpClientPool
+from src.llm_wrap_lib.llm_wrap import DynamicLLMWrapper
+from src.llm_wrap_lib.retry import RetryPolicy
+
+MODEL = "openai/stub-model"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat completions like an OpenAI-compatible server, over kept-alive HTTP/1.1 connections."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.client_ports.add(self.client_address[1])
+        time.sleep(self.server.delay)
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"Echo: {request['messages'][-1]['content']}"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.client_ports = set()
+    server.lock = threading.Lock()
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_wrapper(server):
+    wrapper = DynamicLLMWrapper()
+    wrapper.config['mocking'] = False
+    wrapper.backend = None
+    wrapper.batcher = None
+    wrapper.response_cache = None
+    wrapper.semantic_cache = None
+    wrapper.available_models = {MODEL: MODEL}
+    wrapper.retry_policy = RetryPolicy(max_attempts=1)
+    wrapper.api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    return wrapper
+
+@pytest.fixture
+def wrapper(stub_server):
+    wrapper = make_wrapper(stub_server)
+    http_config = wrapper.config.get('http')
+    HttpClientPool().reset_stats()
+    yield wrapper
+    wrapper.config['http'] = http_config
+
+def call(wrapper, prompt):
+    return wrapper.call_model(prompt, model_name=MODEL, api_base=wrapper.api_base, api_key="sk-test")
+
+def test_calls_from_all_agents_reuse_one_connection(wrapper, stub_server):
+    # Separate wrappers, as every agent has its own
+    other = make_wrapper(stub_server)
+    for index in range(3):
+        assert call(wrapper, f"Hi {index}").get_response_content() == f"Echo: Hi {index}"
+        assert call(other, f"Bye {index}").get_response_content() == f"Echo: Bye {index}"
+
+    stats = wrapper.get_http_stats()
+    assert (stats["requests"], stats["connections_opened"], stats["reused_connections"]) == (6, 1, 5)
+    assert stats["reuse_rate"] == pytest.approx(5 / 6)
+    assert len(stub_server.client_ports) == 1
+    assert stats["open_connections"] == 1 and stats["busy_connections"] == 0
+
+def test_pool_limits_bound_concurrent_connections(wrapper, stub_server):
+    wrapper.config['http'] = {"enabled": True, "max_connections": 2}
+    stub_server.delay = 0.05
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        answers = list(pool.map(lambda index: call(wrapper, f"Q{index}").get_response_content(), range(6)))
+
+    assert answers == [f"Echo: Q{index}" for index in range(6)]
+    stats = wrapper.get_http_stats()
+    assert stats["max_connections"] == 2 and stats["connections_opened"] == 2
+    assert len(stub_server.client_ports) == 2
+
+def test_async_calls_share_the_async_client(wrapper, stub_server):
+    async def call_all():
+        return await asyncio.gather(*(wrapper.acall_model(f"Q{index}", model_name=MODEL, api_base=wrapper.api_base,
+                                                          api_key="sk-test") for index in range(4)))
+    responses = asyncio.run(call_all())
+
+    assert [response.get_response_content() for response in responses] == [f"Echo: Q{index}" for index in range(4)]
+    stats = wrapper.get_http_stats()
+    assert stats["requests"] == 4 and stats["connections_opened"] <= 4
+
+def test_clients_set_by_the_application_are_kept():
+    import litellm
+    own = object()
+    previous = litellm.client_session
+    litellm.client_session = own
+    try:
+        HttpClientPool().install(litellm)
+        assert litellm.client_session is own
+    finally:
+        litellm.client_session = previous
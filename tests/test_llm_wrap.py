@@ -87,4 +87,56 @@ def test_mocking_disabled(wrapper):
 
     # Rest of your test...
     result = wrapper.call_model("Test prompt")
-    assert "Mocked response for prompt: Test prompt" not in result.get_response_content()
\ No newline at end of file
+    assert "Mocked response for prompt: Test prompt" not in result.get_response_content()
+
+
+def test_acall_model(wrapper):
+    import asyncio
+
+    wrapper.config['mocking'] = True
+    wrapper.save_config()
+    wrapper.reset_costs()
+
+    async def run_concurrently():
+        return await asyncio.gather(*(wrapper.acall_model(f"Prompt {i}") for i in range(10)))
+
+    results = asyncio.run(run_concurrently())
+    assert all("Mocked response for prompt: Prompt" in r.get_response_content() for r in results)
+    assert round(wrapper.total_cost, 4) == 0.001
+
+def test_acall_model_runs_tool_calls(wrapper):
+    import asyncio
+    from src.llm_wrap_lib.mock_backend import MockBackend
+    from src.tool_handler.tool import Tool
+    # Imported under the name the wrapper uses, so that the bank is the same singleton
+    from tool_handler.tool_bank import ToolBank
+
+    looked_up = []
+    def lookup(key):
+        looked_up.append(key)
+        return f"value of {key}"
+
+    ToolBank().add_tool(Tool("async_lookup", "Look up the value of a key", lookup))
+    backend = MockBackend(tool_calls=[{"name": "async_lookup", "arguments": {"key": "a"}}], tool_call_rate=1.0)
+    wrapper.config['mocking'] = False
+    wrapper.backend = backend
+    wrapper.available_models = {}
+    wrapper.initialize_models()
+    wrapper.reset_costs()
+    offered = {"type": "function", "function": {"name": "async_lookup", "parameters": {}}}
+
+    response = asyncio.run(wrapper.acall_model("What is a?", tools=[offered]))
+    assert looked_up == ["a"]
+    assert response.get_response_content().startswith("Simulated answer from mock-model")
+    assert backend.get_stats()["requests"] == 2
+    assert backend.get_stats()["tool_call_turns"] == 1
+
+def test_stream_model(wrapper):
+    wrapper.config['mocking'] = True
+    wrapper.save_config()
+
+    stream = wrapper.stream_model("Stream this prompt")
+    deltas = list(stream)
+    assert len(deltas) > 1
+    assert "".join(deltas) == stream.get_response().get_response_content()
+    assert "Mocked response for prompt: Stream this prompt" in stream.get_response().get_response_content()
@@ -0,0 +1,98 @@
+import json
+from types import SimpleNamespace
+from src.llm_wrap_lib.llm_wrap import DynamicLLMWrapper, Response
+from src.llm_wrap_lib.retry import RetryPolicy
+from src.state_machine.checkpoint import MemoryCheckpointStore
+from src.state_machine.engine import State, StateMachineEngine
+from src.state_machine.metrics import RunMetrics, StateMetrics
+
+
+def _response(content, prompt_tokens, completion_tokens, cost=0.001):
+    message = SimpleNamespace(content=content, tool_calls=None)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=message)],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+        _hidden_params={"response_cost": cost},
+    )
+
+
+class FakeAgent:
+    def __init__(self, name):
+        self._name = name
+        self._last_response = None
+
+    def get_name(self):
+        return self._name
+
+    def set_transcript_context(self, run_id, state_name):
+        pass
+
+    def get_cost_summary(self):
+        return {"total_cost": 0.0}
+
+    def get_last_response(self):
+        return self._last_response
+
+    def execute_task(self, on_delta=None, context=None):
+        self._last_response = Response({
+            "content": f"{self._name} done", "model": "gpt-4", "prompt_tokens": 100, "completion_tokens": 20,
+            "wall_time": 0.5, "time_to_first_token": 0.2, "tool_calls": 2, "iterations": 3, "retries": 1,
+        })
+        return self._last_response.get_response_content()
+
+def test_call_model_reports_usage_and_timings():
+    wrapper = DynamicLLMWrapper()
+    wrapper.config['mocking'] = False
+    wrapper.available_models = {'gpt-4': 'gpt-4'}
+    wrapper.default_model = 'gpt-4'
+    wrapper.retry_policy = RetryPolicy(base_delay=0.0, max_delay=0.0)
+    failures = [TimeoutError()]
+
+    def send(model_name, messages, tools, kwargs):
+        if failures:
+            raise failures.pop()
+        return _response("ok", prompt_tokens=12, completion_tokens=3)
+
+    wrapper._send = send
+    response = wrapper.call_model("Hi")
+    assert response.get_model() == 'gpt-4'
+    assert (response.get_prompt_tokens(), response.get_completion_tokens()) == (12, 3)
+    assert response.get_total_tokens() == 15
+    assert response.get_retries() == 1 and response.get_iterations() == 1
+    assert response.get_tool_call_count() == 0 and not response.is_cached()
+    assert 0 <= response.get_time_to_first_token() <= response.get_wall_time()
+    assert json.dumps(response.to_dict())
+
+def test_engine_aggregates_state_metrics():
+    machine = StateMachineEngine(checkpoint_store=MemoryCheckpointStore())
+    a, b = State(FakeAgent("A")), State(FakeAgent("B"))
+    machine.add_state(a)
+    machine.add_state(b)
+    machine.add_transition(a, b, True)
+    machine.run()
+
+    metrics = machine.get_metrics()
+    assert metrics.run_id == machine.run_id
+    state_b = metrics.get_state("B")
+    assert state_b.model == "gpt-4" and state_b.tool_calls == 2 and state_b.retries == 1
+    assert state_b.context_tokens_before == state_b.context_tokens_after > 0
+    totals = metrics.totals()
+    assert totals["prompt_tokens"] == 200 and totals["completion_tokens"] == 40
+    assert totals["states_executed"] == 2 and totals["wall_time"] > 0
+
+def test_json_and_prometheus_export():
+    metrics = RunMetrics("run-1")
+    metrics.add_state(StateMetrics(name="Writer", model="gpt-4", prompt_tokens=10, cost=0.25, wall_time=1.5))
+    metrics.add_state(StateMetrics(name='Odd "name"', cost=1.0, restored=True))
+
+    data = json.loads(metrics.to_json())
+    assert data["totals"]["cost"] == 0.25 and data["totals"]["cost_saved"] == 1.0
+    assert [state["name"] for state in data["states"]] == ["Writer", 'Odd "name"']
+
+    text = metrics.to_prometheus()
+    assert "# TYPE statemachine_state_cost_usd gauge" in text
+    assert 'statemachine_state_cost_usd{run_id="run-1",state="Writer",model="gpt-4",restored="false"} 0.25' in text
+    assert 'state="Odd \\"name\\""' in text
+    assert 'statemachine_run_prompt_tokens{run_id="run-1"} 10.0' in text
+    # Unset values, such as time to first token, are omitted rather than exported as zero
+    assert "statemachine_state_time_to_first_token_seconds{" not in text
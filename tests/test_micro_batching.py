@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import wait
+from types import SimpleNamespace
+import pytest
+from src.llm_wrap_lib.llm_wrap import DynamicLLMWrapper
+from src.llm_wrap_lib.micro_batching import MicroBatcher
+from src.llm_wrap_lib.mock_backend import LatencyModel, MockBackend, MockBackendError
+from src.llm_wrap_lib.retry import RetryPolicy
+
+
+@pytest.fixture
+def make_wrapper():
+    def make(backend, batcher):
+        wrapper = DynamicLLMWrapper()
+        wrapper.config['mocking'] = False
+        wrapper.backend = backend
+        wrapper.batcher = batcher
+        wrapper.response_cache = None
+        wrapper.semantic_cache = None
+        wrapper.available_models = {}
+        wrapper.initialize_models()
+        wrapper.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0)
+        wrapper.reset_costs()
+        return wrapper
+    return make
+
+def conversation(text):
+    return [{"role": "user", "content": text}]
+
+def test_concurrent_calls_share_one_batch_and_keep_their_own_cost(make_wrapper):
+    backend = MockBackend(seed=0)
+    batcher = MicroBatcher(window_seconds=0.2)
+    # One wrapper per agent, as in a graph run; each must be charged for its own answer only
+    wrappers = [make_wrapper(backend, batcher) for _ in range(8)]
+    responses = [None] * len(wrappers)
+
+    def call(index):
+        responses[index] = wrappers[index].call_model(f"Question {index} " + "padding " * index)
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(len(wrappers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.get_stats()["requests"] == 8 and backend.get_stats()["batches"] == 1
+    assert batcher.get_stats()["mean_batch_size"] == 8
+    for index, (wrapper, response) in enumerate(zip(wrappers, responses)):
+        assert f"Question {index}" in response.get_response_content()
+        expected = response.get_total_tokens() * backend.cost_per_token
+        assert wrapper.get_cost_summary()["total_cost"] == pytest.approx(expected)
+    assert len({wrapper.get_cost_summary()["total_cost"] for wrapper in wrappers}) == 8
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    backend = MockBackend()
+    batcher = MicroBatcher(window_seconds=0.5, max_batch_size=4)
+    futures = [batcher.submit(backend, "mock-model", conversation(f"Q{index}"), None, {}) for index in range(10)]
+    wait(futures[:8], timeout=0.25)
+    assert all(future.done() for future in futures[:8])
+    assert not any(future.done() for future in futures[8:])
+
+    wait(futures)
+    assert [future.result().choices[0].message.content.split(": ")[1].split()[0] for future in futures] == \
+        [f"Q{index}" for index in range(10)]
+    stats = batcher.get_stats()
+    assert (stats["batches"], stats["batched_requests"], stats["mean_batch_size"]) == (3, 10, 10 / 3)
+
+def test_requests_only_batch_with_matching_model_and_kwargs():
+    backend = MockBackend(models=["a", "b"])
+    batcher = MicroBatcher(window_seconds=0.05)
+    futures = [
+        batcher.submit(backend, "a", conversation("Q"), None, {"temperature": 0}),
+        batcher.submit(backend, "a", conversation("Q"), None, {"temperature": 0}),
+        batcher.submit(backend, "a", conversation("Q"), None, {"temperature": 1}),
+        batcher.submit(backend, "b", conversation("Q"), None, {"temperature": 0}),
+    ]
+    wait(futures)
+    # The two requests that were alone in their batch went out as single requests
+    assert backend.get_stats()["batches"] == 1 and backend.get_stats()["requests"] == 4
+
+def test_failed_requests_fail_only_their_own_future():
+    backend = MockBackend(error_rate=0.5, error_status_codes=[400], seed=3)
+    batcher = MicroBatcher(window_seconds=0.05)
+    futures = [batcher.submit(backend, "mock-model", conversation(f"Q{index}"), None, {}) for index in range(20)]
+    wait(futures)
+    failed = [future for future in futures if future.exception() is not None]
+    assert len(failed) == backend.get_stats()["errors"] and 0 < len(failed) < 20
+    assert all(isinstance(future.exception(), MockBackendError) for future in failed)
+
+def test_providers_without_a_batch_endpoint_get_pooled_requests():
+    backend = MockBackend(batch_endpoint=False)
+    batcher = MicroBatcher(window_seconds=10.0)
+    futures = [batcher.submit(backend, "mock-model", conversation(f"Q{index}"), None, {}) for index in range(6)]
+    # Not held back for the window
+    assert len(wait(futures, timeout=5.0).done) == 6
+    assert backend.get_stats()["batches"] == 0
+    assert batcher.get_stats()["pooled_requests"] == 6
+
+def test_providers_without_a_batch_endpoint_are_called_directly(make_wrapper):
+    calling_threads = []
+
+    class UnbatchedBackend(MockBackend):
+        def completion(self, *args, **kwargs):
+            calling_threads.append(threading.current_thread())
+            return super().completion(*args, **kwargs)
+
+        async def acompletion(self, *args, **kwargs):
+            calling_threads.append("acompletion")
+            return await super().acompletion(*args, **kwargs)
+
+    batcher = MicroBatcher(window_seconds=10.0)
+    wrapper = make_wrapper(UnbatchedBackend(batch_endpoint=False), batcher)
+    assert "Question" in wrapper.call_model("Question").get_response_content()
+    assert "Question" in asyncio.run(wrapper.acall_model("Question")).get_response_content()
+
+    assert calling_threads == [threading.current_thread(), "acompletion"]
+    assert batcher.get_stats()["requests"] == 0
+
+def test_pooled_requests_keep_the_callers_context():
+    variable = contextvars.ContextVar("variable", default=None)
+    seen = []
+
+    class RecordingBackend(MockBackend):
+        def completion(self, *args, **kwargs):
+            seen.append(variable.get())
+            return super().completion(*args, **kwargs)
+
+    variable.set("caller")
+    batcher = MicroBatcher()
+    batcher.submit(RecordingBackend(batch_endpoint=False), "mock-model", conversation("Q"), None, {}).result()
+    assert seen == ["caller"]
+
+def test_batch_providers_and_pricing():
+    batcher = MicroBatcher(batch_providers=("vllm",))
+    litellm_like = SimpleNamespace(completion_cost=lambda completion_response: 0.25)
+    assert batcher.supports_batch_completion(litellm_like, "vllm/meta-llama/Llama-3-8B")
+    assert not batcher.supports_batch_completion(litellm_like, "gpt-4")
+
+    unpriced = SimpleNamespace(_hidden_params={})
+    assert MicroBatcher._priced(litellm_like, unpriced)._hidden_params["response_cost"] == 0.25
+    priced = SimpleNamespace(_hidden_params={"response_cost": 0.5})
+    assert MicroBatcher._priced(litellm_like, priced)._hidden_params["response_cost"] == 0.5
+
+def test_async_calls_are_batched(make_wrapper):
+    backend = MockBackend(latency=LatencyModel(mean=0.01))
+    wrapper = make_wrapper(backend, MicroBatcher(window_seconds=0.05))
+
+    async def call_all():
+        return await asyncio.gather(*(wrapper.acall_model(f"Question {index}") for index in range(5)))
+    responses = asyncio.run(call_all())
+
+    assert [f"Question {index}" in response.get_response_content() for index, response in enumerate(responses)] == [True] * 5
+    assert backend.get_stats()["batches"] == 1
+    assert wrapper.get_batching_stats()["batched_requests"] == 5
@@ -0,0 +1,142 @@
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+# Imported under the name the wrapper and engine use, so that the token and exception are the same objects
+from llm_wrap_lib.cancellation import CancellationToken, RunCancelled, use_cancellation
+from src.llm_wrap_lib.llm_wrap import DynamicLLMWrapper
+from src.llm_wrap_lib.mock_backend import LatencyModel, MockBackend, MockBackendError
+from src.llm_wrap_lib.retry import RetryPolicy
+from src.llm_wrap_lib.streaming import StreamAccumulator
+
+LOOKUP = {"type": "function", "function": {"name": "lookup", "parameters": {}}}
+
+
+@pytest.fixture
+def make_wrapper():
+    def make(backend):
+        wrapper = DynamicLLMWrapper()
+        wrapper.config['mocking'] = False
+        wrapper.backend = backend
+        wrapper.available_models = {}
+        wrapper.initialize_models()
+        wrapper.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0)
+        wrapper.reset_costs()
+        return wrapper
+    return make
+
+def test_latency_distributions():
+    rng = random.Random(0)
+    assert LatencyModel.from_config(0.25).sample(rng) == 0.25
+    assert all(0.1 <= LatencyModel("uniform", low=0.1, high=0.2).sample(rng) <= 0.2 for _ in range(100))
+    assert all(LatencyModel("normal", mean=0.01, stddev=1.0).sample(rng) >= 0.0 for _ in range(100))
+    samples = [LatencyModel("lognormal", mean=0.5, stddev=0.2).sample(rng) for _ in range(5000)]
+    assert abs(sum(samples) / len(samples) - 0.5) < 0.02
+    with pytest.raises(ValueError):
+        LatencyModel("pareto")
+
+def test_from_config_builds_latency_models():
+    backend = MockBackend.from_config({"latency": {"distribution": "uniform", "low": 1, "high": 2},
+                                       "error_rate": 0.1, "unknown": True})
+    assert backend.latency.distribution == "uniform"
+    assert backend.time_to_first_token is backend.latency
+    assert backend.error_rate == 0.1
+
+def test_call_model_goes_through_backend(make_wrapper):
+    backend = MockBackend(latency=LatencyModel(mean=0.05), completion_tokens=10, cost_per_token=0.001)
+    wrapper = make_wrapper(backend)
+    assert wrapper.default_model == "mock-model"
+
+    start = time.monotonic()
+    response = wrapper.call_model("Hello")
+    assert time.monotonic() - start >= 0.05
+    assert response.get_response_content().startswith("Simulated answer from mock-model to: Hello")
+    assert response.get_completion_tokens() == 10
+    assert float(response.get_cost()) == pytest.approx(response.get_total_tokens() * 0.001, abs=1e-4)
+    assert backend.get_stats()["requests"] == 1
+
+def test_errors_are_retried(make_wrapper):
+    backend = MockBackend(error_rate=0.5, error_status_codes=[503], seed=1)
+    wrapper = make_wrapper(backend)
+    for _ in range(10):
+        try:
+            wrapper.call_model("Hi")
+        except MockBackendError:
+            pass
+    stats = backend.get_stats()
+    assert stats["errors"] > 0
+    assert wrapper.get_cost_summary()["reliability"]["retries"] > 0
+
+    wrapper.backend.error_rate = 1.0
+    with pytest.raises(MockBackendError) as error:
+        wrapper.call_model("Hi")
+    assert error.value.status_code == 503
+
+def test_streaming_matches_blocking_answer(make_wrapper):
+    backend = MockBackend(time_to_first_token=LatencyModel(mean=0.02), chunk_interval=0.001, completion_tokens=20,
+                          cost_per_token=0.001)
+    wrapper = make_wrapper(backend)
+    stream = wrapper.stream_model("Hello")
+    deltas = list(stream)
+    response = stream.get_response()
+    assert len(deltas) == 20
+    assert "".join(deltas) == response.get_response_content()
+    assert response.get_time_to_first_token() >= 0.02
+    assert response.get_completion_tokens() == 20
+    assert float(response.get_cost()) > 0
+
+def test_tool_calls_stop_after_max_rounds():
+    backend = MockBackend(tool_calls=[{"name": "lookup", "arguments": {"key": "a"}}, {"name": "missing"}],
+                          tool_call_rate=1.0, max_tool_rounds=1)
+    messages = [{"role": "user", "content": "Hi"}]
+    message = backend.completion("mock-model", messages, tools=[LOOKUP]).choices[0].message
+    # Only tools that were offered are called
+    assert [call.function.name for call in message.tool_calls] == ["lookup"]
+    assert message.tool_calls[0].function.arguments == '{"key": "a"}'
+
+    messages.append({"role": "assistant", "content": None, "tool_calls": message.tool_calls})
+    messages.append({"role": "tool", "content": "value", "tool_call_id": message.tool_calls[0].id})
+    assert backend.completion("mock-model", messages, tools=[LOOKUP]).choices[0].message.tool_calls is None
+    assert backend.completion("mock-model", [{"role": "user", "content": "Hi"}]).choices[0].message.tool_calls is None
+
+def test_streamed_tool_calls_are_reassembled():
+    backend = MockBackend(tool_calls=[{"name": "lookup", "arguments": {"key": "a"}}], tool_call_rate=1.0)
+    accumulator = StreamAccumulator()
+    for chunk in backend.completion("mock-model", [{"role": "user", "content": "Hi"}], tools=[LOOKUP], stream=True):
+        accumulator.add(chunk)
+    tool_call = accumulator.get_tool_calls()[0]
+    assert (tool_call.function.name, tool_call.function.arguments) == ("lookup", '{"key": "a"}')
+
+def test_async_completion_is_concurrent():
+    backend = MockBackend(latency=LatencyModel(mean=0.1))
+    messages = [{"role": "user", "content": "Hi"}]
+
+    async def call_all():
+        return await asyncio.gather(*(backend.acompletion("mock-model", messages) for _ in range(20)))
+
+    start = time.monotonic()
+    responses = asyncio.run(call_all())
+    assert time.monotonic() - start < 0.5
+    assert len({response.id for response in responses}) == 20
+    assert isinstance(responses[0].usage, SimpleNamespace)
+
+def test_cancellation_interrupts_a_slow_call(make_wrapper):
+    wrapper = make_wrapper(MockBackend(latency=LatencyModel(mean=5.0)))
+    cancellation = CancellationToken()
+    threading.Timer(0.1, cancellation.cancel).start()
+    start = time.monotonic()
+    with use_cancellation(cancellation), pytest.raises(RunCancelled):
+        wrapper.call_model("Hello")
+    assert time.monotonic() - start < 1.0
+
+def test_cancellation_interrupts_retry_backoff(make_wrapper):
+    wrapper = make_wrapper(MockBackend(error_rate=1.0, error_status_codes=[503]))
+    wrapper.retry_policy = RetryPolicy(max_attempts=3, base_delay=5.0, max_delay=5.0, jitter=0.0)
+    cancellation = CancellationToken()
+    threading.Timer(0.1, cancellation.cancel).start()
+    start = time.monotonic()
+    with use_cancellation(cancellation), pytest.raises(RunCancelled):
+        wrapper.call_model("Hello")
+    assert time.monotonic() - start < 1.0
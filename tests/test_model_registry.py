@@ -0,0 +1,47 @@
+import pytest
+from src.llm_wrap_lib import model_registry
+from src.llm_wrap_lib.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    calls = []
+
+    def fake_get_valid_models():
+        calls.append(1)
+        return ["gpt-3.5-turbo", "gpt-4"]
+
+    monkeypatch.setattr(model_registry, "get_valid_models", fake_get_valid_models)
+    registry = ModelRegistry()
+    registry.invalidate()
+    registry.ttl_seconds = 3600
+    registry.calls = calls
+    return registry
+
+def test_registry_is_a_singleton():
+    assert ModelRegistry() is ModelRegistry()
+
+def test_discovery_runs_once(registry):
+    for _ in range(100):
+        assert registry.get_models() == ["gpt-3.5-turbo", "gpt-4"]
+    assert len(registry.calls) == 1
+
+def test_force_refresh_and_ttl(registry):
+    registry.get_models()
+    registry.get_models(force_refresh=True)
+    assert len(registry.calls) == 2
+
+    registry.ttl_seconds = 0
+    registry.get_models()
+    assert len(registry.calls) == 3
+
+def test_returned_list_is_a_copy(registry):
+    models = registry.get_models()
+    models.append("custom-model")
+    assert "custom-model" not in registry.get_models()
+
+def test_prefetch_discovers_in_background(registry):
+    registry.prefetch().join(timeout=5)
+    assert len(registry.calls) == 1
+    registry.get_models()
+    assert len(registry.calls) == 1
@@ -0,0 +1,80 @@
+import os
+import threading
+import pytest
+
+pytest.importorskip("PySide6.QtWidgets")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+# Imported under the names the editor uses, so that the classes are the same
+from gui.node_editor import NodeEditor
+from gui.state import StateMachine
+from state_machine.checkpoint import MemoryCheckpointStore
+
+
+class CountingAgent:
+    def __init__(self, name):
+        self._name = name
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def get_name(self):
+        return self._name
+
+    def set_transcript_context(self, run_id, state_name):
+        pass
+
+    def get_cost_summary(self):
+        return {"total_cost": 0.0}
+
+    def get_last_response(self):
+        return None
+
+    def execute_task(self, on_delta=None, context=None):
+        with self._lock:
+            self.runs += 1
+        return f"{self._name} done"
+
+
+GRAPH = {"states": [
+    {"name": "Researcher", "x": 0, "y": 0, "connections": [{"to": "Writer", "pass_context": True}]},
+    {"name": "Writer", "x": 150, "y": 0, "connections": [{"to": "Editor", "pass_context": False}]},
+    {"name": "Editor", "x": 300, "y": 0, "connections": []},
+]}
+
+
+@pytest.fixture
+def editor():
+    QApplication.instance() or QApplication([])
+    agents = {name: CountingAgent(name) for name in ("Researcher", "Writer", "Editor")}
+    return NodeEditor(agents)
+
+def test_loaded_graph_runs_each_agent_once(editor):
+    editor.load_state_machine(StateMachine.from_dict(GRAPH, editor.agents))
+    state_machine = editor.state_machine
+    state_machine.set_checkpoint_store(MemoryCheckpointStore())
+    state_machine.incremental = False
+
+    assert len(state_machine.states) == 3
+    assert len(editor.node_items) == 3 and len(editor.connections) == 2
+    assert {item.state for item in editor.node_items.values()} == set(state_machine.states)
+
+    state_machine.run()
+    assert {name: agent.runs for name, agent in editor.agents.items()} == \
+        {"Researcher": 1, "Writer": 1, "Editor": 1}
+
+def test_pass_context_toggle_changes_the_transition(editor):
+    editor.load_state_machine(StateMachine.from_dict(GRAPH, editor.agents))
+    state_machine = editor.state_machine
+    state_machine.set_checkpoint_store(MemoryCheckpointStore())
+    state_machine.incremental = False
+    to_editor = next(connection for connection in editor.connections if connection.end_item.state.get_name() == "Editor")
+
+    to_editor.setContextPassing(True)
+    saved = {state["name"]: state["connections"] for state in state_machine.to_dict()["states"]}
+    assert saved["Writer"] == [{"to": "Editor", "pass_context": True}]
+
+    results = state_machine.run()
+    editor_state = to_editor.end_item.state
+    assert editor_state.context == {"previous_result": "Writer done"}
+    assert len(results) == 3
@@ -0,0 +1,44 @@
+import os
+import pytest
+from src.agent_handler.prompt_registry import PromptTemplate, PromptTemplateRegistry
+
+
+PROMPT_VALUES = dict(
+    description="Write a report",
+    expected_output="A report",
+    agent_name="Writer",
+    agent_goal="Create content",
+    agent_backstory="Skilled writer",
+    previous_agent_context=None,
+)
+
+def test_default_template_matches_str_format():
+    registry = PromptTemplateRegistry()
+    template = registry.get()
+    with open(template.path) as file:
+        expected = file.read().strip().format(**PROMPT_VALUES)
+    assert registry.render(**PROMPT_VALUES) == expected
+
+def test_render_handles_escaped_braces_and_format_specs():
+    assert PromptTemplate("t", "{{literal}} {name}").render(name="x") == "{literal} x"
+    assert PromptTemplate("t", "{value:>5}|{name!r}").render(value=1, name="x") == "    1|'x'"
+
+def test_named_templates_and_reload_on_mtime_change(tmp_path):
+    registry = PromptTemplateRegistry()
+    path = tmp_path / "custom.txt"
+    path.write_text("Hello {agent_name}")
+    registry.register("custom", str(path))
+    assert registry.render("custom", agent_name="Mia") == "Hello Mia"
+
+    path.write_text("Goodbye {agent_name}")
+    os.utime(path, (0, 12345))
+    previous_interval = registry.check_interval
+    registry.check_interval = 0
+    try:
+        assert registry.render("custom", agent_name="Mia") == "Goodbye Mia"
+    finally:
+        registry.check_interval = previous_interval
+
+def test_unknown_template():
+    with pytest.raises(KeyError):
+        PromptTemplateRegistry().get("does-not-exist")
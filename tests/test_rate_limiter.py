@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from src.llm_wrap_lib.rate_limiter import ModelRateLimiter, RateLimiter, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(capacity=10, refill_per_second=10)
+    now = time.monotonic()
+    assert bucket.time_until_available(10, now) == 0.0
+    bucket.consume(10, now)
+    assert abs(bucket.time_until_available(5, now) - 0.5) < 1e-6
+    # Oversized requests wait for a full bucket rather than forever
+    assert abs(bucket.time_until_available(50, now) - 1.0) < 1e-6
+
+def test_requests_per_minute_is_enforced():
+    # 600 rpm = 10 requests per second with a burst of 600; drain the burst first
+    limiter = ModelRateLimiter(rpm=600)
+    limiter._request_bucket.consume(600, time.monotonic())
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("agent", 1)
+    assert time.monotonic() - start >= 0.25
+    assert limiter.get_stats()["total_requests"] == 3
+    assert limiter.get_stats()["throttled_requests"] >= 2
+
+def test_tokens_per_minute_is_enforced():
+    limiter = ModelRateLimiter(tpm=6000)  # 100 tokens per second
+    limiter.acquire("agent", 6000)
+    start = time.monotonic()
+    limiter.acquire("agent", 20)
+    assert time.monotonic() - start >= 0.15
+
+def test_fair_across_agents():
+    limiter = ModelRateLimiter(rpm=1200)  # 20 per second
+    limiter._request_bucket.consume(1200, time.monotonic())
+    order = []
+
+    def worker(agent, count):
+        for _ in range(count):
+            limiter.acquire(agent, 1)
+            order.append(agent)
+
+    busy = threading.Thread(target=worker, args=("busy", 6))
+    busy.start()
+    time.sleep(0.01)
+    quiet = threading.Thread(target=worker, args=("quiet", 2))
+    quiet.start()
+    busy.join()
+    quiet.join()
+
+    # The quiet agent is not made to wait behind all of the busy agent's requests
+    assert order.index("quiet") < 3
+    assert limiter.get_stats()["queue_depth"] == 0
+
+def test_async_acquire():
+    limiter = ModelRateLimiter(rpm=600)
+    limiter._request_bucket.consume(600, time.monotonic())
+
+    async def run():
+        await asyncio.gather(*(limiter.aacquire(f"agent-{i}", 1) for i in range(3)))
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - start >= 0.25
+    assert limiter.get_stats()["total_requests"] == 3
+
+def test_registry_configuration():
+    registry = RateLimiter()
+    registry.configure({"test-model": {"rpm": 60, "tpm": 1000}})
+    limiter = registry.get_limiter("test-model")
+    registry.configure({"test-model": {"rpm": 60, "tpm": 1000}})
+    assert registry.get_limiter("test-model") is limiter
+    assert registry.get_limiter("unlimited-model") is None
+    assert "test-model" in registry.get_stats()
@@ -0,0 +1,83 @@
+import time
+from src.llm_wrap_lib.response_cache import ResponseCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+def test_key_depends_on_all_inputs():
+    messages = [{"role": "user", "content": "Hi"}]
+    key = ResponseCache.make_key("gpt-4", messages, None, {"temperature": 0})
+    assert key == ResponseCache.make_key("gpt-4", messages, None, {"temperature": 0})
+    assert key != ResponseCache.make_key("gpt-3.5-turbo", messages, None, {"temperature": 0})
+    assert key != ResponseCache.make_key("gpt-4", messages, None, {"temperature": 0.5})
+    assert key != ResponseCache.make_key("gpt-4", [{"role": "user", "content": "Hello"}], None, {"temperature": 0})
+
+def test_put_and_get_persist_to_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "cached content", 0.002)
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+    assert reopened.get("key") == {"content": "cached content", "cost": 0.002}
+    assert reopened.get("missing") is None
+
+def test_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("a", "A", 0.0)
+    time.sleep(0.01)
+    cache.put("b", "B", 0.0)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", "C", 0.0)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+def test_ttl_expiry(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0.01)
+    cache.put("key", "content", 0.0)
+    time.sleep(0.05)
+    assert cache.get("key") is None
+
+def test_deterministic_only(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.is_cacheable({"temperature": 0})
+    assert not cache.is_cacheable({})
+    assert not cache.is_cacheable({"temperature": 0.7})
+
+    permissive = ResponseCache(str(tmp_path / "other.sqlite3"), deterministic_only=False)
+    assert permissive.is_cacheable({"temperature": 0.7})
+
+def test_rerun_agent_is_served_from_cache(tmp_path):
+    # Imported under the names the wrapper uses, so that the agent is built on the same modules
+    from agent_handler.agent import Agent
+    from agent_handler.task import Task
+    from llm_wrap_lib.mock_backend import MockBackend
+    from llm_wrap_lib.response_cache import ResponseCache as WrapperResponseCache
+
+    agent = Agent("Researcher", "Gather information", "Finds data", False)
+    agent.set_task(Task("Research caching", "A short report"))
+    wrapper = agent.get_llm_wrapper()
+    backend = MockBackend()
+    wrapper.config['mocking'] = False
+    wrapper.backend = backend
+    wrapper.semantic_cache = None
+    wrapper.batcher = None
+    wrapper.response_cache = WrapperResponseCache(str(tmp_path / "cache.sqlite3"))
+    wrapper.initialize_models()
+    assert agent.get_temperature() == 0
+
+    first = agent.execute_task()
+    second = agent.execute_task()
+    assert second == first
+    assert agent.get_last_response().is_cached()
+    assert backend.get_stats()["requests"] == 1
+    assert wrapper.cache_hits == 1
+
+    agent.set_temperature(0.7)
+    agent.execute_task()
+    assert backend.get_stats()["requests"] == 2
@@ -0,0 +1,123 @@
+import time
+from types import SimpleNamespace
+import pytest
+from src.llm_wrap_lib.llm_wrap import DynamicLLMWrapper
+from src.llm_wrap_lib.retry import LatencyTracker, RetryPolicy, is_retryable
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def _response(content, cost=0.001):
+    message = SimpleNamespace(content=content, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], _hidden_params={"response_cost": cost})
+
+@pytest.fixture
+def wrapper():
+    wrapper = DynamicLLMWrapper()
+    wrapper.config['mocking'] = False
+    wrapper.available_models = {'gpt-4': 'gpt-4', 'gpt-3.5-turbo': 'gpt-3.5-turbo'}
+    wrapper.default_model = 'gpt-4'
+    wrapper.config['fallbacks'] = {'gpt-4': ['gpt-3.5-turbo']}
+    wrapper.retry_policy = RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01)
+    wrapper.reset_costs()
+    LatencyTracker().reset()
+    return wrapper
+
+def test_backoff_is_capped_and_jittered():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0, jitter=0.0)
+    assert [policy.backoff(attempt) for attempt in range(4)] == [1.0, 2.0, 4.0, 4.0]
+
+    jittered = RetryPolicy(base_delay=1.0, max_delay=4.0, jitter=1.0)
+    assert all(0.0 <= jittered.backoff(3) <= 4.0 for _ in range(50))
+
+def test_from_config_ignores_unknown_keys():
+    policy = RetryPolicy.from_config({"max_attempts": 5, "hedge": True, "unknown": 1})
+    assert policy.max_attempts == 5
+    assert policy.hedge
+
+def test_max_attempts_must_allow_one_call():
+    for max_attempts in (0, -1):
+        with pytest.raises(ValueError, match="max_attempts"):
+            RetryPolicy.from_config({"max_attempts": max_attempts})
+    assert RetryPolicy.from_config({"max_attempts": 1}).max_attempts == 1
+
+def test_is_retryable():
+    assert is_retryable(_StatusError(429))
+    assert is_retryable(_StatusError(503))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(_StatusError(400))
+    assert not is_retryable(ValueError("bad request"))
+
+def test_hedge_delay_uses_latency_percentile():
+    LatencyTracker().reset()
+    policy = RetryPolicy(hedge=True, hedge_percentile=90, hedge_min_samples=10)
+    assert policy.hedge_delay("model") is None
+    for seconds in range(1, 11):
+        LatencyTracker().record("model", seconds / 10)
+    assert policy.hedge_delay("model") == 0.9
+    assert RetryPolicy(hedge=True, hedge_after_seconds=0.2).hedge_delay("model") == 0.2
+    assert RetryPolicy().hedge_delay("model") is None
+
+def test_retries_transient_errors(wrapper):
+    failures = [_StatusError(503)]
+
+    def send(model_name, messages, tools, kwargs):
+        if failures:
+            raise failures.pop()
+        return _response("ok")
+
+    wrapper._send = send
+    result = wrapper.call_model("Hi")
+    assert result.get_response_content() == "ok"
+    assert wrapper.get_cost_summary()["reliability"]["retries"] == 1
+    assert wrapper.get_cost_summary()["reliability"]["fallbacks"] == 0
+
+def test_falls_back_to_next_model(wrapper):
+    calls = []
+
+    def send(model_name, messages, tools, kwargs):
+        calls.append(model_name)
+        if model_name == 'gpt-4':
+            raise _StatusError(400)
+        return _response("from fallback", cost=0.002)
+
+    wrapper._send = send
+    result = wrapper.call_model("Hi")
+    assert result.get_response_content() == "from fallback"
+    # Non-retryable errors skip straight to the fallback model
+    assert calls == ['gpt-4', 'gpt-3.5-turbo']
+    assert wrapper.model_costs == {'gpt-3.5-turbo': 0.002}
+    assert wrapper.get_cost_summary()["reliability"]["fallbacks"] == 1
+
+def test_raises_when_chain_is_exhausted(wrapper):
+    def send(model_name, messages, tools, kwargs):
+        raise _StatusError(500)
+
+    wrapper._send = send
+    with pytest.raises(_StatusError):
+        wrapper.call_model("Hi")
+    assert wrapper.get_cost_summary()["reliability"]["retries"] == 2
+
+def test_hedged_request_wins_and_loser_is_charged(wrapper):
+    wrapper.retry_policy = RetryPolicy(hedge=True, hedge_after_seconds=0.05)
+    delays = [0.3, 0.0]
+
+    def send(model_name, messages, tools, kwargs):
+        time.sleep(delays.pop(0))
+        return _response("done")
+
+    wrapper._send = send
+    start = time.monotonic()
+    result = wrapper.call_model("Hi")
+    assert result.get_response_content() == "done"
+    assert time.monotonic() - start < 0.25
+
+    time.sleep(0.4)
+    summary = wrapper.get_cost_summary()
+    assert summary["reliability"]["hedged"] == 1
+    assert summary["reliability"]["abandoned_cost"] == 0.001
+    assert summary["total_cost"] == 0.002
@@ -0,0 +1,102 @@
+import time
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.llm_wrap_lib.llm_wrap import DynamicLLMWrapper
+from src.llm_wrap_lib.mock_backend import MockBackend
+from src.llm_wrap_lib.semantic_cache import HashingEmbedder, SemanticCache, load_embedder
+
+PROMPT = """Summarise the findings.
+Context from previous agents:
+The market for electric bikes grew 20% in 2023.
+Battery prices fell by 14% over the same period."""
+
+REORDERED = """Summarise the findings.
+Context from previous agents:
+Battery prices fell by 14% over the same period.
+The market for electric bikes grew 20% in 2023."""
+
+
+@pytest.fixture
+def wrapper():
+    wrapper = DynamicLLMWrapper()
+    wrapper.config['mocking'] = False
+    wrapper.backend = MockBackend()
+    wrapper.response_cache = None
+    wrapper.available_models = {}
+    wrapper.initialize_models()
+    wrapper.reset_costs()
+    return wrapper
+
+def test_near_duplicates_hit_and_different_prompts_miss():
+    cache = SemanticCache(threshold=0.95)
+    cache.put("scope", PROMPT, "answer", 0.01)
+
+    assert cache.get("scope", PROMPT.replace("\n", "\n\n   "))["similarity"] == pytest.approx(1.0)
+    assert cache.get("scope", REORDERED)["content"] == "answer"
+    assert cache.get("scope", "Translate this paragraph into French.") is None
+    assert cache.get("other scope", PROMPT) is None
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+
+def test_scopes():
+    by_model = SemanticCache()
+    assert by_model.make_scope("gpt-4", None, {}, "Writer") == by_model.make_scope("gpt-4", None, {}, "Editor")
+    assert by_model.make_scope("gpt-4", None, {}) != by_model.make_scope("gpt-4o", None, {})
+    assert by_model.make_scope("gpt-4", None, {}) != by_model.make_scope("gpt-4", None, {"temperature": 0.5})
+
+    by_agent = SemanticCache(scope="agent")
+    assert by_agent.make_scope("gpt-4", None, {}, "Writer") != by_agent.make_scope("gpt-4", None, {}, "Editor")
+    with pytest.raises(ValueError):
+        SemanticCache(scope="run")
+
+def test_least_recently_used_entries_are_replaced():
+    cache = SemanticCache(max_entries=100)
+    for number in range(150):
+        cache.put("scope", f"prompt number {number} about topic{number}", str(number), 0.0)
+        if number >= 1:
+            cache.get("scope", "prompt number 0 about topic0")
+
+    assert len(cache) == 100
+    assert cache.get("scope", "prompt number 0 about topic0")["content"] == "0"
+    assert cache.get("scope", "prompt number 1 about topic1") is None
+    assert cache.get("scope", "prompt number 149 about topic149")["content"] == "149"
+
+def test_expired_entries_are_not_served():
+    cache = SemanticCache(ttl_seconds=0.01)
+    cache.put("scope", PROMPT, "answer", 0.0)
+    time.sleep(0.05)
+    assert cache.get("scope", PROMPT) is None
+
+def test_embedders_are_pluggable():
+    assert isinstance(load_embedder(None, 64), HashingEmbedder)
+    assert load_embedder(None, 64).dimensions == 64
+    embedder = load_embedder("src.llm_wrap_lib.semantic_cache:HashingEmbedder")
+    assert embedder.embed("same words").tolist() == embedder.embed("Same   words!").tolist()
+
+def test_call_model_serves_near_duplicates(wrapper):
+    wrapper.semantic_cache = SemanticCache()
+    first = wrapper.call_model(PROMPT, temperature=0)
+    second = wrapper.call_model("  " + PROMPT.replace("\n", "\n\n") + "\n", temperature=0)
+
+    assert wrapper.backend.get_stats()["requests"] == 1
+    assert second.is_cached() and second.get_response_content() == first.get_response_content()
+    assert wrapper.get_cost_summary()["cache"]["semantic_hits"] == 1
+    # Sampled calls are not cached unless they are deterministic
+    wrapper.call_model(PROMPT, temperature=0.7)
+    assert wrapper.backend.get_stats()["requests"] == 2
+
+def test_sampled_hits_measure_false_positives(wrapper):
+    wrapper.semantic_cache = SemanticCache(verify_rate=1.0)
+    wrapper.call_model(PROMPT, temperature=0)
+    wrapper.call_model(PROMPT, temperature=0)
+    scope = wrapper.semantic_cache.make_scope(wrapper.default_model, None, {"temperature": 0})
+    wrapper.semantic_cache.put(scope, "Name a colour", "Blue, like the sky on a clear day", 0.0)
+    wrapper.call_model("Name a colour!", temperature=0)
+
+    # Every hit was sent to the model; only the made-up answer disagreed with it
+    assert wrapper.backend.get_stats()["requests"] == 3
+    stats = wrapper.get_semantic_cache_stats()
+    assert (stats["verified"], stats["false_positives"], stats["false_positive_rate"]) == (2, 1, 0.5)
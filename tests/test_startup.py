@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+CREATE_AGENTS = """
+import sys
+from agent_handler.agent import Agent
+from agent_handler.task import Task
+agent = Agent("Researcher", "Gather information", "Finds data", True)
+agent.set_task(Task("Research", "A report"))
+heavy = [module for module in ("litellm", "multiprocessing", "urllib.request") if module in sys.modules]
+assert not heavy, f"imported at startup: {heavy}"
+"""
+
+
+def test_creating_agents_does_not_import_heavy_modules():
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, environment.get("PYTHONPATH")]))
+    completed = subprocess.run([sys.executable, "-c", CREATE_AGENTS], cwd=SRC_DIR, env=environment,
+                               capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,134 @@
+import time
+import pytest
+from src.tool_handler.tool import Tool
+from src.tool_handler.tool_executor import ToolExecutor
+# Imported under the name Tool and ToolExecutor use, so that the bank is the same singleton
+from tool_handler.tool_bank import ToolBank
+from tool_handler.tool_cache import ToolResultCache
+
+runs = []
+
+
+def lookup(location, unit="celsius", delay=0.0):
+    runs.append(location)
+    time.sleep(delay)
+    return {"location": location, "unit": unit}
+
+def square(x):
+    return x * x
+
+def slow_square(x):
+    time.sleep(0.2)
+    return x * x
+
+def failing(x):
+    runs.append(x)
+    raise RuntimeError("flaky")
+
+@pytest.fixture(autouse=True)
+def cache():
+    previous = ToolBank().get_result_cache()
+    cache = ToolResultCache()
+    ToolBank().set_result_cache(cache)
+    runs.clear()
+    yield cache
+    ToolBank().set_result_cache(previous)
+
+def test_pure_tools_run_once_per_normalised_arguments(cache):
+    tool = Tool("lookup", "Look up", lookup, pure=True)
+    assert tool.call("Paris") == tool.call(location="Paris", unit="celsius") == tool.call("Paris", "celsius")
+    assert tool.call("Paris", unit="kelvin")["unit"] == "kelvin"
+
+    assert runs == ["Paris", "Paris"]
+    stats = cache.get_stats()["lookup"]
+    assert (stats["calls"], stats["hits"], stats["misses"], stats["hit_rate"]) == (4, 2, 2, 0.5)
+    assert stats["seconds_saved"] == pytest.approx(2 * stats["mean_latency"])
+
+def test_other_tools_always_run(cache):
+    tool = Tool("lookup", "Look up", lookup)
+    tool.call("Paris")
+    tool.call("Paris")
+    assert runs == ["Paris", "Paris"]
+    assert cache.get_stats() == {}
+
+def test_results_expire_after_the_ttl():
+    tool = Tool("lookup", "Look up", lookup, cache_ttl=0.05)
+    tool.call("Paris")
+    tool.call("Paris")
+    time.sleep(0.1)
+    tool.call("Paris")
+    assert runs == ["Paris", "Paris"]
+
+def test_least_recently_used_results_are_evicted():
+    ToolBank().set_result_cache(ToolResultCache(max_entries=2))
+    tool = Tool("lookup", "Look up", lookup, pure=True)
+    for location in ("Paris", "Tokyo", "Paris", "Lima", "Paris", "Tokyo"):
+        tool.call(location)
+    assert runs == ["Paris", "Tokyo", "Lima", "Tokyo"]
+
+def test_errors_are_not_cached():
+    tool = Tool("failing", "Fails", failing, pure=True)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            tool.call(1)
+    assert runs == [1, 1]
+
+def test_repeated_calls_in_a_tool_loop_are_free(cache):
+    executor = ToolExecutor()
+    tool = Tool("lookup", "Look up", lookup, cache_ttl=60)
+    calls = [(f"call_{index}", tool, {"location": "Paris", "delay": 0.2}) for index in range(4)]
+
+    first = executor.run_calls(calls)
+    # Identical calls in the same turn wait for the one that is running
+    assert runs == ["Paris"]
+    started = time.monotonic()
+    second = executor.run_calls(calls)
+    assert time.monotonic() - started < 0.1
+    assert first == second and runs == ["Paris"]
+    assert cache.get_stats()["lookup"]["hits"] == 7
+
+def test_process_tool_results_are_cached(cache):
+    executor = ToolExecutor()
+    tool = Tool("square", "Square a number", square, executor="process", pure=True)
+    assert executor.run_calls([("a", tool, {"x": 7})]) == [("a", "49")]
+    assert executor.run_calls([("b", tool, {"x": 7})]) == [("b", "49")]
+    assert cache.get_stats()["square"]["hits"] == 1
+
+def test_identical_process_calls_share_one_job(cache):
+    executor = ToolExecutor()
+    tool = Tool("slow_square", "Square a number slowly", slow_square, executor="process", pure=True)
+    calls = [(f"call_{index}", tool, {"x": 3}) for index in range(4)]
+
+    assert executor.run_calls(calls) == [(f"call_{index}", "9") for index in range(4)]
+    stats = cache.get_stats()["slow_square"]
+    assert (stats["misses"], stats["hits"]) == (1, 3)
+
+def test_results_persist_to_disk(tmp_path):
+    path = str(tmp_path / "tools.sqlite3")
+    ToolBank().set_result_cache(ToolResultCache(path=path))
+    tool = Tool("lookup", "Look up", lookup, pure=True)
+    unpicklable = Tool("opaque", "Returns an object", lambda x: object(), pure=True)
+    tool.call("Paris")
+    unpicklable.call(1)
+    ToolBank().get_result_cache().close()
+
+    reopened = ToolResultCache(path=path)
+    ToolBank().set_result_cache(reopened)
+    assert tool.call("Paris") == {"location": "Paris", "unit": "celsius"}
+    assert runs == ["Paris"]
+    assert reopened.get("opaque", unpicklable.get_cache_key(1)) == (False, None)
+    reopened.close()
+
+def test_results_on_disk_are_bounded(tmp_path):
+    path = str(tmp_path / "tools.sqlite3")
+    cache = ToolResultCache(max_entries=2, path=path)
+    ToolBank().set_result_cache(cache)
+    tool = Tool("lookup", "Look up", lookup, pure=True)
+    for location in ("Paris", "Tokyo", "Lima", "Paris"):
+        tool.call(location)
+    cache.close()
+
+    reopened = ToolResultCache(max_entries=10, path=path)
+    assert [reopened.get("lookup", tool.get_cache_key(location))[0] for location in ("Paris", "Tokyo", "Lima")] == \
+        [True, False, True]
+    reopened.close()
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.llm_wrap_lib.cancellation import CancellationToken, RunCancelled
+from src.tool_handler.tool import Tool
+from src.tool_handler.tool_executor import ToolExecutor
+
+
+def slow_lookup(location, delay=0.2):
+    time.sleep(delay)
+    return f"result for {location}"
+
+def square(x):
+    return x * x
+
+@pytest.fixture
+def executor():
+    return ToolExecutor()
+
+def test_calls_run_concurrently_and_keep_order(executor):
+    tool = Tool("slow_lookup", "Slow lookup", slow_lookup)
+    calls = [(f"call_{i}", tool, {"location": f"city {i}"}) for i in range(4)]
+
+    start = time.monotonic()
+    results = executor.run_calls(calls)
+    elapsed = time.monotonic() - start
+
+    assert results == [(f"call_{i}", f"result for city {i}") for i in range(4)]
+    assert elapsed < 0.6
+
+def test_process_executor(executor):
+    tool = Tool("square", "Square a number", square, executor="process")
+    assert executor.run_calls([("a", tool, {"x": 3}), ("b", tool, {"x": 4})]) == [("a", "9"), ("b", "16")]
+
+def test_timeout_returns_error_message(executor):
+    tool = Tool("slow_lookup", "Slow lookup", slow_lookup, timeout=0.05)
+    fast = Tool("square", "Square a number", square)
+    results = executor.run_calls([("slow", tool, {"location": "Tokyo", "delay": 0.5}), ("fast", fast, {"x": 2})])
+
+    assert results[0][0] == "slow"
+    assert "timed out" in results[0][1]
+    assert results[1] == ("fast", "4")
+
+def test_timed_out_tools_do_not_starve_the_pool(executor):
+    hung = Tool("hung_lookup", "Never answers in time", slow_lookup, timeout=0.05)
+    fast = Tool("square", "Square a number", square)
+    calls = [(f"hung_{i}", hung, {"location": "Tokyo", "delay": 1.0}) for i in range(executor._max_threads)]
+    assert all("timed out" in result for _, result in executor.run_calls(calls))
+
+    # Every thread of the original pool is still busy with a hung tool
+    start = time.monotonic()
+    assert executor.run_calls([("fast", fast, {"x": 3})]) == [("fast", "9")]
+    assert time.monotonic() - start < 0.5
+
+def test_async_calls(executor):
+    tool = Tool("slow_lookup", "Slow lookup", slow_lookup)
+    calls = [(f"call_{i}", tool, {"location": f"city {i}"}) for i in range(3)]
+    results = asyncio.run(executor.arun_calls(calls))
+    assert [call_id for call_id, _ in results] == ["call_0", "call_1", "call_2"]
+
+def test_unknown_executor_rejected():
+    with pytest.raises(ValueError):
+        Tool("square", "Square a number", square, executor="gpu")
+
+def test_cancellation_stops_waiting_for_tools(executor):
+    tool = Tool("slow_lookup", "Slow lookup", slow_lookup)
+    cancellation = CancellationToken()
+    threading.Timer(0.05, cancellation.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(RunCancelled):
+        executor.run_calls([("slow", tool, {"location": "Tokyo", "delay": 1.0})], cancellation)
+    assert time.monotonic() - start < 0.5
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from src.trace_handler.tracer import (
+    InMemorySpanExporter, JsonFileSpanExporter, OTLPHttpSpanExporter, Tracer, current_span
+)
+
+
+@pytest.fixture
+def tracer():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer([exporter], flush_interval=0.01)
+    tracer.exporter = exporter
+    yield tracer
+    tracer.shutdown()
+
+def finished(tracer):
+    tracer.flush()
+    return {span.name: span for span in tracer.exporter.get_finished_spans()}
+
+def test_spans_nest(tracer):
+    with tracer.span("run", run_id="r1") as root:
+        assert current_span() is root
+        with tracer.span("state") as child:
+            child.set_attribute("cost", 0.5)
+    assert not current_span().is_recording()
+
+    spans = finished(tracer)
+    assert spans["state"].parent_id == spans["run"].span_id
+    assert spans["state"].trace_id == spans["run"].trace_id
+    assert spans["run"].parent_id is None
+    assert spans["run"].attributes == {"run_id": "r1"}
+    assert spans["state"].attributes == {"cost": 0.5}
+    assert spans["run"].start_ns <= spans["state"].start_ns <= spans["state"].end_ns <= spans["run"].end_ns
+
+def test_errors_are_recorded(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("boom")
+    span = finished(tracer)["failing"]
+    assert span.status == "error" and span.error == "ValueError: boom"
+
+def test_bind_carries_parent_to_other_threads(tracer):
+    def work():
+        with tracer.span("worker"):
+            pass
+
+    with tracer.span("parent"):
+        thread = threading.Thread(target=tracer.bind(work))
+        thread.start()
+        thread.join()
+    spans = finished(tracer)
+    assert spans["worker"].parent_id == spans["parent"].span_id
+    assert spans["worker"].thread_id != spans["parent"].thread_id
+
+def test_disabled_tracer_is_cheap():
+    tracer = Tracer()
+    assert not tracer.enabled
+    with tracer.span("ignored") as span:
+        span.set_attribute("key", "value")
+        assert not span.is_recording()
+    function = lambda: None
+    assert tracer.bind(function) is function
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        with tracer.span("ignored"):
+            pass
+    assert time.perf_counter() - start < 0.5
+
+def test_json_file_exporter_writes_chrome_trace(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer([JsonFileSpanExporter(str(path))], flush_interval=0.01)
+    with tracer.span("state_machine.run"):
+        with tracer.span("llm.call_model", model="gpt-4"):
+            pass
+    tracer.shutdown()
+
+    events = json.loads(path.read_text())["traceEvents"]
+    by_name = {event["name"]: event for event in events}
+    assert by_name["llm.call_model"]["ph"] == "X"
+    assert by_name["llm.call_model"]["cat"] == "llm"
+    assert by_name["llm.call_model"]["args"]["model"] == "gpt-4"
+    assert by_name["llm.call_model"]["args"]["parent_id"] == by_name["state_machine.run"]["args"]["span_id"]
+    assert by_name["llm.call_model"]["dur"] <= by_name["state_machine.run"]["dur"]
+
+def test_json_file_exporter_appends_each_batch(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer([JsonFileSpanExporter(str(path))], batch_size=2, flush_interval=0.01)
+    sizes = []
+    for index in range(3):
+        for _ in range(2):
+            with tracer.span("tool.call", index=index):
+                pass
+        tracer.flush()
+        sizes.append(path.stat().st_size)
+    tracer.shutdown()
+
+    # Later batches add about as much as the first rather than rewriting the file
+    assert sizes[2] - sizes[1] < 1.5 * (sizes[1] - sizes[0])
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["args"]["index"] for event in events] == [0, 0, 1, 1, 2, 2]
+
+def test_json_file_exporter_without_spans_writes_an_empty_trace(tmp_path):
+    exporter = JsonFileSpanExporter(str(tmp_path / "trace.json"))
+    exporter.shutdown()
+    assert json.loads((tmp_path / "trace.json").read_text())["traceEvents"] == []
+
+def test_otlp_exporter_posts_to_collector():
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Collector)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        endpoint = f"http://127.0.0.1:{server.server_port}/v1/traces"
+        tracer = Tracer([OTLPHttpSpanExporter(endpoint, service_name="test")], flush_interval=0.01)
+        with tracer.span("run", states=3, incremental=False):
+            with tracer.span("state", cost=0.25):
+                pass
+        tracer.shutdown()
+    finally:
+        server.shutdown()
+
+    path, payload = received[0]
+    assert path == "/v1/traces"
+    resource_spans = payload["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"][0] == {"key": "service.name", "value": {"stringValue": "test"}}
+    spans = {span["name"]: span for span in resource_spans["scopeSpans"][0]["spans"]}
+    assert spans["state"]["parentSpanId"] == spans["run"]["spanId"]
+    assert "parentSpanId" not in spans["run"]
+    assert {"key": "states", "value": {"intValue": "3"}} in spans["run"]["attributes"]
+    assert {"key": "incremental", "value": {"boolValue": False}} in spans["run"]["attributes"]
+    assert {"key": "cost", "value": {"doubleValue": 0.25}} in spans["state"]["attributes"]
+    assert int(spans["run"]["endTimeUnixNano"]) >= int(spans["run"]["startTimeUnixNano"])
+
+def test_unreachable_collector_does_not_raise():
+    exporter = OTLPHttpSpanExporter("http://127.0.0.1:9/v1/traces", timeout=0.5)
+    tracer = Tracer([exporter], flush_interval=0.01)
+    with tracer.span("run"):
+        pass
+    tracer.shutdown()
@@ -0,0 +1,53 @@
+import json
+from src.transcript_handler.transcript import FileTranscriptSink, MemoryTranscriptSink, NullTranscriptSink
+
+
+def test_file_sink_writes_jsonl(tmp_path):
+    sink = FileTranscriptSink(str(tmp_path / "out"), batch_size=3, flush_interval=0.01)
+    for i in range(10):
+        sink.write({"run_id": "run-1", "state": "Writer", "type": "response", "index": i})
+    sink.flush()
+
+    with open(sink.path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["index"] for record in records] == list(range(10))
+    assert all(record["run_id"] == "run-1" for record in records)
+    sink.close()
+
+def test_close_drains_queue(tmp_path):
+    sink = FileTranscriptSink(str(tmp_path), flush_interval=10)
+    sink.write({"type": "context", "context": "héllo"})
+    sink.close()
+
+    with open(sink.path, encoding="utf-8") as file:
+        assert json.loads(file.readline())["context"] == "héllo"
+
+def test_write_errors_do_not_stop_the_writer(tmp_path):
+    sink = FileTranscriptSink(str(tmp_path), flush_interval=0.01)
+    circular = {}
+    circular["self"] = circular
+    sink.write({"type": "prompt", "value": circular})
+    sink.write({"type": "response", "index": 1})
+    sink.flush()
+
+    # A directory where the file should be makes every write fail
+    sink.path = str(tmp_path)
+    sink.write({"type": "response", "index": 2})
+    sink.flush()
+    sink.close()
+
+    with open(tmp_path / "transcript.jsonl", encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == [{"type": "response", "index": 1}]
+
+def test_memory_sink_filters_by_run():
+    sink = MemoryTranscriptSink()
+    sink.write({"run_id": "a", "type": "prompt"})
+    sink.write({"run_id": "b", "type": "prompt"})
+    assert len(sink.get_records()) == 2
+    assert sink.get_records("a") == [{"run_id": "a", "type": "prompt"}]
+
+def test_null_sink_discards():
+    sink = NullTranscriptSink()
+    sink.write({"type": "prompt"})
+    sink.flush()
+    sink.close()